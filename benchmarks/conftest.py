@@ -0,0 +1,106 @@
+"""Fixtures for the benchmark suite
+
+The corpora are synthetic so the benchmarks can run without
+downloading the real dataframes. Choose the size with --corpus-size.
+
+The end to end benchmark replays recorded responses from the directory
+given with --http-fixtures. Record them once on a machine with network by
+also passing --record-http-fixtures."""
+import random
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List
+
+import pandas as pd
+import pytest
+
+swedish_words = [
+    "regeringen", "riksdagen", "förslag", "kommunen", "arbetet", "vi", "söker", "en",
+    "erfaren", "medarbetare", "till", "vårt", "kontor", "i", "staden", "som", "har",
+    "god", "förmåga", "att", "samarbeta", "med", "andra", "och", "ta", "ansvar",
+    "för", "det", "dagliga", "hus", "husen", "huset", "bil", "bilen", "bilar",
+    "skolan", "eleverna", "lärare", "bör", "återkomma", "frågan", "utskottet",
+]
+english_words = [
+    "the", "committee", "noted", "that", "proposal", "was", "in", "its", "view",
+    "premature", "we", "are", "looking", "for", "an", "experienced", "colleague",
+    "to", "join", "our", "office", "house", "houses", "car", "cars", "school",
+    "teacher", "government", "should", "return", "with", "a", "new", "bill",
+]
+punctuation = [".", ".", ".", "!", "?"]
+
+
+def generate_sentences(words: List[str], number_of_sentences: int, seed: int = 0) -> List[str]:
+    """Generate sentences of 3 to 20 words from the vocabulary"""
+    generator = random.Random(seed)
+    sentences = []
+    for _ in range(number_of_sentences):
+        sentence = " ".join(generator.choices(words, k=generator.randint(3, 20)))
+        sentences.append(sentence.capitalize() + generator.choice(punctuation))
+    return sentences
+
+
+def generate_corpus(words: List[str], number_of_sentences: int) -> pd.DataFrame:
+    """Generate a dataframe with the columns of the historical ads dataframe,
+    which is a superset of the Riksdagen columns"""
+    return pd.DataFrame(data=dict(
+        id=[f"doc{index // 20}" for index in range(number_of_sentences)],
+        sentence=generate_sentences(words, number_of_sentences),
+        filename="synthetic.jsonl.gz",
+        date=datetime(2021, 1, 13),
+    ))
+
+
+def pytest_addoption(parser):
+    parser.addoption("--corpus-size", type=int, default=10000,
+                     help="number of sentences in the synthetic corpora, e.g. 10000 to 10000000")
+    parser.addoption("--http-fixtures", default=None,
+                     help="directory with the recorded responses for the end to end benchmark")
+    parser.addoption("--record-http-fixtures", action="store_true",
+                     help="record the responses to --http-fixtures instead of replaying them")
+
+
+@pytest.fixture(scope="session")
+def corpus_size(request) -> int:
+    return request.config.getoption("--corpus-size")
+
+
+@pytest.fixture(scope="session")
+def http_fixtures(request) -> str:
+    directory = request.config.getoption("--http-fixtures")
+    if directory is None:
+        pytest.skip("no --http-fixtures directory given")
+    return directory
+
+
+@pytest.fixture(scope="session")
+def swedish_corpus(corpus_size) -> pd.DataFrame:
+    return generate_corpus(swedish_words, corpus_size)
+
+
+@pytest.fixture(scope="session")
+def english_corpus(corpus_size) -> pd.DataFrame:
+    return generate_corpus(english_words, corpus_size)
+
+
+@pytest.fixture
+def track(benchmark) -> Callable:
+    """Benchmark the function and record throughput and peak memory
+
+    The throughput is items per second based on the mean time and
+    the peak memory is measured in a separate run with tracemalloc
+    because tracing slows down the timed runs. Pass fewer rounds for
+    slow functions."""
+    def run(function: Callable, items: int, rounds: int = 5, **kwargs):
+        result = benchmark.pedantic(function, kwargs=kwargs, rounds=rounds, iterations=1)
+        tracemalloc.start()
+        function(**kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchmark.extra_info["items"] = items
+        # There are no stats with --benchmark-disable
+        if benchmark.stats is not None:
+            benchmark.extra_info["items_per_second"] = round(items / benchmark.stats.stats.mean)
+        benchmark.extra_info["peak_memory_bytes"] = peak
+        return result
+    return run
@@ -0,0 +1,84 @@
+"""Micro-benchmark of the per sentence cost of normalizing a text
+
+Run it from the root of the repository:
+$ python -m benchmarks.normalizer [number of sentences]
+
+The sentences are sampled from the Riksdagen and Historical Ads
+dataframes if they have been downloaded, otherwise a few built-in
+Swedish and English sentences are used."""
+import random
+import re
+import sys
+import timeit
+from os.path import exists
+from typing import List
+
+import pandas as pd
+
+from lexutils.config.enums import SupportedPicklePaths
+from lexutils.helpers import normalizer
+
+fallback_sentences = [
+    "Vi söker nu en erfaren „projektledare“ till vårt kontor i Malmö!",
+    "Regeringen bör återkomma till riksdagen med ett förslag: detta är viktigt.",
+    "Du har god förmåga att uttrycka dig i tal och skrift, både på svenska och engelska.",
+    "The committee noted that the proposal was, in its view, premature.",
+    "He said: `this is not what we agreed on´ and left the room.",
+]
+
+
+def legacy_record_tokenize(text: str) -> List[str]:
+    """This is how Record.extract_usage_example_if_suitable used to clean"""
+    cleaned_sentence = text.lower()
+    punctuations = [".", ",", "!", "?", "„", "“", "\n",
+                    ":", ";", "`", "´", "$", "€"]
+    for punctuation in punctuations:
+        if punctuation in cleaned_sentence:
+            cleaned_sentence = cleaned_sentence.replace(punctuation, " ")
+    return cleaned_sentence.split()
+
+
+separators = "".join(normalizer.language_separators())
+punctuation_pattern = re.compile(f"[{re.escape(separators)}]")
+
+
+def translate_tokenize(text: str) -> List[str]:
+    return text.lower().translate(normalizer.translation_table()).split()
+
+
+def regex_tokenize(text: str) -> List[str]:
+    return punctuation_pattern.sub(" ", text.lower()).split()
+
+
+def load_sentences(number_of_sentences: int) -> List[str]:
+    sentences = []
+    for pickle_path in SupportedPicklePaths:
+        if exists(pickle_path.value):
+            print(f"Sampling sentences from {pickle_path.value}")
+            df = pd.read_pickle(pickle_path.value)
+            sentences.extend(df["sentence"].sample(
+                n=min(number_of_sentences, len(df)), random_state=0
+            ).tolist())
+    if len(sentences) == 0:
+        print("No dataframes found, using the built-in sentences")
+        sentences = random.Random(0).choices(fallback_sentences, k=number_of_sentences)
+    return sentences
+
+
+def main():
+    number_of_sentences = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sentences = load_sentences(number_of_sentences)
+    for name, function in [("legacy", legacy_record_tokenize),
+                           ("translate", translate_tokenize),
+                           ("regex", regex_tokenize),
+                           ("normalizer", normalizer.tokenize)]:
+        duration = min(timeit.repeat(
+            lambda: [function(sentence) for sentence in sentences],
+            number=1, repeat=5
+        ))
+        print(f"{name}: {duration * 1e9 / len(sentences):.0f} ns per sentence "
+              f"({len(sentences)} sentences)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import pytest
+from spacy.lang.sv import Swedish
+
+import convert_historical_ads_to_pandas
+import convert_riksdagen_txt_to_pandas
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    nlp = Swedish()
+    nlp.add_pipe('sentencizer')
+    return nlp
+
+
+@pytest.fixture(scope="module")
+def documents(swedish_corpus):
+    """Join the synthetic sentences into documents of 20 sentences each,
+    limited to 100 documents because the converters are slow"""
+    return swedish_corpus.head(2000).groupby("id", sort=False)["sentence"].agg(" ".join).to_dict()
+
+
+def test_historical_ads_extract_swedish_sentences(track, nlp, documents):
+    ads = [dict(id=document_id, date=None, external_id=None, filename="synthetic.jsonl.gz",
+                text=text, mixed=False)
+           for document_id, text in documents.items()]
+
+    def convert_all():
+        return [convert_historical_ads_to_pandas.extract_swedish_sentences(
+            ads=ads[start:start + convert_historical_ads_to_pandas.ads_per_batch], nlp_instance=nlp
+        ) for start in range(0, len(ads), convert_historical_ads_to_pandas.ads_per_batch)]
+    track(convert_all, items=len(documents))
+
+
+def test_riksdagen_extract_sentences(track, nlp, documents):
+    batch_size = convert_riksdagen_txt_to_pandas.documents_per_batch
+    batches = [dict(list(documents.items())[start:start + batch_size])
+               for start in range(0, len(documents), batch_size)]
+
+    def convert_all():
+        return [convert_riksdagen_txt_to_pandas.extract_sentences(documents=batch, nlp_instance=nlp)
+                for batch in batches]
+    track(convert_all, items=len(documents))
@@ -0,0 +1,50 @@
+"""A whole session from fetching the forms to adding a usage example
+
+The responses are replayed from --http-fixtures and the edit is a dry run,
+so the benchmark is deterministic and needs no network. Only English
+is used because Swedish also needs the real dataframes."""
+import os
+
+from lexutils.config import config
+from lexutils.helpers import backend, wikisource
+from lexutils.helpers.upload_queue import WikibaseWriter
+from lexutils.models.lexemes import Lexemes
+from lexutils.models.wikidata.entities import Lexeme
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+
+def run_session(directory: str, record: bool) -> int:
+    """Returns the number of forms processed"""
+    # Start every round from empty caches, just like the recording
+    wikisource.search_cache.clear()
+    wikisource.qid_cache = None
+    backend.activate("record" if record else "replay", directory=directory, dry=True)
+    try:
+        lexemes = Lexemes(language_code=WikimediaLanguageCode.ENGLISH.value)
+        lexemes.fetch_forms_without_an_example()
+        lexemes.fetch_usage_examples()
+        form = lexemes.forms_with_usage_examples_found[0]
+        usage_example = next(iter(form.usage_examples))
+        form.fetch_senses(usage_example=usage_example)
+        claim = Lexeme(id=form.lexeme_id).usage_example_claim(
+            form=form, sense=form.senses[0], usage_example=usage_example
+        )
+        WikibaseWriter().add_claims(lexeme_id=form.lexeme_id, claims=[claim.get_json()],
+                                    summary="Added usage example")
+    finally:
+        backend.deactivate()
+    return len(lexemes.forms_without_an_example)
+
+
+def test_end_to_end(track, http_fixtures, request, monkeypatch, tmp_path):
+    fixtures = os.path.abspath(http_fixtures)
+    record = request.config.getoption("--record-http-fixtures")
+    # The label and QID caches and the form pickles are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "require_form_confirmation", False)
+    monkeypatch.setattr(config, "upload_queue", config.upload_queue)
+    monkeypatch.setattr(config, "upload_edit_interval", config.upload_edit_interval)
+    if record:
+        run_session(fixtures, record=True)
+    track(run_session, items=config.number_of_forms_to_fetch, rounds=3,
+          directory=fixtures, record=False)
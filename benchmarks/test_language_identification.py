@@ -0,0 +1,31 @@
+import pytest
+
+from lexutils.helpers import language_identification
+
+
+@pytest.fixture(scope="module")
+def sentences(swedish_corpus, english_corpus):
+    """Mix the languages and limit the number of sentences because langdetect is slow"""
+    return (swedish_corpus["sentence"].head(1000).tolist() +
+            english_corpus["sentence"].head(1000).tolist())
+
+
+@pytest.mark.parametrize("engine", ["ngram", "langdetect"])
+def test_detect_batch(track, sentences, engine):
+    # langdetect is the baseline and too slow for more rounds
+    track(language_identification.detect_batch, items=len(sentences),
+          rounds=1 if engine == "langdetect" else 5, texts=sentences, engine=engine)
+
+
+@pytest.mark.parametrize("engine", ["ngram", "langdetect"])
+def test_select_sentences_in_language(track, swedish_corpus, engine):
+    """The documents of a monolingual corpus are identified as a whole"""
+    documents = [group.tolist() for _, group in
+                 swedish_corpus.head(2000).groupby("id", sort=False)["sentence"]]
+
+    def select_all():
+        return [language_identification.select_sentences_in_language(document, language_code="sv",
+                                                                     engine=engine)
+                for document in documents]
+    track(select_all, items=sum(len(document) for document in documents),
+          rounds=1 if engine == "langdetect" else 5)
@@ -0,0 +1,25 @@
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.usage_example import UsageExample
+from lexutils.models.wikidata.sense import Sense
+
+
+def test_usage_example_footprint(track, benchmark, swedish_corpus):
+    """Build a record and a usage example per sentence like the dataframe
+    sources do. The sentences are extracted up front so the footprint
+    only covers the models"""
+    rows = list(swedish_corpus[["id", "sentence"]].itertuples(index=False, name=None))
+
+    def build_examples():
+        return [UsageExample(text=sentence, record=RiksdagenRecord(id=id, text=sentence))
+                for id, sentence in rows]
+    track(build_examples, items=len(rows))
+    benchmark.extra_info["bytes_per_example"] = round(benchmark.extra_info["peak_memory_bytes"] / len(rows))
+
+
+def test_sense_footprint(track, benchmark, corpus_size):
+    glosses = [f"gloss number {index}" for index in range(min(corpus_size, 100000))]
+
+    def build_senses():
+        return [Sense(id=f"L{index}-S1", gloss=gloss) for index, gloss in enumerate(glosses)]
+    track(build_senses, items=len(glosses))
+    benchmark.extra_info["bytes_per_sense"] = round(benchmark.extra_info["peak_memory_bytes"] / len(glosses))
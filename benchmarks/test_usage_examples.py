@@ -0,0 +1,93 @@
+import pytest
+
+from itertools import islice
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers.near_duplicates import drop_near_duplicates
+from lexutils.models.dataframe_usage_examples import add_scores
+from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+from lexutils.models.wikidata import form as form_module
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+from lexutils.models.wikidata.form import parse_forms
+from tests.factories import create_form, create_usage_examples
+
+
+@pytest.mark.parametrize("class_", [RiksdagenUsageExamples, HistoricalJobAdsUsageExamples])
+def test_find_form_representation_in_the_dataframe(track, swedish_corpus, class_):
+    usage_examples = create_usage_examples(class_, swedish_corpus)
+    track(usage_examples.find_form_representation_in_the_dataframe,
+          items=len(swedish_corpus), form=create_form("husen"))
+
+
+def test_convert_matches_to_user_examples(track, swedish_corpus):
+    usage_examples = create_usage_examples(RiksdagenUsageExamples, swedish_corpus)
+    form = create_form("bilen")
+    usage_examples.find_form_representation_in_the_dataframe(form=form)
+    track(usage_examples.convert_matches_to_user_examples,
+          items=usage_examples.number_of_matches, form=form)
+
+
+def test_all_examples_of_a_lexeme(track, swedish_corpus):
+    """The cost of creating every example of each form up to max_results_size"""
+    usage_examples = create_usage_examples(RiksdagenUsageExamples, swedish_corpus,
+                                           source=SupportedExampleSources.RIKSDAGEN)
+    forms = [create_form(representation) for representation in ["hus", "husen", "huset"]]
+
+    def all_examples():
+        iterators = usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=forms)
+        return {form: list(iterator) for form, iterator in iterators.items()}
+    track(all_examples, items=len(swedish_corpus))
+
+
+def test_first_examples_of_a_lexeme(track, swedish_corpus):
+    """The cost of preparing what a user usually looks at, the first 5
+    examples of each form, when the examples are created lazily"""
+    usage_examples = create_usage_examples(RiksdagenUsageExamples, swedish_corpus,
+                                           source=SupportedExampleSources.RIKSDAGEN)
+    forms = [create_form(representation) for representation in ["hus", "husen", "huset"]]
+
+    def first_examples():
+        iterators = usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=forms)
+        return {form: list(islice(iterator, 5)) for form, iterator in iterators.items()}
+    track(first_examples, items=len(swedish_corpus))
+
+
+def test_extract_usage_example_if_suitable(track, swedish_corpus):
+    form = create_form("skolan")
+    records = [RiksdagenRecord(id=row.id, text=row.sentence)
+               for row in swedish_corpus.head(100000).itertuples(index=False)]
+
+    def extract_all():
+        return [record.extract_usage_example_if_suitable(form=form) for record in records]
+    track(extract_all, items=len(records))
+
+
+def test_form_parsing(track, monkeypatch, corpus_size):
+    """Parse WDQS bindings into forms with the label cache stubbed"""
+    monkeypatch.setattr(form_module, "read_labels_from_cache", lambda qids: {qid: f"label of {qid}" for qid in qids})
+    prefix = "http://www.wikidata.org/entity/"
+    bindings = [
+        dict(
+            lexeme=dict(value=f"{prefix}L{index}"),
+            form=dict(value=f"{prefix}L{index}-F1"),
+            form_representation=dict(value=f"ord{index}"),
+            category=dict(value=f"{prefix}Q1084"),
+            grammatical_features=dict(value=f"{prefix}Q110786,{prefix}Q53997857"),
+        )
+        for index in range(min(corpus_size, 10000))
+    ]
+
+    track(parse_forms, items=len(bindings), bindings=bindings, language_code=WikimediaLanguageCode.SWEDISH)
+
+
+def test_add_scores(track, swedish_corpus):
+    """Compute the features and scores of a whole corpus like the converters do"""
+    track(add_scores, items=len(swedish_corpus),
+          dataframe=swedish_corpus[["id", "sentence"]], source=SupportedExampleSources.RIKSDAGEN)
+
+
+def test_drop_near_duplicates(track, swedish_corpus):
+    """Fingerprint a whole corpus and drop the near duplicates like the converters do"""
+    track(drop_near_duplicates, items=len(swedish_corpus), dataframe=swedish_corpus[["id", "sentence"]])
@@ -0,0 +1,52 @@
+"""Find the candidates of 1000 forms in the Swedish corpora in this process
+and with pools of processes. Compare the items per second to see how the
+pool scales with the number of cores, e.g.
+
+python -m pytest benchmarks/test_worker_pool.py --corpus-size 1000000"""
+from itertools import islice
+
+import pytest
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import worker_pool
+from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+
+from benchmarks.conftest import swedish_words
+from tests.factories import create_form, create_usage_examples
+
+number_of_forms = 1000
+limit = 50
+
+
+@pytest.fixture(scope="module")
+def dataframes(swedish_corpus):
+    return [
+        create_usage_examples(HistoricalJobAdsUsageExamples, swedish_corpus,
+                              source=SupportedExampleSources.HISTORICAL_ADS),
+        create_usage_examples(RiksdagenUsageExamples, swedish_corpus,
+                              source=SupportedExampleSources.RIKSDAGEN),
+    ]
+
+
+@pytest.fixture(scope="module")
+def lexeme_forms():
+    """Lexemes with 2 forms each from the vocabulary of the corpus"""
+    return [[create_form(swedish_words[(index + offset) % len(swedish_words)], lexeme_id=f"L{index}")
+             for offset in range(2)]
+            for index in range(number_of_forms // 2)]
+
+
+def test_in_this_process(track, dataframes, lexeme_forms):
+    def find_all():
+        return [[{form: list(islice(iterator, limit)) for form, iterator in
+                  usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=forms).items()}
+                 for usage_examples in dataframes]
+                for forms in lexeme_forms]
+    track(find_all, items=number_of_forms, rounds=1)
+
+
+@pytest.mark.parametrize("processes", [1, 2, 4, 8])
+def test_worker_pool(track, dataframes, lexeme_forms, processes):
+    track(worker_pool.find_usage_examples, items=number_of_forms, rounds=1,
+          dataframe_usage_examples=dataframes, lexeme_forms=lexeme_forms, processes=processes, limit=limit)
@@ -1,14 +1,17 @@
 import logging
 import os
-import re
 import time
 import random
+from typing import Any, Dict, Tuple
 
-import langdetect
 import pandas as pd
 from spacy.lang.sv import Swedish
 
-from lexutils.config.enums import SupportedPicklePaths
+from lexutils.config.enums import SupportedExampleSources, SupportedPicklePaths
+from lexutils.helpers import language_identification
+from lexutils.helpers.near_duplicates import drop_near_duplicates
+from lexutils.helpers.sentence_filters import SentenceFilter
+from lexutils.models.dataframe_usage_examples import add_scores
 
 # First download some zipped textfiles from data.riksdagen.se/dokument and unzip into riksdagen/
 
@@ -17,94 +20,133 @@ logger = logging.getLogger(__name__)
 pickle_filename = SupportedPicklePaths.RIKSDAGEN
 dir = r"riksdagen/"
 max_dataframe_rows = 200000
-files = os.listdir(dir)
+# The sentences of this many documents are filtered together
+documents_per_batch = 50
+sentence_filter = SentenceFilter(
+    min_words=5,
+    # Remove sentences with digits and (, ), [, ], §, /
+    forbid_digits=True,
+    forbidden_characters="()§[]/",
+    forbidden_first_characters=",",
+    allow_lowercase_start=False,
+)
 
-start = time.time()
-df = pd.DataFrame()
-skipped_count = 0
-split_count = 0
-count_file = 1
-# We shuffle the list to avoid only
-# having one of the document types
-random.shuffle(files)
-for filename in files:
-    if ".txt" in filename:
-        # print(filename)
-        path = dir+filename
-        document_id = filename.replace(".txt", "")
-        print(f"working on {document_id} ({count_file}/{len(files)}) "
-              f"skipped: {skipped_count} dataframe rows: {len(df)}/{max_dataframe_rows} splits: {split_count}")
-        current_line_number = 1
-        # We use a set to avoid duplicates
-        cleaned_lines = set()
-        with open(path, "r", encoding="UTF-8") as f:
-            for line in f.readlines():
-                line = line.strip()
-                if (
-                        # Remove weird dots
-                        "..." not in line and
-                        # Only keep lines with more than 4 words
-                        len(line.split(" ")) > 4
-                ):
-                    cleaned_lines.add(line)
-                # if current_line_number == 1000:
-                #     break
-                if current_line_number % 5000 == 0:
-                    logger.info(current_line_number)
-                current_line_number += 1
-        text = " ".join(cleaned_lines)
-        #print(text)
-        #exit()
-        nlp = Swedish()
-        nlp.add_pipe('sentencizer')
+
+def extract_sentences(documents: Dict[str, str] = None,
+                      nlp_instance: Any = None) -> Tuple[pd.DataFrame, int]:
+    """Split a batch of documents into sentences that pass the filters
+
+    The filters are applied to all the sentences of the batch at once.
+    Returns the id and sentence of every sentence and the number of sentences skipped"""
+    if documents is None or nlp_instance is None:
+        raise ValueError("we did not get what we need")
+    ids = []
+    sentences = []
+    for document_id, text in documents.items():
         # 100.000 char is the max for the NLP parser so we split along something we discard anyway
         # the effect of this split is unknown, it might result in 2 garbage sentences for every split
-        text_after_split = ""
         if len(text) > 95000:
             logger.info("splitting the text up")
             text_after_split = text.split("1")
             logger.debug(f"len(text_after_split):{len(text_after_split)}")
-            split_count += 1
-            # exit(0)
-        sentences = set()
-        for text in text_after_split:
-            doc = nlp(text)
+        else:
+            text_after_split = [text]
+        for doc in nlp_instance.pipe(text_after_split):
             for sentence in doc.sents:
-                sentence = str(sentence)
-                # Skip all sentences with numbers
-                # https://stackoverflow.com/questions/4289331/how-to-extract-numbers-from-a-string-in-python
-                if (
-                        len(sentence.split(" ")) > 4 and
-                        # Remove sentences with digits and (, ), [, ], §, /
-                        len(re.findall(r'\d+|\(|\)|§|\[|\]|\/', sentence)) == 0 and
-                        sentence[0:1] != " " and
-                        sentence[0:1] != "," and
-                        not sentence[0:1].islower() and
-                        langdetect.detect(sentence) == "sv"
-                ):
-                    # Ta bort punktum från början
-                    sentences.add(sentence.lstrip("."))
-                else:
-                    skipped_count += 1
-                    # console.print(f"skipped: {sentence}", style="red")
-        for sentence in sentences:
-            # print(type(sentence))
-            dictionary = dict(id=document_id, sentence=sentence)
-            #print(dictionary)
-            # exit()
-            df = df.append(pd.DataFrame(data=[dictionary]))
-            # print(sentence)
-            # print("--")
-        count_file += 1
-        if len(df) > max_dataframe_rows:
-            break
-    # break
-print("before removing duplicates")
-df.info()
-print("and after")
-df.drop_duplicates(inplace=True, subset=["sentence"])
-print(df.info(), df.describe(), df.sample(10))
-df.to_pickle(pickle_filename.value)
-print(f"saved to {pickle_filename.value}")
-end = time.time()
-print(f"total duration: {round(end - start)}s")
+                ids.append(document_id)
+                sentences.append(str(sentence))
+    candidates, skipped_count = sentence_filter.apply(pd.DataFrame(dict(id=ids, sentence=sentences)))
+    # The language is checked for each document as a whole and
+    # only sentence by sentence if it is mixed
+    kept = []
+    for _, document in candidates.groupby("id", sort=False)["sentence"]:
+        swedish_sentences = set(language_identification.select_sentences_in_language(
+            document.tolist(), language_code="sv"
+        ))
+        kept.extend(index for index, sentence in document.items() if sentence in swedish_sentences)
+    skipped_count += len(candidates) - len(kept)
+    candidates = candidates.loc[kept]
+    # Ta bort punktum från början
+    candidates = candidates.assign(sentence=candidates["sentence"].str.lstrip("."))
+    return candidates.drop_duplicates(subset=["id", "sentence"]), skipped_count
+
+
+def main():
+    files = os.listdir(dir)
+    start = time.time()
+    df = pd.DataFrame()
+    skipped_count = 0
+    split_count = 0
+    count_file = 1
+    # The pipeline is stateless so we only create it once
+    nlp = Swedish()
+    nlp.add_pipe('sentencizer')
+    documents: Dict[str, str] = {}
+
+    def process_batch():
+        nonlocal df, skipped_count
+        sentences, skipped = extract_sentences(documents=documents, nlp_instance=nlp)
+        skipped_count += skipped
+        df = pd.concat([df, sentences], ignore_index=True)
+        documents.clear()
+
+    # We shuffle the list to avoid only
+    # having one of the document types
+    random.shuffle(files)
+    for filename in files:
+        if ".txt" in filename:
+            # print(filename)
+            path = dir+filename
+            document_id = filename.replace(".txt", "")
+            print(f"working on {document_id} ({count_file}/{len(files)}) "
+                  f"skipped: {skipped_count} dataframe rows: {len(df)}/{max_dataframe_rows} splits: {split_count}")
+            current_line_number = 1
+            # We use a set to avoid duplicates
+            cleaned_lines = set()
+            with open(path, "r", encoding="UTF-8") as f:
+                for line in f.readlines():
+                    line = line.strip()
+                    if (
+                            # Remove weird dots
+                            "..." not in line and
+                            # Only keep lines with more than 4 words
+                            len(line.split(" ")) > 4
+                    ):
+                        cleaned_lines.add(line)
+                    # if current_line_number == 1000:
+                    #     break
+                    if current_line_number % 5000 == 0:
+                        logger.info(current_line_number)
+                    current_line_number += 1
+            text = " ".join(cleaned_lines)
+            #print(text)
+            #exit()
+            if len(text) > 95000:
+                split_count += 1
+            documents[document_id] = text
+            if len(documents) == documents_per_batch:
+                process_batch()
+            count_file += 1
+            if len(df) > max_dataframe_rows:
+                break
+        # break
+    if len(documents) > 0:
+        process_batch()
+    print("before removing duplicates")
+    df.info()
+    print("and after")
+    df.drop_duplicates(inplace=True, subset=["sentence"])
+    # Precompute the quality features and sort by score so
+    # the best usage examples are found first
+    df = add_scores(df, source=SupportedExampleSources.RIKSDAGEN)
+    # Motions and reports repeat the same sentences with small variations
+    df = drop_near_duplicates(df)
+    print(df.info(), df.describe(), df.sample(10))
+    df.to_pickle(pickle_filename.value)
+    print(f"saved to {pickle_filename.value}")
+    end = time.time()
+    print(f"total duration: {round(end - start)}s")
+
+
+if __name__ == "__main__":
+    main()
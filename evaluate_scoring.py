@@ -0,0 +1,36 @@
+"""Compare the usage example scorers against the review log
+
+For every form where an example was accepted the examples shown for it
+are ranked by each scorer and we report how many examples a reviewer
+would have seen per accepted example. Lower is better. "as logged" is
+the order the examples were actually presented in.
+
+Usage: python evaluate_scoring.py [review_log.jsonl]"""
+import sys
+
+import pandas as pd
+from rich.table import Table
+
+from lexutils.config import config
+from lexutils.helpers import scoring
+from lexutils.helpers.console import console
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else config.review_log
+    decisions = pd.read_json(path, lines=True, dtype=dict(text=str, form_id=str))
+    results = scoring.evaluate(decisions)
+    if len(results) == 0:
+        console.print(f"No accepted usage examples found in {path}")
+        return
+    table = Table(title=f"Examples shown per accepted example in {path}")
+    for column in ["Scorer", "Forms", "Examples shown per accepted example"]:
+        table.add_column(column, justify="left" if column == "Scorer" else "right")
+    for name, result in sorted(results.items(),
+                               key=lambda item: item[1]["examples_shown_per_accepted_example"]):
+        table.add_row(name, str(result["forms"]), str(result["examples_shown_per_accepted_example"]))
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,18 +21,80 @@ require_form_confirmation = True
 fast_nlp_languages = [WikimediaLanguageCode.SWEDISH, WikimediaLanguageCode.ENGLISH]
 number_of_forms_to_fetch = 20
 ksamsok_max_results_size = 500  # keep to multiples of 50
+ksamsok_max_concurrent_requests = 5
+# K-samsök descriptions are often of low quality, so this source is opt-in
+enable_ksamsok = False
 riksdagen_max_results_size = 500  # keep to multiples of 20
 wikisource_max_results_size_fast_nlp = 50
 wikisource_max_results_size_slow_nlp = 20
+wikisource_max_concurrent_requests = 5
 historical_ads_max_results_size = 200
 min_word_count = 5
 max_word_count = 15
+# How to rank the usage examples, see lexutils/helpers/scoring.py
+usage_example_scorer = "heuristic"
+# Sentences whose fingerprints differ in at most this many of 64 bits are
+# near duplicates. The corpora are built with the strict limit to not lose
+# distinct sentences. The candidates of a form already share the form,
+# so they are collapsed with the looser limit.
+near_duplicate_max_distance_in_corpus = 3
+near_duplicate_max_distance_in_candidates = 8
+# Language identification when converting the corpora,
+# see lexutils/helpers/language_identification.py
+language_identification_engine = "ngram"  # or "langdetect"
+language_identification_languages = ["sv", "en", "da", "no", "de", "fi"]  # only used by ngram
+language_identification_seed = 0  # only used by langdetect
+language_identification_window = 5  # sentences checked together before checking them one by one
+# Settings for the prepare command
+prepare_examples_per_form = 10  # the best usage examples kept per form in the candidates file
+prepare_batch_size = 200  # lexemes or documents per query when looking up senses and QIDs
+prepare_max_concurrent_queries = 4  # WDQS allows 5 concurrent queries per IP
+prepare_worker_processes = os.cpu_count() or 1  # processes searching the Swedish dataframes, 1 searches in this process
+prepare_candidates_per_source = 50  # usage examples created per form from each dataframe by the processes
+
+# Settings for sharing the work between sessions, see lexutils/helpers/work_allocation.py
+# Point all the reviewers on a host to the same file to never work on the same forms
+work_allocation_path = "work_allocation.sqlite"
+work_lease_duration = 3600  # seconds before the forms of a session that stopped are handed out again
+# The sessions page through the forms without an example with a shared cursor.
+# Reviewers can also split the lexemes between them, e.g. with form_shards = 3
+# and form_shard = 0, 1 and 2, to each get their own cursor
+form_shards = 1
+form_shard = 0
+# Answer the form and count queries from a local index of a lexeme dump
+# instead of WDQS, create it with "python lexutils.py ingest DUMP",
+# see lexutils/helpers/lexeme_dump.py
+lexeme_dump_index = None  # e.g. "lexemes.sqlite"
+
+# Settings for the corpus server, see lexutils/helpers/corpus_server.py
+# Set the URL to get the matching rows from a server started with
+# "python lexutils.py serve" instead of loading the Swedish dataframes
+corpus_server_url = None  # e.g. "http://127.0.0.1:8765"
+corpus_server_host = "127.0.0.1"
+corpus_server_port = 8765
 show_sense_urls = True  # Useful for improving the gloss in WD
 show_lexeme_urls = True  # Useful for improving the lexeme in WD
 exclude_list = "exclude_list.json"
+# Every usage example shown and the decision on it is appended to this
+# file, so the scorers can be evaluated with evaluate_scoring.py.
+# Set it to "" to disable the log.
+review_log = "review_log.jsonl"
+# Accepted usage examples are uploaded in the background so you can
+# go on with the next form right away, see lexutils/helpers/upload_queue.py
+upload_in_background = True
+upload_queue = "upload_queue.sqlite"
+upload_batch_delay = 30  # seconds without new examples to a lexeme before its examples are uploaded in one edit
+upload_edit_interval = 6  # minimum seconds between two edits
+upload_maxlag = 5  # see https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+upload_max_attempts = 3
 
 # Global variables
 login_instance = None
 
 # Debug
-debug_summaries = False
\ No newline at end of file
+debug_summaries = False
+show_timing_report = True  # Print where the time went at the end of the session
+# Write the timings to a file at the end of the session, e.g. "timings.json"
+# or "timings.prom" for the Prometheus node exporter textfile collector
+timing_export_path = ""
+profiling_sample_interval = 0.005  # seconds between samples when running with --profile sampling
\ No newline at end of file
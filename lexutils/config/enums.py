@@ -4,6 +4,7 @@ from enum import auto, Enum
 class BaseURLs(Enum):
     RIKSDAGEN = "https://data.riksdagen.se/dokument/"
     ARBETSFORMEDLINGEN_HISTORICAL_ADS = "https://data.jobtechdev.se/annonser/historiska/2021.zip"
+    KSAMSOK = "http://kulturarvsdata.se/"
 
 
 class SupportedPicklePaths(Enum):
@@ -15,6 +16,7 @@ class SupportedExampleSources(Enum):
     WIKISOURCE = "Q15156406"
     RIKSDAGEN = "Q21592569"
     HISTORICAL_ADS = "Q110544812"
+    KSAMSOK = "Q7654799"
 
 
 class SupportedFormPickles(Enum):
@@ -24,6 +26,11 @@ class SupportedFormPickles(Enum):
     DECLINED_FORMS = "declined_forms.pkl"
 
 
+class SupportedCachePickles(Enum):
+    """These are caches that persist between sessions"""
+    WIKISOURCE_QIDS = "wikisource_qids.pkl"
+
+
 class LanguageStyle(Enum):
     FORMAL = "Q104597585"
     INFORMAL = "Q901711"
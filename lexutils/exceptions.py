@@ -1,2 +1,12 @@
 class DataNotFoundException(BaseException):
     pass
+
+
+class CorpusServerException(Exception):
+    """The corpus server could not be reached or did not answer"""
+    pass
+
+
+class FixtureNotFoundException(Exception):
+    """A request that was not recorded was sent while replaying"""
+    pass
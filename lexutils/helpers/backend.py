@@ -0,0 +1,244 @@
+"""Record, replay and dry-run backends for everything we fetch over HTTP
+
+WDQS, the Wikibase API (via WikibaseIntegrator), Riksdagen and Wikisource
+are all reached through requests or httpx.AsyncClient, so the backend is
+plugged in at their transports and not at every call site:
+
+live: the default, the requests are sent as usual
+record: the requests are sent and the responses are saved as JSON
+fixtures in a directory, one file per distinct request
+replay: the responses are read from the fixtures and nothing is sent,
+a request that was not recorded raises FixtureNotFoundException
+
+dry_run can be combined with any mode. Edits to Wikidata are then answered
+with a made up success instead of being sent or recorded.
+
+Requests are matched on the method, the URL and the body without the
+tokens and passwords. If the same request is sent more than once the
+responses are replayed in the order they were recorded. Record and replay
+in a fresh working directory so the caches on disk, the form pickles and
+the cursor of the forms query in config.work_allocation_path do not hide
+or change requests."""
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from lexutils.config import config
+from lexutils.exceptions import FixtureNotFoundException
+
+logger = logging.getLogger(__name__)
+
+modes = ["live", "record", "replay"]
+mode = "live"
+dry_run = False
+store: Optional["FixtureStore"] = None
+# These are left out when matching requests and never saved
+volatile_parameters = {"token", "lgtoken", "logintoken", "lgpassword", "password", "maxlag"}
+write_actions = {"wbeditentity", "wbcreateclaim", "wbsetclaim", "wbremoveclaims",
+                 "wbsetqualifier", "wbsetreference", "wbsetlabel", "wbsetdescription", "edit"}
+# The headers of the recorded responses we keep, the body is saved decoded
+kept_headers = {"content-type", "retry-after"}
+originals: Dict[str, Callable] = {}
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def __parameters__(url: str, body: bytes) -> Dict[str, str]:
+    """The query and form parameters of a request"""
+    parameters = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+    try:
+        parameters.update(parse_qsl(body.decode("utf-8"), keep_blank_values=True, strict_parsing=True))
+    except (UnicodeDecodeError, ValueError):
+        pass
+    return parameters
+
+
+def __normalize_body__(body: bytes) -> str:
+    if body == b"":
+        return ""
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        return base64.b64encode(body).decode("ascii")
+    try:
+        return json.dumps(json.loads(text), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        pass
+    try:
+        pairs = parse_qsl(text, keep_blank_values=True, strict_parsing=True)
+    except ValueError:
+        return text
+    return urlencode(sorted((name, value) for name, value in pairs if name not in volatile_parameters))
+
+
+def __normalize_url__(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in volatile_parameters)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class FixtureStore:
+    """The recorded responses in a directory, one JSON file per distinct request"""
+
+    def __init__(self, directory: str = None):
+        if directory is None:
+            raise ValueError("directory was None")
+        self.directory = directory
+        self.lock = threading.Lock()
+        # The requests recorded or replayed in this session and how many times
+        self.counts: Dict[str, int] = {}
+
+    def path(self, method: str, url: str, body: bytes) -> Tuple[str, Dict[str, str]]:
+        request = dict(method=method.upper(), url=__normalize_url__(url), body=__normalize_body__(body))
+        digest = hashlib.sha1(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{urlsplit(url).hostname}-{digest}.json"), request
+
+    def record(self, method: str, url: str, body: bytes, response: Response) -> None:
+        path, request = self.path(method, url, body)
+        status, headers, content = response
+        recorded: Dict[str, Any] = dict(status=status, headers={name.lower(): value for name, value in headers.items()
+                                                                if name.lower() in kept_headers})
+        try:
+            recorded["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            recorded["base64"] = base64.b64encode(content).decode("ascii")
+        with self.lock:
+            # Recording again replaces the responses from earlier sessions
+            if path in self.counts and os.path.exists(path):
+                with open(path, encoding="utf-8") as file:
+                    fixture = json.load(file)
+            else:
+                fixture = dict(request=request, responses=[])
+            fixture["responses"].append(recorded)
+            self.counts[path] = len(fixture["responses"])
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(fixture, file, ensure_ascii=False, indent=1)
+
+    def replay(self, method: str, url: str, body: bytes) -> Response:
+        path, request = self.path(method, url, body)
+        if not os.path.exists(path):
+            raise FixtureNotFoundException(f"No recorded response for {request['method']} {request['url'][:200]} "
+                                           f"{request['body'][:200]} in {self.directory}")
+        with self.lock:
+            with open(path, encoding="utf-8") as file:
+                responses = json.load(file)["responses"]
+            index = self.counts.get(path, 0)
+            self.counts[path] = index + 1
+        # Repeat the last response if the request is sent more times than recorded
+        recorded = responses[min(index, len(responses) - 1)]
+        if "base64" in recorded:
+            content = base64.b64decode(recorded["base64"])
+        else:
+            content = recorded["text"].encode("utf-8")
+        return recorded["status"], recorded["headers"], content
+
+
+def __dry_run_response__(parameters: Dict[str, str]) -> Response:
+    result: Dict[str, Any] = dict(success=1)
+    if parameters.get("action") == "wbeditentity":
+        # Echo the edit like Wikibase does, but in no real revision
+        entity = json.loads(parameters.get("data", "{}"))
+        entity.update(id=parameters.get("id"), lastrevid=0)
+        result["entity"] = entity
+    return 200, {"content-type": "application/json"}, json.dumps(result).encode("utf-8")
+
+
+def __response_without_sending__(method: str, url: str, body: bytes) -> Optional[Response]:
+    if dry_run and method.upper() == "POST":
+        parameters = __parameters__(url, body)
+        if parameters.get("action") in write_actions:
+            logger.info(f"Dry run, not sending the {parameters['action']} request")
+            return __dry_run_response__(parameters)
+    if mode == "replay":
+        return store.replay(method, url, body)
+    return None
+
+
+def __requests_send__(adapter, request, **kwargs):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    elif not isinstance(body, bytes):
+        # File uploads and generators are sent as they are
+        return originals["requests"](adapter, request, **kwargs)
+    canned = __response_without_sending__(request.method, request.url, body)
+    if canned is None:
+        response = originals["requests"](adapter, request, **kwargs)
+        if mode == "record":
+            store.record(request.method, request.url, body,
+                         (response.status_code, dict(response.headers), response.content))
+        return response
+    status, headers, content = canned
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response._content_consumed = True
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = "OK" if status < 400 else "Error"
+    return response
+
+
+async def __httpx_handle_async_request__(transport, request):
+    import httpx
+    body = await request.aread()
+    canned = __response_without_sending__(request.method, str(request.url), body)
+    if canned is None:
+        response = await originals["httpx"](transport, request)
+        if mode != "record":
+            return response
+        content = await response.aread()
+        await response.aclose()
+        headers = {name: value for name, value in response.headers.items() if name.lower() in kept_headers}
+        store.record(request.method, str(request.url), body, (response.status_code, headers, content))
+        canned = response.status_code, headers, content
+    status, headers, content = canned
+    return httpx.Response(status, headers=headers, content=content, request=request)
+
+
+def activate(backend_mode: str = "live", directory: str = None, dry: bool = False) -> None:
+    """Plug the backend into requests and httpx"""
+    global mode, dry_run, store
+    import httpx
+    from requests.adapters import HTTPAdapter
+    if backend_mode not in modes:
+        raise ValueError(f"mode has to be one of {modes}")
+    if backend_mode != "live":
+        if directory is None:
+            raise ValueError("directory was None")
+        store = FixtureStore(directory=directory)
+    mode = backend_mode
+    dry_run = dry
+    if dry_run:
+        # Never mark the real pending uploads as done
+        config.upload_queue = os.path.join(tempfile.mkdtemp(prefix="lexutils-dry-run-"), "upload_queue.sqlite")
+        config.upload_edit_interval = 0
+    if len(originals) == 0:
+        originals["requests"] = HTTPAdapter.send
+        originals["httpx"] = httpx.AsyncHTTPTransport.handle_async_request
+        HTTPAdapter.send = __requests_send__
+        httpx.AsyncHTTPTransport.handle_async_request = __httpx_handle_async_request__
+    logger.info(f"Using the {mode} backend{' in dry run' if dry_run else ''}")
+
+
+def deactivate() -> None:
+    global mode, dry_run, store
+    if len(originals) > 0:
+        import httpx
+        from requests.adapters import HTTPAdapter
+        HTTPAdapter.send = originals.pop("requests")
+        httpx.AsyncHTTPTransport.handle_async_request = originals.pop("httpx")
+    mode = "live"
+    dry_run = False
+    store = None
@@ -1,6 +1,6 @@
 import logging
 from os.path import exists
-from typing import Optional
+from typing import Dict, Iterable
 
 import pandas as pd
 
@@ -12,44 +12,35 @@ logger = logging.getLogger(__name__)
 # https://stackoverflow.com/questions/24761133/pandas-check-if-row-exists-with-certain-values
 
 
-def read_from_cache(
-        qid: str = None,
-) -> Optional[str]:
-    """Returns None or result from the cache"""
-    if qid is None:
-        raise ValueError("did not get all we need")
-    logger.debug("Reading from the cache")
-    if exists("cache.pkl"):
-        df = pd.read_pickle("cache.pkl")
-        # This tests whether any row matches
-        match = (df['qid'] == qid).any()
-        logger.debug(f"match:{match}")
-        if match:
-            # Here we find the row that matches and extract the
-            # result column and extract the value using any()
-            result = df.loc[df["qid"] == qid, "label"][0]
-            logger.debug(f"result:{result}")
-            if result is not None:
-                return result
-
-
-def add_to_cache(
-        label: str = None,
-        qid: str = None
+def read_labels_from_cache(
+        qids: Iterable[str] = None,
+) -> Dict[str, str]:
+    """Returns the labels of the qids found in the cache
+    reading the cache only once"""
+    if qids is None:
+        raise ValueError("qids was None")
+    if not exists("cache.pkl"):
+        return {}
+    df = pd.read_pickle("cache.pkl")
+    found = df[df["qid"].isin(set(qids)) & df["label"].notna()].drop_duplicates("qid")
+    logger.debug(f"found {len(found)} labels in the cache")
+    return dict(zip(found["qid"], found["label"]))
+
+
+def add_labels_to_cache(
+        labels: Dict[str, str] = None
 ) -> None:
-    if label is None or qid is None:
-        raise ValueError("did not get all we need")
-    logger.debug("Adding to cache")
-    data = dict(qid=qid, label=label)
+    """Add the labels that are not in the cache yet in one write"""
+    if labels is None:
+        raise ValueError("labels was None")
+    if len(labels) == 0:
+        return
+    data = pd.DataFrame(data=[dict(qid=str(qid), label=label) for qid, label in labels.items()])
     if exists("cache.pkl"):
         df = pd.read_pickle("cache.pkl")
-        # This tests whether any row matches
-        match = (df['qid'] == qid).any()
-        logger.debug(f"match:{match}")
-        if not match:
-            # We only give save the value once for now
-            df = df.append(pd.DataFrame(data=[data]))
-            logger.debug(f"Saving pickle with new label {label}")
-            df.to_pickle("cache.pkl")
-    else:
-        pd.DataFrame(data=[data]).to_pickle("cache.pkl")
+        data = data[~data["qid"].isin(df["qid"])]
+        if len(data) == 0:
+            return
+        data = pd.concat([df, data], ignore_index=True)
+    logger.debug(f"Saving pickle with new labels for {list(labels)}")
+    data.to_pickle("cache.pkl")
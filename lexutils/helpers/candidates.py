@@ -0,0 +1,129 @@
+"""The candidates file written by the prepare command
+
+It is gzipped JSON Lines with one form per line. Each line holds the
+form, its senses and its best usage examples in ranked order with the
+QIDs of the documents already looked up, e.g.
+
+{"id": "L1-F1", "lexeme_id": "L1", "representation": "husen",
+ "language_code": "sv", "lexeme_category": "noun",
+ "grammatical_features": ["plural", "definite"],
+ "senses": [{"id": "L1-S1", "gloss": "byggnad"}],
+ "examples": [{"text": "...", "score": 1.2, "record": {"source": "RIKSDAGEN",
+               "id": "H5091", "document_qid": "Q123", ...}}]}
+
+A review session reads the forms back and starts right away."""
+import gzip
+import json
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List
+
+if TYPE_CHECKING:
+    from lexutils.models.record import Record
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.form import Form
+
+logger = logging.getLogger(__name__)
+
+
+def record_to_dict(record: "Record") -> Dict[str, Any]:
+    data = dict(
+        source=record.source.name,
+        id=record.id,
+        text=record.text,
+        date=record.date.isoformat() if record.date is not None else None,
+        filename=record.filename,
+        document_qid=record.document_qid,
+    )
+    if record.source.name == "WIKISOURCE":
+        data.update(document_title=record.document_title, language_code=record.language_code.value)
+    return data
+
+
+def record_from_dict(data: Dict[str, Any]) -> "Record":
+    from lexutils.config.enums import SupportedExampleSources
+    from lexutils.models.historical_job_ads_record import HistoricalJobAd
+    from lexutils.models.ksamsok_record import KsamsokRecord
+    from lexutils.models.riksdagen_record import RiksdagenRecord
+    from lexutils.models.wikidata.enums import WikimediaLanguageCode
+    from lexutils.models.wikisource_record import WikisourceRecord
+    source = SupportedExampleSources[data["source"]]
+    date = datetime.fromisoformat(data["date"]) if data.get("date") else None
+    if source == SupportedExampleSources.WIKISOURCE:
+        # The Wikisource records are created from search results so we skip __init__
+        record = WikisourceRecord.__new__(WikisourceRecord)
+        record.id = data["id"]
+        record.text = data["text"]
+        record.date = date
+        record.filename = data.get("filename")
+        record.document_title = data["document_title"]
+        record.language_code = WikimediaLanguageCode(data["language_code"])
+    else:
+        classes = {
+            SupportedExampleSources.RIKSDAGEN: RiksdagenRecord,
+            SupportedExampleSources.HISTORICAL_ADS: HistoricalJobAd,
+            SupportedExampleSources.KSAMSOK: KsamsokRecord,
+        }
+        record = classes[source](id=data["id"], text=data["text"], date=date, filename=data.get("filename"))
+    record.document_qid = data.get("document_qid")
+    return record
+
+
+def form_to_dict(form: "Form", usage_examples: List["UsageExample"]) -> Dict[str, Any]:
+    return dict(
+        id=form.id,
+        lexeme_id=form.lexeme_id,
+        representation=form.representation,
+        language_code=form.language_code.value,
+        lexeme_category=form.lexeme_category,
+        grammatical_features=form.grammatical_features,
+        senses=[dict(id=sense.id, gloss=sense.gloss) for sense in form.senses],
+        examples=[dict(text=example.text, score=round(example.score, 4), record=record_to_dict(example.record))
+                  for example in usage_examples],
+    )
+
+
+def form_from_dict(data: Dict[str, Any]) -> "Form":
+    from lexutils.models.lazy_usage_examples import LazyUsageExamples
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.entity_id import EntityID
+    from lexutils.models.wikidata.enums import WikimediaLanguageCode
+    from lexutils.models.wikidata.form import Form
+    from lexutils.models.wikidata.sense import Sense
+    form = Form(dict(), language_code=WikimediaLanguageCode(data["language_code"]))
+    form.id = EntityID(data["id"])
+    form.lexeme_id = EntityID(data["lexeme_id"])
+    form.representation = data["representation"]
+    form.lexeme_category = data["lexeme_category"]
+    form.grammatical_features = data["grammatical_features"]
+    form.senses = [Sense(id=sense["id"], gloss=sense["gloss"]) for sense in data["senses"]]
+    examples = []
+    for example_data in data["examples"]:
+        example = UsageExample(text=example_data["text"], record=record_from_dict(example_data["record"]))
+        example.score = example_data["score"]
+        examples.append(example)
+    form.usage_examples = LazyUsageExamples(eager_examples=examples)
+    form.number_of_examples_found = len(examples)
+    return form
+
+
+def write(path: str = None, forms: Iterable[Dict[str, Any]] = None) -> int:
+    """Write the forms from form_to_dict() and return how many were written"""
+    if path is None or forms is None:
+        raise ValueError("we did not get what we need")
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for form in forms:
+            file.write(json.dumps(form, ensure_ascii=False) + "\n")
+            count += 1
+    logger.info(f"Wrote {count} forms to {path}")
+    return count
+
+
+def read(path: str = None) -> Iterator["Form"]:
+    if path is None:
+        raise ValueError("path was None")
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip() != "":
+                yield form_from_dict(json.loads(line))
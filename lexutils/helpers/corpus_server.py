@@ -0,0 +1,241 @@
+"""A local corpus service so the reviewers on a shared host load the
+Swedish dataframes into memory once instead of once per session
+
+Start it with
+
+python lexutils.py serve
+
+and set corpus_server_url in config.py. RiksdagenUsageExamples and
+HistoricalJobAdsUsageExamples then ask the server for the matching rows
+instead of loading the pickles.
+
+The server keeps an index from every normalized word to the rows it is in,
+so finding the rows of a lexeme is a few lookups instead of a scan of the
+whole corpus. The words are normalized like Record does it, so the rows
+found are exactly those where a form would get a usage example.
+
+POST /find {"source": "RIKSDAGEN", "representations": ["hus", "husen"],
+            "min_words": 5, "max_words": 15, "limit": 500}
+
+returns the best rows with at least limit rows per representation, if
+there are that many, in descending score order and the number of
+matching rows
+
+{"number_of_matches": 1234, "rows": {"id": [...], "sentence": [...], "score": [...]}}
+
+GET /health returns the sources served and their number of rows."""
+from __future__ import annotations
+
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from lexutils.config import config
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.exceptions import CorpusServerException
+from lexutils.helpers import normalizer
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+if TYPE_CHECKING:
+    from lexutils.models.dataframe_usage_examples import DataframeUsageExamples
+
+logger = logging.getLogger(__name__)
+
+# Both corpora are Swedish
+language_code = WikimediaLanguageCode.SWEDISH
+# Rows normalized at a time when building the index
+chunk_size = 100000
+timeout = 60
+
+
+class WordIndex:
+    """The rows each normalized word of the texts appears in and
+    the number of normalized words in each text
+
+    The rows of all the words are kept in one array sorted by word and
+    then by row, so the rows of a word come out in the order of the
+    dataframe which is descending score order."""
+
+    def __init__(self, texts: pd.Series = None):
+        if texts is None:
+            raise ValueError("texts was None")
+        # The labels are the row numbers after exploding the words
+        texts = texts.reset_index(drop=True)
+        table = normalizer.translation_table(language_code)
+        self.vocabulary: Dict[str, int] = {}
+        self.word_counts = np.zeros(len(texts), dtype=np.uint16)
+        codes, rows = [], []
+        for start in range(0, len(texts), chunk_size):
+            words = texts.iloc[start:start + chunk_size].str.lower().str.translate(table).str.split()
+            self.word_counts[start:start + len(words)] = words.str.len().clip(upper=np.iinfo(np.uint16).max)
+            words = words.explode().dropna()
+            chunk_codes, uniques = pd.factorize(words.to_numpy())
+            mapping = np.fromiter((self.vocabulary.setdefault(word, len(self.vocabulary)) for word in uniques),
+                                  dtype=np.uint32, count=len(uniques))
+            codes.append(mapping[chunk_codes])
+            rows.append(words.index.to_numpy(dtype=np.uint32))
+        all_codes = np.concatenate(codes) if len(codes) > 0 else np.zeros(0, dtype=np.uint32)
+        # The sort is stable so the rows of each word stay in ascending order
+        order = np.argsort(all_codes, kind="stable")
+        self.rows = np.concatenate(rows)[order] if len(rows) > 0 else np.zeros(0, dtype=np.uint32)
+        self.ends = np.cumsum(np.bincount(all_codes, minlength=len(self.vocabulary)))
+
+    def find(self, word: str) -> np.ndarray:
+        """The rows the word appears in, in ascending order
+
+        The word is only lowered like the representations of the forms
+        in Record.extract_usage_examples_for_forms()"""
+        code = self.vocabulary.get(word.lower())
+        if code is None:
+            return np.zeros(0, dtype=np.uint32)
+        rows = self.rows[(self.ends[code - 1] if code > 0 else 0):self.ends[code]]
+        # A word can appear more than once in a text
+        return rows[np.concatenate(([True], rows[1:] != rows[:-1]))] if len(rows) > 0 else rows
+
+
+class Corpus:
+    """The rows of a source and their word index"""
+
+    def __init__(self, usage_examples: DataframeUsageExamples = None):
+        from lexutils.models.dataframe_usage_examples import without_features
+        if usage_examples is None:
+            raise ValueError("usage_examples was None")
+        logger.info(f"Indexing the words of the {usage_examples.source.name.title()} dataframe")
+        self.dataframe = without_features(usage_examples.dataframe).reset_index(drop=True)
+        self.index = WordIndex(self.dataframe[usage_examples.target_column])
+
+    def find(self, representations: List[str] = None, min_words: int = None,
+             max_words: int = None, limit: int = None) -> Tuple[int, pd.DataFrame]:
+        """Return the number of matching rows and the best rows with up to limit
+        rows per representation with more than min_words and less than
+        max_words normalized words like config.min_word_count"""
+        if representations is None or min_words is None or max_words is None or limit is None:
+            raise ValueError("we did not get what we need")
+        matches, best = [], []
+        for representation in representations:
+            rows = self.index.find(representation)
+            word_counts = self.index.word_counts[rows]
+            rows = rows[(word_counts > min_words) & (word_counts < max_words)]
+            matches.append(rows)
+            best.append(rows[:limit])
+        number_of_matches = len(np.unique(np.concatenate(matches))) if len(matches) > 0 else 0
+        rows = np.unique(np.concatenate(best)) if len(best) > 0 else np.zeros(0, dtype=np.uint32)
+        return number_of_matches, self.dataframe.iloc[rows]
+
+
+def __rows_to_json__(rows: pd.DataFrame) -> Dict[str, list]:
+    columns = {}
+    for column in rows.columns:
+        series = rows[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            columns[column] = [None if pd.isna(value) else value.isoformat() for value in series]
+        else:
+            columns[column] = [None if value is None or value != value else value for value in series.tolist()]
+    return columns
+
+
+def __rows_from_json__(columns: Dict[str, list]) -> pd.DataFrame:
+    rows = pd.DataFrame(columns)
+    if "date" in rows.columns:
+        rows["date"] = pd.to_datetime(rows["date"])
+    return rows
+
+
+def create_server(usage_examples: List[DataframeUsageExamples] = None,
+                  host: str = None, port: int = None) -> ThreadingHTTPServer:
+    """Index the dataframes and create a server for them, call
+    serve_forever() on it to start answering requests"""
+    if usage_examples is None or host is None or port is None:
+        raise ValueError("we did not get what we need")
+    corpora: Dict[SupportedExampleSources, Corpus] = {
+        source.source: Corpus(usage_examples=source) for source in usage_examples
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self, status: int, data: Dict) -> None:
+            content = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self.respond(404, dict(error=f"{self.path} was not found"))
+                return
+            self.respond(200, dict(sources={source.name: len(corpus.dataframe)
+                                            for source, corpus in corpora.items()}))
+
+        def do_POST(self):
+            if self.path != "/find":
+                self.respond(404, dict(error=f"{self.path} was not found"))
+                return
+            try:
+                query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                corpus = corpora[SupportedExampleSources[query["source"]]]
+                number_of_matches, rows = corpus.find(representations=query["representations"],
+                                                      min_words=int(query["min_words"]),
+                                                      max_words=int(query["max_words"]),
+                                                      limit=int(query["limit"]))
+            except (KeyError, TypeError, ValueError) as error:
+                self.respond(400, dict(error=f"Bad query: {error}"))
+                return
+            self.respond(200, dict(number_of_matches=number_of_matches, rows=__rows_to_json__(rows)))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(host: str = None, port: int = None) -> None:
+    """Load the Swedish dataframes and answer requests until interrupted"""
+    from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+    from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+    server = create_server(usage_examples=[HistoricalJobAdsUsageExamples(), RiksdagenUsageExamples()],
+                           host=host or config.corpus_server_host, port=port or config.corpus_server_port)
+    logger.info(f"Serving the corpora at http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def check(url: str = None, source: SupportedExampleSources = None) -> None:
+    """Raise CorpusServerException if the server does not serve the source"""
+    import requests
+    if url is None or source is None:
+        raise ValueError("we did not get what we need")
+    try:
+        response = requests.get(f"{url}/health", timeout=timeout)
+        response.raise_for_status()
+        sources = response.json()["sources"]
+    except (requests.RequestException, ValueError, KeyError) as error:
+        raise CorpusServerException(f"The corpus server at {url} could not be reached: {error}")
+    if source.name not in sources:
+        raise CorpusServerException(f"The corpus server at {url} does not serve {source.name.title()}")
+
+
+def find(url: str = None, source: SupportedExampleSources = None, representations: List[str] = None,
+         min_words: int = None, max_words: int = None, limit: int = None) -> Tuple[int, pd.DataFrame]:
+    """Ask the server for the matching rows, see Corpus.find()"""
+    import requests
+    if url is None or source is None or representations is None:
+        raise ValueError("we did not get what we need")
+    try:
+        response = requests.post(f"{url}/find", timeout=timeout, json=dict(
+            source=source.name, representations=representations,
+            min_words=min_words, max_words=max_words, limit=limit
+        ))
+        response.raise_for_status()
+        result = response.json()
+    except (requests.RequestException, ValueError) as error:
+        raise CorpusServerException(f"The corpus server at {url} did not answer: {error}")
+    return result["number_of_matches"], __rows_from_json__(result["rows"])
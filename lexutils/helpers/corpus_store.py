@@ -0,0 +1,145 @@
+"""A read-only copy of a corpus dataframe in flat files that the
+worker processes memory map instead of getting the dataframe pickled
+
+Every column is stored in the directory as:
+numbers and dates: column.npy
+text: the UTF-8 encoded values in column.bin, each followed by a newline,
+and the byte offsets where they start in column.offsets.npy with
+column.nulls.npy marking the missing values if there are any
+
+The pages are shared by all the processes through the page cache, so
+the corpus is only in memory once whatever the number of workers."""
+import json
+import logging
+import mmap
+import os
+import re
+from collections import namedtuple
+from typing import Dict, Iterator, List, Pattern
+
+import numpy as np
+import pandas as pd
+
+from lexutils.helpers import matching
+
+logger = logging.getLogger(__name__)
+
+columns_file = "columns.json"
+separator = b"\n"
+
+
+def __is_array_column__(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+def export(dataframe: pd.DataFrame = None, directory: str = None) -> None:
+    """Write the columns of the dataframe to the directory"""
+    if dataframe is None or directory is None:
+        raise ValueError("we did not get what we need")
+    os.makedirs(directory, exist_ok=True)
+    for column in dataframe.columns:
+        series = dataframe[column]
+        if __is_array_column__(series):
+            np.save(os.path.join(directory, f"{column}.npy"), series.to_numpy())
+            continue
+        nulls = series.isna().to_numpy()
+        encoded = [b"" if null else str(value).encode("utf-8") + separator
+                   for value, null in zip(series, nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded)),
+                  out=offsets[1:])
+        with open(os.path.join(directory, f"{column}.bin"), "wb") as file:
+            file.write(b"".join(encoded))
+        np.save(os.path.join(directory, f"{column}.offsets.npy"), offsets)
+        if nulls.any():
+            np.save(os.path.join(directory, f"{column}.nulls.npy"), nulls)
+    with open(os.path.join(directory, columns_file), "w", encoding="utf-8") as file:
+        json.dump(dict(columns=list(dataframe.columns), rows=len(dataframe)), file)
+    logger.info(f"Exported {len(dataframe)} rows to {directory}")
+
+
+def compile_representations_as_bytes(representations: List[str]) -> Pattern:
+    """Compile a bytes pattern that matches at least everything the pattern
+    from matching.compile_representations() matches in the UTF-8 text
+
+    Bytes patterns only ignore the case of ASCII letters and only know
+    ASCII word characters, so the other letters get both cases spelled out
+    and a match can be next to a non-ASCII letter. The rows found with it
+    have to be checked with the real pattern."""
+    alternatives = []
+    for representation in sorted(set(representations), key=len, reverse=True):
+        characters = []
+        for character in representation:
+            if character.isascii():
+                characters.append(re.escape(character.encode("utf-8")))
+            else:
+                variants = sorted({character, character.lower(), character.upper()})
+                characters.append(b"(?:" + b"|".join(re.escape(variant.encode("utf-8"))
+                                                      for variant in variants) + b")")
+        alternatives.append(b"".join(characters))
+    return re.compile(rb"(?<!\w)(?:" + b"|".join(alternatives) + rb")(?!\w)", re.IGNORECASE)
+
+
+class CorpusStore:
+    """The columns written by export() memory mapped read-only"""
+
+    def __init__(self, directory: str = None):
+        if directory is None:
+            raise ValueError("directory was None")
+        with open(os.path.join(directory, columns_file), encoding="utf-8") as file:
+            metadata = json.load(file)
+        self.columns: List[str] = metadata["columns"]
+        self.number_of_rows: int = metadata["rows"]
+        self.Row = namedtuple("Row", self.columns, rename=True)
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.texts: Dict[str, mmap.mmap] = {}
+        self.offsets: Dict[str, np.ndarray] = {}
+        self.nulls: Dict[str, np.ndarray] = {}
+        for column in self.columns:
+            path = os.path.join(directory, column)
+            if os.path.exists(f"{path}.npy"):
+                self.arrays[column] = np.load(f"{path}.npy", mmap_mode="r")
+                continue
+            with open(f"{path}.bin", "rb") as file:
+                # mmap cannot map an empty file
+                self.texts[column] = (mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                                      if os.fstat(file.fileno()).st_size > 0 else b"")
+            self.offsets[column] = np.load(f"{path}.offsets.npy", mmap_mode="r")
+            if os.path.exists(f"{path}.nulls.npy"):
+                self.nulls[column] = np.load(f"{path}.nulls.npy", mmap_mode="r")
+
+    def __len__(self):
+        return self.number_of_rows
+
+    def value(self, column: str, index: int):
+        if column in self.arrays:
+            value = self.arrays[column][index]
+            if isinstance(value, np.datetime64):
+                return pd.Timestamp(value)
+            return value
+        if column in self.nulls and self.nulls[column][index]:
+            return None
+        offsets = self.offsets[column]
+        return self.texts[column][offsets[index]:offsets[index + 1] - len(separator)].decode("utf-8")
+
+    def row(self, index: int):
+        """The row like DataFrame.itertuples(index=False) returns it"""
+        return self.Row(*(self.value(column, index) for column in self.columns))
+
+    def find_rows(self, column: str = None, representations: List[str] = None) -> Iterator[int]:
+        """Yield the indexes of the rows where the text in the column contains any
+        of the representations as a whole word in ascending order
+
+        This is what Series.str.contains() does with the pattern from
+        matching.compile_representations() but on the memory mapped bytes."""
+        if column is None or representations is None:
+            raise ValueError("we did not get what we need")
+        pattern = matching.compile_representations(representations)
+        offsets = self.offsets[column]
+        last_row = -1
+        for match in compile_representations_as_bytes(representations).finditer(self.texts[column]):
+            row = int(np.searchsorted(offsets, match.start(), side="right")) - 1
+            if row != last_row:
+                last_row = row
+                if pattern.search(self.value(column, row)) is not None:
+                    yield row
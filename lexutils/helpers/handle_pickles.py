@@ -1,10 +1,12 @@
 import logging
 from os.path import exists
+from typing import Set
 
 import pandas as pd
 
 # This code is adapted from https://github.com/dpriskorn/WikidataMLSuggester
 from lexutils.config.enums import SupportedFormPickles
+from lexutils.helpers import backend
 
 logger = logging.getLogger(__name__)
 
@@ -34,15 +36,27 @@ def read_from_pickle(
         return (df['form_id'] == form_id).any()
 
 
+def read_form_ids(pickle: SupportedFormPickles = None) -> Set[str]:
+    """Return all the form ids in the pickle, to check many forms at once"""
+    if pickle is None:
+        raise ValueError("pickle was None")
+    if exists(pickle.value):
+        return set(pd.read_pickle(pickle.value)["form_id"])
+    return set()
+
+
 def add_to_pickle(
         pickle: SupportedFormPickles = None,
         form_id: str = None
 ) -> None:
     if form_id is None or pickle is None:
         raise ValueError("did not get all we need")
+    if backend.dry_run:
+        # Nothing was uploaded so we want to see the form again
+        return
     pickle_filename = pickle.value
     logger.debug(f"Adding to {pickle.name.title()}")
-    data = dict(form_id=form_id)
+    data = dict(form_id=str(form_id))
     if exists(pickle_filename):
         df = pd.read_pickle(pickle_filename)
         # This tests whether any row matches
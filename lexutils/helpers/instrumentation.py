@@ -0,0 +1,174 @@
+"""Lightweight instrumentation of the hot paths
+
+Wrap a stage in span() or decorate a function with timed() to add its
+wall time to the session totals and count cache hits and misses with
+count(). At the end of a session report() prints the breakdown by
+stage and source and export() writes it as JSON or as a Prometheus
+textfile depending on the file extension.
+
+Spans may be nested, e.g. WDQS queries during form parsing, so the
+stage totals can add up to more than the session wall time."""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from rich.table import Table
+
+from lexutils.helpers.console import console
+
+logger = logging.getLogger(__name__)
+
+# (stage, source) -> [calls, total seconds, max seconds]
+spans: Dict[Tuple[str, str], list] = {}
+# (name, source) -> count
+counters: Dict[Tuple[str, str], int] = {}
+session_start = time.perf_counter()
+lock = Lock()
+
+
+def __source_name__(source) -> str:
+    """Accept enums, e.g. SupportedExampleSources, as well as strings"""
+    if source is None:
+        return ""
+    return str(getattr(source, "name", source)).lower()
+
+
+def record_span(stage: str, seconds: float, source=None) -> None:
+    key = (stage, __source_name__(source))
+    with lock:
+        stats = spans.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+@contextmanager
+def span(stage: str, source=None) -> Iterator[None]:
+    """Time the block and add it to the stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start, source=source)
+
+
+def timed(stage: str, source=None) -> Callable:
+    """Decorator version of span()"""
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, source=source):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, source=None, increment: int = 1) -> None:
+    """Count an event, e.g. a cache hit or miss"""
+    key = (name, __source_name__(source))
+    with lock:
+        counters[key] = counters.get(key, 0) + increment
+
+
+def reset() -> None:
+    global session_start
+    with lock:
+        spans.clear()
+        counters.clear()
+        session_start = time.perf_counter()
+
+
+def summary() -> Dict:
+    """Return the spans and counters as plain data"""
+    with lock:
+        return dict(
+            wall_time_seconds=round(time.perf_counter() - session_start, 6),
+            spans=[
+                dict(stage=stage, source=source, calls=calls,
+                     total_seconds=round(total, 6), max_seconds=round(maximum, 6))
+                for (stage, source), (calls, total, maximum)
+                in sorted(spans.items(), key=lambda item: item[1][1], reverse=True)
+            ],
+            counters=[
+                dict(name=name, source=source, count=value)
+                for (name, source), value in sorted(counters.items())
+            ],
+        )
+
+
+def report() -> None:
+    """Print where the time went during this session"""
+    data = summary()
+    if len(data["spans"]) == 0 and len(data["counters"]) == 0:
+        return
+    wall_time = data["wall_time_seconds"]
+    table = Table(title=f"Session timings ({round(wall_time, 1)}s wall time)")
+    for column in ["Stage", "Source", "Calls", "Total (s)", "Max (s)", "Share"]:
+        table.add_column(column, justify="left" if column in ["Stage", "Source"] else "right")
+    for entry in data["spans"]:
+        share = entry["total_seconds"] / wall_time if wall_time > 0 else 0
+        table.add_row(entry["stage"], entry["source"], str(entry["calls"]),
+                      f"{entry['total_seconds']:.2f}", f"{entry['max_seconds']:.2f}",
+                      f"{share:.0%}")
+    console.print(table)
+    if len(data["counters"]) > 0:
+        table = Table(title="Counters")
+        for column in ["Name", "Source", "Count"]:
+            table.add_column(column, justify="right" if column == "Count" else "left")
+        for entry in data["counters"]:
+            table.add_row(entry["name"], entry["source"], str(entry["count"]))
+        console.print(table)
+
+
+def __prometheus_label__(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text() -> str:
+    """Render the summary in the Prometheus textfile format"""
+    data = summary()
+    lines = [
+        "# HELP lexutils_session_wall_time_seconds Wall time of the session",
+        "# TYPE lexutils_session_wall_time_seconds gauge",
+        f"lexutils_session_wall_time_seconds {data['wall_time_seconds']}",
+        "# HELP lexutils_stage_seconds_total Time spent per stage and source",
+        "# TYPE lexutils_stage_seconds_total counter",
+    ]
+    for entry in data["spans"]:
+        labels = (f'stage="{__prometheus_label__(entry["stage"])}",'
+                  f'source="{__prometheus_label__(entry["source"])}"')
+        lines.append(f"lexutils_stage_seconds_total{{{labels}}} {entry['total_seconds']}")
+    lines.extend([
+        "# HELP lexutils_stage_calls_total Number of calls per stage and source",
+        "# TYPE lexutils_stage_calls_total counter",
+    ])
+    for entry in data["spans"]:
+        labels = (f'stage="{__prometheus_label__(entry["stage"])}",'
+                  f'source="{__prometheus_label__(entry["source"])}"')
+        lines.append(f"lexutils_stage_calls_total{{{labels}}} {entry['calls']}")
+    lines.extend([
+        "# HELP lexutils_events_total Counted events, e.g. cache hits and misses",
+        "# TYPE lexutils_events_total counter",
+    ])
+    for entry in data["counters"]:
+        labels = (f'name="{__prometheus_label__(entry["name"])}",'
+                  f'source="{__prometheus_label__(entry["source"])}"')
+        lines.append(f"lexutils_events_total{{{labels}}} {entry['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path: Optional[str] = None) -> None:
+    """Write the summary to a .prom textfile or else to JSON"""
+    if path is None:
+        raise ValueError("path was None")
+    if path.endswith(".prom"):
+        text = prometheus_text()
+    else:
+        text = json.dumps(summary(), indent=2)
+    with open(path, "w") as file:
+        file.write(text)
+    logger.info(f"Wrote the session timings to {path}")
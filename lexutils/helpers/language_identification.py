@@ -0,0 +1,188 @@
+"""Language identification of the text we put in the corpora
+
+Choose the engine with config.language_identification_engine:
+
+ngram: a naive Bayes classifier over character 1-3 grams. The offline
+model is built from the n-gram profiles bundled with langdetect and
+restricted to config.language_identification_languages. It is
+deterministic and scores a whole batch of texts with numpy at once.
+langdetect: the original engine, seeded with config.language_identification_seed
+so the results are reproducible. It is much slower.
+
+Add an engine by decorating a function that takes a list of texts and
+returns a list of language codes with @register("name").
+
+The converters check the language of a whole document first and only
+check the sentences one by one in documents where the parts disagree."""
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lexutils.config import config
+
+logger = logging.getLogger(__name__)
+
+mixed = "mixed"
+engines: Dict[str, Callable[[List[str]], List[Optional[str]]]] = {}
+# Texts with fewer letters than this are not identified
+minimum_number_of_letters = 10
+# The n-gram engine only looks at the start of long texts
+maximum_text_length = 1000
+paragraph_pattern = re.compile(r"\n\s*\n|\n")
+letters_pattern = re.compile(r"[^\W\d_]+")
+
+
+def register(name: str) -> Callable:
+    def decorator(function: Callable[[List[str]], List[Optional[str]]]) -> Callable:
+        engines[name] = function
+        return function
+    return decorator
+
+
+def __has_enough_letters__(text: str) -> bool:
+    return sum(len(word) for word in letters_pattern.findall(text)) >= minimum_number_of_letters
+
+
+@lru_cache(maxsize=4)
+def __ngram_model__(languages: Tuple[str, ...]) -> Tuple[Dict[str, int], np.ndarray]:
+    """Build the vocabulary and the log probability of every n-gram per language"""
+    import langdetect
+    profiles_directory = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+    profiles = []
+    for language in languages:
+        with open(os.path.join(profiles_directory, language), encoding="utf-8") as file:
+            profiles.append(json.load(file))
+    vocabulary: Dict[str, int] = {}
+    for profile in profiles:
+        for gram in profile["freq"]:
+            vocabulary.setdefault(gram, len(vocabulary))
+    counts = np.zeros((len(vocabulary), len(languages)), dtype=np.float64)
+    totals = np.zeros((len(vocabulary), len(languages)), dtype=np.float64)
+    for column, profile in enumerate(profiles):
+        for gram, frequency in profile["freq"].items():
+            counts[vocabulary[gram], column] = frequency
+        gram_lengths = np.array([len(gram) for gram in vocabulary])
+        totals[:, column] = np.array(profile["n_words"], dtype=np.float64)[gram_lengths - 1]
+    # Add-one smoothing so a gram that is missing in a profile does not rule out the language
+    log_probabilities = np.log((counts + 1) / (totals + len(vocabulary))).astype(np.float32)
+    return vocabulary, log_probabilities
+
+
+@lru_cache(maxsize=2 ** 18)
+def __word_gram_ids__(word: str, languages: Tuple[str, ...]) -> Tuple[int, ...]:
+    # Like langdetect we pad the word with spaces, never let a gram
+    # span two words and ignore the grams that are not in the model
+    vocabulary, _ = __ngram_model__(languages)
+    padded = f" {word} "
+    ids = []
+    for length in (1, 2, 3):
+        for start in range(len(padded) - length + 1):
+            gram_id = vocabulary.get(padded[start:start + length])
+            if gram_id is not None:
+                ids.append(gram_id)
+    return tuple(ids)
+
+
+def __gram_ids__(text: str, languages: Tuple[str, ...]) -> List[int]:
+    ids: List[int] = []
+    for word in text[:maximum_text_length].split():
+        ids.extend(__word_gram_ids__(word, languages))
+    return ids
+
+
+@register("ngram")
+def ngram_engine(texts: List[str]) -> List[Optional[str]]:
+    languages = tuple(config.language_identification_languages)
+    _, log_probabilities = __ngram_model__(languages)
+    ids: List[int] = []
+    starts = []
+    for text in texts:
+        starts.append(len(ids))
+        if __has_enough_letters__(text):
+            ids.extend(__gram_ids__(text, languages))
+    if len(ids) == 0:
+        return [None] * len(texts)
+    starts = np.array(starts, dtype=np.int64)
+    sums = np.add.reduceat(log_probabilities[np.array(ids)], np.minimum(starts, len(ids) - 1), axis=0)
+    # reduceat returns a row of the next text for texts without grams
+    without_grams = np.diff(starts, append=len(ids)) == 0
+    best = sums.argmax(axis=1)
+    return [None if without_grams[index] else languages[best[index]] for index in range(len(texts))]
+
+
+@register("langdetect")
+def langdetect_engine(texts: List[str]) -> List[Optional[str]]:
+    import langdetect
+    from langdetect import DetectorFactory, LangDetectException
+    DetectorFactory.seed = config.language_identification_seed
+    languages = []
+    for text in texts:
+        try:
+            languages.append(langdetect.detect(text) if __has_enough_letters__(text) else None)
+        except LangDetectException:
+            languages.append(None)
+    return languages
+
+
+def detect_batch(texts: Sequence[str], engine: str = None) -> List[Optional[str]]:
+    """Return the language code of every text or None if it could not be identified"""
+    if engine is None:
+        engine = config.language_identification_engine
+    if engine not in engines:
+        raise ValueError(f"Unknown engine '{engine}', choose one of {list(engines)}")
+    return engines[engine](list(texts))
+
+
+def detect(text: str, engine: str = None) -> Optional[str]:
+    return detect_batch([text], engine=engine)[0]
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in paragraph_pattern.split(text) if paragraph.strip() != ""]
+
+
+def document_language(parts: Sequence[str], engine: str = None) -> Optional[str]:
+    """Identify the language of a document from its paragraphs or other parts
+
+    Returns mixed if the parts are in different languages
+    and None if no part could be identified"""
+    languages = {language for language in detect_batch(parts, engine=engine) if language is not None}
+    if len(languages) == 0:
+        return None
+    if len(languages) > 1:
+        return mixed
+    return languages.pop()
+
+
+def filter_sentences(sentences: Sequence[str],
+                     language_code: str = None,
+                     engine: str = None) -> List[str]:
+    """Keep the sentences in the language, checking them one by one"""
+    if language_code is None:
+        raise ValueError("language_code was None")
+    return [sentence for sentence, language in zip(sentences, detect_batch(sentences, engine=engine))
+            if language == language_code]
+
+
+def select_sentences_in_language(sentences: Sequence[str],
+                                 language_code: str = None,
+                                 engine: str = None) -> List[str]:
+    """Keep the sentences of a document that are in the language
+
+    The sentences are checked in groups of config.language_identification_window
+    and only one by one if the groups are in different languages"""
+    if language_code is None:
+        raise ValueError("language_code was None")
+    window = config.language_identification_window
+    groups = [" ".join(sentences[start:start + window]) for start in range(0, len(sentences), window)]
+    language = document_language(groups, engine=engine)
+    if language == language_code:
+        return list(sentences)
+    if language == mixed:
+        return filter_sentences(sentences, language_code=language_code, engine=engine)
+    return []
@@ -0,0 +1,409 @@
+"""Answer the form and count queries from a local index of a Wikidata
+lexeme dump instead of WDQS
+
+For the big languages the query for the forms without an example and the
+count queries in Lexemes come close to the WDQS timeout. Ingest a dump
+from https://dumps.wikimedia.org/wikidatawiki/entities/ with
+
+python lexutils.py ingest latest-lexemes.json.bz2
+
+and set lexeme_dump_index in config.py. The page of forms, the counts and
+the senses of the prepare command then come from the index and have the
+same shape as the WDQS results, so the rest of LexUtils does not know the
+difference. The index is as fresh as the dump, the work allocation keeps
+two sessions from getting the same forms anyway.
+
+The dump is read one entity per line, so the memory used does not grow with
+the size of the dump. Decompression runs in a separate process with pigz,
+lbzip2 or pbzip2 if one of them is installed, or else in a thread, so it
+runs at the same time as the parsing. The index is written to a temporary
+file that replaces the old index when the ingestion is done, so a session
+never sees half an index."""
+import bz2
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lexutils.config import config
+from lexutils.models.wikidata.entity_id import EntityID
+
+logger = logging.getLogger(__name__)
+
+index: Optional["LexemeIndex"] = None
+# Entities written to the index in one transaction
+batch_size = 1000
+# Bytes read at a time by the decompression thread
+block_size = 1 << 20
+# Blocks the decompression thread can be ahead of the parsing
+queued_blocks = 16
+# Tried in order, the first one installed is used
+parallel_decompressors = {
+    ".gz": [["pigz", "-dc"]],
+    ".bz2": [["lbzip2", "-dc"], ["pbzip2", "-dc"]],
+}
+openers = {".gz": gzip.open, ".bz2": bz2.open}
+# SQLite allows 999 parameters in a query in older versions
+parameters_per_query = 500
+
+
+def __decompress_with_process__(command: List[str], path: str) -> Iterator[bytes]:
+    process = subprocess.Popen(command + [path], stdout=subprocess.PIPE)
+    try:
+        yield from process.stdout
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            # We stopped reading before the end
+            process.terminate()
+        process.wait()
+    # Only reached if we read to the end
+    if process.returncode != 0:
+        raise OSError(f"{command[0]} could not decompress {path}")
+
+
+def __decompress_with_thread__(path: str) -> Iterator[bytes]:
+    extension = os.path.splitext(path)[1]
+    blocks: queue.Queue = queue.Queue(maxsize=queued_blocks)
+    stop = threading.Event()
+
+    def read():
+        try:
+            with openers.get(extension, open)(path, "rb") as file:
+                while not stop.is_set():
+                    block = file.read(block_size)
+                    if len(block) == 0:
+                        break
+                    blocks.put(block)
+        except BaseException as error:
+            blocks.put(error)
+        blocks.put(None)
+
+    threading.Thread(target=read, name="dump decompression", daemon=True).start()
+    rest = b""
+    try:
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            if isinstance(block, BaseException):
+                raise block
+            lines = (rest + block).split(b"\n")
+            rest = lines.pop()
+            yield from lines
+        if len(rest) > 0:
+            yield rest
+    finally:
+        stop.set()
+        # Unblock the thread if the queue is full
+        while not blocks.empty():
+            blocks.get_nowait()
+
+
+def read_lines(path: str = None) -> Iterator[bytes]:
+    """Yield the lines of the dump which can be gzip or bzip2 compressed"""
+    if path is None:
+        raise ValueError("path was None")
+    for command in parallel_decompressors.get(os.path.splitext(path)[1], []):
+        if shutil.which(command[0]) is not None:
+            logger.info(f"Decompressing {path} with {command[0]}")
+            return __decompress_with_process__(command, path)
+    return __decompress_with_thread__(path)
+
+
+def read_entities(path: str = None) -> Iterator[Dict]:
+    """Yield the entities of a dump with one entity per line
+
+    The dumps are a JSON array with the entities on lines of their own,
+    so the brackets and the commas after the entities are skipped."""
+    for line in read_lines(path):
+        line = line.strip()
+        if line in (b"", b"[", b"]"):
+            continue
+        yield json.loads(line[:-1] if line.endswith(b",") else line)
+
+
+def __number__(entity_id: str) -> int:
+    """The number after the last letter of the id in the dump
+
+    The ids in the dump are not parsed with EntityID because
+    there are millions of them and EntityID keeps them all."""
+    return int(entity_id[entity_id.rfind("-") + 2:] if "-" in entity_id else entity_id[1:])
+
+
+def __truthy__(statements: List[Dict]) -> List[Dict]:
+    """The statements wdt: would return, deprecated ones are left out"""
+    return [statement for statement in statements if statement.get("rank") != "deprecated"]
+
+
+def __entity_id__(snak: Dict) -> Optional[str]:
+    """The id of the entity in the value of the snak, None if it has
+    some value or no value"""
+    if "datavalue" not in snak:
+        return None
+    return snak["datavalue"]["value"]["id"]
+
+
+def extract_rows(lexeme: Dict = None) -> Tuple[tuple, List[tuple], List[tuple], List[tuple], List[tuple]]:
+    """Return the rows of the lexeme for each table of the index"""
+    if lexeme is None:
+        raise ValueError("lexeme was None")
+    number = __number__(lexeme["id"])
+    lexeme_row = (number, lexeme["language"], lexeme["lexicalCategory"])
+    forms = []
+    for form in lexeme.get("forms", []):
+        features = ",".join(form.get("grammaticalFeatures", []))
+        for representation in form.get("representations", {}).values():
+            forms.append((number, __number__(form["id"]), form["id"], representation["value"], features))
+    senses, glosses = [], []
+    for sense in lexeme.get("senses", []):
+        statements = __truthy__(sense.get("claims", {}).get("P5137", []))
+        items = [item for item in (__entity_id__(statement["mainsnak"]) for statement in statements)
+                 if item is not None]
+        # Some value counts too like [] in the query
+        senses.append((sense["id"], number, ",".join(items) if len(statements) > 0 else None))
+        for gloss in sense.get("glosses", {}).values():
+            glosses.append((sense["id"], gloss["language"], gloss["value"]))
+    examples = []
+    for statement in lexeme.get("claims", {}).get("P5831", []):
+        qualifiers = statement.get("qualifiers", {})
+        # Like in the query the example has to demonstrate both a sense and a form
+        form_ids = ([__entity_id__(snak) for snak in qualifiers["P5830"]]
+                    if "P6072" in qualifiers and "P5830" in qualifiers else [])
+        for form_id in [form_id for form_id in form_ids if form_id is not None] or [None]:
+            examples.append((number, form_id, statement.get("rank") != "deprecated"))
+    return lexeme_row, forms, senses, glosses, examples
+
+
+def __create_tables__(connection: sqlite3.Connection) -> None:
+    connection.executescript("""
+        CREATE TABLE lexemes (
+            number INTEGER PRIMARY KEY,
+            language TEXT NOT NULL,
+            category TEXT NOT NULL
+        );
+        CREATE TABLE forms (
+            lexeme INTEGER NOT NULL,
+            number INTEGER NOT NULL,
+            form_id TEXT NOT NULL,
+            representation TEXT NOT NULL,
+            features TEXT NOT NULL
+        );
+        -- items is the comma separated P5137 values, NULL if the sense has none
+        CREATE TABLE senses (
+            sense_id TEXT PRIMARY KEY,
+            lexeme INTEGER NOT NULL,
+            items TEXT
+        );
+        CREATE TABLE glosses (
+            sense_id TEXT NOT NULL,
+            language TEXT NOT NULL,
+            gloss TEXT NOT NULL
+        );
+        -- form_id is NULL for the P5831 statements that do not demonstrate a form
+        CREATE TABLE examples (
+            lexeme INTEGER NOT NULL,
+            form_id TEXT,
+            truthy INTEGER NOT NULL
+        );
+        CREATE TABLE metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );""")
+
+
+def __create_indexes__(connection: sqlite3.Connection) -> None:
+    # Creating the indexes after the inserts is much faster than keeping them up to date
+    connection.executescript("""
+        CREATE INDEX lexemes_language ON lexemes (language, number);
+        CREATE INDEX forms_lexeme ON forms (lexeme, number);
+        CREATE INDEX senses_lexeme ON senses (lexeme);
+        CREATE INDEX glosses_sense ON glosses (sense_id);
+        CREATE INDEX examples_lexeme ON examples (lexeme);""")
+
+
+def ingest(dump_path: str = None, index_path: str = None, languages: List[str] = None) -> int:
+    """Write the lexemes of the dump to the index and return how many there were
+
+    With languages only the lexemes in those languages (QIDs) are kept."""
+    if dump_path is None or index_path is None:
+        raise ValueError("we did not get what we need")
+    temporary_path = f"{index_path}.tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    connection = sqlite3.connect(temporary_path)
+    try:
+        # The temporary file is thrown away if we crash so there is nothing to protect
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        __create_tables__(connection)
+        number_of_lexemes = 0
+        start = time.time()
+        batch: List[Tuple] = []
+
+        def write():
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO lexemes VALUES (?, ?, ?)",
+                                       [rows[0] for rows in batch])
+                connection.executemany("INSERT INTO forms VALUES (?, ?, ?, ?, ?)",
+                                       [row for rows in batch for row in rows[1]])
+                connection.executemany("INSERT OR REPLACE INTO senses VALUES (?, ?, ?)",
+                                       [row for rows in batch for row in rows[2]])
+                connection.executemany("INSERT INTO glosses VALUES (?, ?, ?)",
+                                       [row for rows in batch for row in rows[3]])
+                connection.executemany("INSERT INTO examples VALUES (?, ?, ?)",
+                                       [row for rows in batch for row in rows[4]])
+            batch.clear()
+
+        for entity in read_entities(dump_path):
+            if entity.get("type") != "lexeme":
+                continue
+            if languages is not None and entity["language"] not in languages:
+                continue
+            batch.append(extract_rows(entity))
+            number_of_lexemes += 1
+            if len(batch) == batch_size:
+                write()
+                if number_of_lexemes % (batch_size * 100) == 0:
+                    logger.info(f"Ingested {number_of_lexemes} lexemes "
+                                f"({round(number_of_lexemes / (time.time() - start))}/s)")
+        write()
+        __create_indexes__(connection)
+        with connection:
+            connection.executemany("INSERT INTO metadata VALUES (?, ?)", [
+                ("dump", os.path.abspath(dump_path)),
+                ("ingested_at", str(time.time())),
+                ("lexemes", str(number_of_lexemes)),
+            ])
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    os.replace(temporary_path, index_path)
+    logger.info(f"Ingested {number_of_lexemes} lexemes from {dump_path} into {index_path} "
+                f"in {round(time.time() - start)}s")
+    return number_of_lexemes
+
+
+class LexemeIndex:
+    """The index written by ingest() opened read-only
+
+    The results have the shape of the WDQS results of the queries they replace."""
+
+    def __init__(self, path: str = None):
+        if path is None:
+            raise ValueError("path was None")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"The lexeme dump index {path} was not found, "
+                                    f"create it with 'python lexutils.py ingest DUMP'")
+        self.path = path
+        # The sessions only read so one connection can be shared by the threads
+        self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def __query__(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def metadata(self) -> Dict[str, str]:
+        return dict(self.__query__("SELECT key, value FROM metadata"))
+
+    def forms_without_an_example(self, language_qid: str = None, number_of_forms: int = None,
+                                 after: Optional[str] = None, shard: int = 0,
+                                 shards: int = 1) -> List[Dict]:
+        """The bindings of lexemes.forms_without_an_example_query()"""
+        if language_qid is None or number_of_forms is None:
+            raise ValueError("we did not get what we need")
+        after = EntityID(after) if after is not None else None
+        number, form_number = (after.number, after.sub_number) if after is not None else (0, 0)
+        rows = self.__query__("""
+            SELECT forms.lexeme, forms.form_id, forms.representation, lexemes.category, forms.features
+            FROM lexemes JOIN forms ON forms.lexeme = lexemes.number
+            WHERE lexemes.language = ?
+              -- The first condition lets SQLite start at the cursor in the index
+              AND lexemes.number >= ?
+              AND (lexemes.number > ? OR (lexemes.number = ? AND forms.number > ?))
+              AND lexemes.number % ? = ?
+              AND forms.features != ''
+              AND EXISTS (SELECT 1 FROM senses
+                          WHERE senses.lexeme = lexemes.number AND senses.items IS NOT NULL)
+              AND NOT EXISTS (SELECT 1 FROM examples
+                              WHERE examples.lexeme = lexemes.number AND examples.form_id IS NOT NULL)
+            ORDER BY lexemes.number, forms.number
+            LIMIT ?""", (language_qid, number, number, number, form_number, shards, shard, number_of_forms))
+        prefix = config.wd_prefix
+        return [dict(
+            lexeme=dict(value=f"{prefix}L{lexeme}"),
+            form=dict(value=f"{prefix}{form_id}"),
+            form_representation=dict(value=representation),
+            category=dict(value=f"{prefix}{category}"),
+            grammatical_features=dict(value=",".join(f"{prefix}{feature}" for feature in features.split(","))),
+        ) for lexeme, form_id, representation, category, features in rows]
+
+    def count_lexemes(self, language_qid: str = None) -> int:
+        if language_qid is None:
+            raise ValueError("language_qid was None")
+        return self.__query__("SELECT COUNT(*) FROM lexemes WHERE language = ?", (language_qid,))[0][0]
+
+    def count_senses_with_p5137(self, language_qid: str = None) -> int:
+        """The senses with a gloss and P5137, each sense is counted once"""
+        if language_qid is None:
+            raise ValueError("language_qid was None")
+        return self.__query__("""
+            SELECT COUNT(*) FROM lexemes JOIN senses ON senses.lexeme = lexemes.number
+            WHERE lexemes.language = ? AND senses.items IS NOT NULL
+              AND EXISTS (SELECT 1 FROM glosses WHERE glosses.sense_id = senses.sense_id)""",
+                              (language_qid,))[0][0]
+
+    def count_forms_without_an_example(self, language_qid: str = None) -> int:
+        """The forms of the lexemes with a sense with P5137 and without
+        P5831, each form is counted once"""
+        if language_qid is None:
+            raise ValueError("language_qid was None")
+        return self.__query__("""
+            SELECT COUNT(DISTINCT forms.form_id) FROM lexemes JOIN forms ON forms.lexeme = lexemes.number
+            WHERE lexemes.language = ?
+              AND EXISTS (SELECT 1 FROM senses
+                          WHERE senses.lexeme = lexemes.number AND senses.items IS NOT NULL)
+              AND NOT EXISTS (SELECT 1 FROM examples
+                              WHERE examples.lexeme = lexemes.number AND examples.truthy)""",
+                              (language_qid,))[0][0]
+
+    def glosses(self, lexeme_ids: List[str] = None, languages: List[str] = None) -> List[Dict]:
+        """The bindings of the query in form.fetch_senses_of_lexemes()"""
+        if lexeme_ids is None or languages is None:
+            raise ValueError("we did not get what we need")
+        prefix = config.wd_prefix
+        bindings = []
+        numbers = [EntityID(lexeme_id).number for lexeme_id in lexeme_ids]
+        for start in range(0, len(numbers), parameters_per_query):
+            batch = numbers[start:start + parameters_per_query]
+            rows = self.__query__(f"""
+                SELECT senses.lexeme, senses.sense_id, glosses.gloss, glosses.language
+                FROM senses JOIN glosses ON glosses.sense_id = senses.sense_id
+                WHERE senses.lexeme IN ({",".join("?" * len(batch))})
+                  AND glosses.language IN ({",".join("?" * len(languages))})
+                ORDER BY senses.lexeme, senses.sense_id""", tuple(batch) + tuple(languages))
+            bindings.extend(dict(
+                lexeme=dict(value=f"{prefix}L{lexeme}"),
+                sense=dict(value=f"{prefix}{sense_id}"),
+                gloss=dict(value=gloss),
+                language=dict(value=language),
+            ) for lexeme, sense_id, gloss, language in rows)
+        return bindings
+
+
+def get_index() -> Optional[LexemeIndex]:
+    """The index in config.lexeme_dump_index or None to use WDQS"""
+    global index
+    if config.lexeme_dump_index is None:
+        return None
+    if index is None or index.path != config.lexeme_dump_index:
+        index = LexemeIndex(path=config.lexeme_dump_index)
+    return index
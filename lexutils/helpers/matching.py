@@ -0,0 +1,27 @@
+import re
+from typing import Dict, List, Pattern, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from lexutils.models.wikidata.form import Form
+
+# This is used to search the corpora once per lexeme instead of once per form
+
+
+def group_forms_by_lexeme(forms: List["Form"]) -> Dict[str, List["Form"]]:
+    """Group the forms by lexeme id keeping the order they came in"""
+    groups: Dict[str, List["Form"]] = {}
+    for form in forms:
+        groups.setdefault(form.lexeme_id, []).append(form)
+    return groups
+
+
+def compile_representations(representations: List[str]) -> Pattern:
+    """Compile one pattern that matches any of the representations as a whole word
+
+    The longest representations come first so the regex engine
+    prefers e.g. "husen" over "hus" at the same position."""
+    alternatives = sorted(set(representations), key=len, reverse=True)
+    return re.compile(
+        r"(?<!\w)(?:" + "|".join(re.escape(alternative) for alternative in alternatives) + r")(?!\w)",
+        re.IGNORECASE
+    )
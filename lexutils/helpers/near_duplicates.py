@@ -0,0 +1,134 @@
+"""Near duplicate detection of sentences with SimHash
+
+The fingerprint of a sentence is a 64 bit SimHash of its lowercased words
+and word pairs, ignoring digits and punctuation. Sentences that only
+differ in a few words get fingerprints that only differ in a few bits.
+
+NearDuplicateIndex splits the fingerprints into max_distance + 1 bands.
+Two fingerprints within max_distance bits of each other have at least
+one identical band, so we only compare against the fingerprints that
+share a band instead of all of them."""
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+import numpy as np
+from pandas import DataFrame
+
+from lexutils.config import config
+
+logger = logging.getLogger(__name__)
+
+fingerprint_column = "fingerprint"
+word_pattern = re.compile(r"[^\W\d_]+")
+# The number of sentences hashed at once, this limits the memory used
+batch_size = 5000
+
+
+@lru_cache(maxsize=2 ** 20)
+def __hash_feature__(feature: str) -> int:
+    # The built-in hash() differs between processes so we cannot store it
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+def __feature_hashes__(text: str) -> List[int]:
+    words = word_pattern.findall(text.lower())
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return [__hash_feature__(feature) for feature in features]
+
+
+def __fingerprint_batch__(texts: List[str]) -> np.ndarray:
+    hashes: List[int] = []
+    starts = []
+    for text in texts:
+        starts.append(len(hashes))
+        hashes.extend(__feature_hashes__(text))
+    if len(hashes) == 0:
+        return np.zeros(len(texts), dtype="<u8")
+    bits = np.unpackbits(
+        np.array(hashes, dtype="<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+    )
+    # Every feature votes +1 or -1 on every bit
+    starts = np.array(starts, dtype=np.int64)
+    sums = np.add.reduceat(bits.astype(np.int8) * 2 - 1, np.minimum(starts, len(hashes) - 1),
+                           axis=0, dtype=np.int32)
+    # reduceat returns a row of the next sentence for sentences without features
+    without_features = np.diff(starts, append=len(hashes)) == 0
+    sums[without_features] = 0
+    return np.packbits(sums > 0, axis=1, bitorder="little").view("<u8").ravel()
+
+
+def fingerprints(texts: Iterable[str]) -> np.ndarray:
+    """Compute the fingerprints of many texts at once"""
+    texts = list(texts)
+    batches = [__fingerprint_batch__(texts[start:start + batch_size])
+               for start in range(0, len(texts), batch_size)]
+    if len(batches) == 0:
+        return np.array([], dtype=np.uint64)
+    return np.concatenate(batches).astype(np.uint64)
+
+
+def fingerprint(text: str) -> int:
+    return int(fingerprints([text])[0])
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+class NearDuplicateIndex:
+    """The fingerprints of the sentences kept so far"""
+    __slots__ = ("max_distance", "masks", "bands", "number_of_duplicates")
+
+    def __init__(self, max_distance: int = None):
+        if max_distance is None:
+            raise ValueError("max_distance was None")
+        self.max_distance = max_distance
+        number_of_bands = max_distance + 1
+        boundaries = [64 * band // number_of_bands for band in range(number_of_bands + 1)]
+        self.masks = [((1 << (end - start)) - 1) << start
+                      for start, end in zip(boundaries, boundaries[1:])]
+        self.bands: List[Dict[int, List[int]]] = [{} for _ in self.masks]
+        self.number_of_duplicates = 0
+
+    def is_near_duplicate(self, fingerprint: int) -> bool:
+        for mask, band in zip(self.masks, self.bands):
+            for other in band.get(fingerprint & mask, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return True
+        return False
+
+    def add_if_new(self, fingerprint: int) -> bool:
+        """Add the fingerprint unless it is a near duplicate of one we already have
+
+        Returns whether it was added"""
+        if self.is_near_duplicate(fingerprint):
+            self.number_of_duplicates += 1
+            return False
+        for mask, band in zip(self.masks, self.bands):
+            band.setdefault(fingerprint & mask, []).append(fingerprint)
+        return True
+
+
+def add_fingerprints(dataframe: DataFrame, target_column: str = "sentence") -> DataFrame:
+    if fingerprint_column in dataframe.columns:
+        return dataframe
+    return dataframe.assign(**{fingerprint_column: fingerprints(dataframe[target_column])})
+
+
+def drop_near_duplicates(dataframe: DataFrame,
+                         target_column: str = "sentence",
+                         max_distance: int = None) -> DataFrame:
+    """Keep the first of every group of near duplicate rows
+
+    Sort the rows best first before calling this. The fingerprints are
+    added as a column so they do not have to be computed again."""
+    if max_distance is None:
+        max_distance = config.near_duplicate_max_distance_in_corpus
+    dataframe = add_fingerprints(dataframe, target_column)
+    index = NearDuplicateIndex(max_distance=max_distance)
+    keep = [index.add_if_new(int(value)) for value in dataframe[fingerprint_column]]
+    logger.info(f"Dropped {index.number_of_duplicates} near duplicates of {len(dataframe)} rows")
+    return dataframe[keep].reset_index(drop=True)
@@ -0,0 +1,62 @@
+from typing import Dict, List, Tuple
+
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+# This is used by all sources to find out whether a form appears in a text.
+# We lower the text, replace all punctuation with spaces and split it into words.
+# We measured str.translate with the table of the language and a precompiled
+# regex too (see benchmarks/normalizer.py). In CPython translate looks up every
+# character of a non-ASCII text in the table and is about 3 times slower than
+# replacing only the characters that are present, because the membership tests
+# run as C-level scans. The tables are used where a whole column is translated.
+
+# Punctuation that separates words in all languages
+punctuation = ".,!?:;„“”»«`´$€\n"
+# Additional punctuation that separates words in a certain language
+language_punctuation: Dict[WikimediaLanguageCode, str] = {
+    WikimediaLanguageCode.DANISH: "›‹",
+    WikimediaLanguageCode.GERMAN: "‚‘›‹",
+    WikimediaLanguageCode.FRENCH: "‹›",
+}
+# Quotation marks are removed from the sentences we present to the user
+quotation_marks = "„“»"
+
+separators: Dict[WikimediaLanguageCode, Tuple[str, ...]] = {}
+translation_tables: Dict[WikimediaLanguageCode, Dict[int, str]] = {}
+
+
+def language_separators(language_code: WikimediaLanguageCode = None) -> Tuple[str, ...]:
+    if language_code not in separators:
+        separators[language_code] = tuple(punctuation + language_punctuation.get(language_code, ""))
+    return separators[language_code]
+
+
+def translation_table(language_code: WikimediaLanguageCode = None) -> Dict[int, str]:
+    """The str.translate table that replaces the separators with spaces"""
+    if language_code not in translation_tables:
+        translation_tables[language_code] = str.maketrans(
+            {separator: " " for separator in language_separators(language_code)}
+        )
+    return translation_tables[language_code]
+
+
+def normalize(text: str, language_code: WikimediaLanguageCode = None) -> str:
+    """Lower the text and replace punctuation with spaces"""
+    text = text.lower()
+    for char in language_separators(language_code):
+        if char in text:
+            text = text.replace(char, " ")
+    return text
+
+
+def tokenize(text: str, language_code: WikimediaLanguageCode = None) -> List[str]:
+    """Return the normalized words of the text"""
+    return normalize(text, language_code).split()
+
+
+def remove_quotation_marks(sentence: str) -> str:
+    """Clean the sentence so it looks better"""
+    for char in quotation_marks:
+        if char in sentence:
+            sentence = sentence.replace(char, " ")
+    return sentence.strip()
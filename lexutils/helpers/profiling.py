@@ -0,0 +1,158 @@
+"""Opt-in profiling of the interactive session
+
+start() runs either cProfile or a sampling profiler that reads the
+stack of the main thread from a background thread. Anything that waits
+for the user is wrapped in paused() so think time in the prompts and
+menus does not show up in the profile. stop() writes the output:
+
+cprofile: session.prof for e.g. snakeviz or flameprof
+sampling: session.folded with folded stacks for flamegraph.pl or speedscope
+
+Both modes also write summary.txt with the top functions by cumulative time."""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from os.path import basename
+from typing import Iterator, Optional
+
+from lexutils.config import config
+from lexutils.helpers.console import console
+
+logger = logging.getLogger(__name__)
+
+modes = ["cprofile", "sampling"]
+number_of_top_functions = 30
+active_profiler: Optional[cProfile.Profile] = None
+sampler: Optional["Sampler"] = None
+pause_depth = 0
+
+
+class Sampler(threading.Thread):
+    """Sample the stack of a thread at a fixed interval"""
+    stacks: Counter
+    paused: bool = False
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="lexutils-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+
+    @staticmethod
+    def __frame_name__(frame) -> str:
+        code = frame.f_code
+        # Semicolons separate the frames in the folded format
+        return f"{code.co_name} ({basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            if self.paused:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self.__frame_name__(frame))
+                frame = frame.f_back
+            if len(stack) > 0:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items())
+
+    def summary(self) -> str:
+        """Top functions by inclusive and self samples"""
+        total = sum(self.stacks.values())
+        inclusive: Counter = Counter()
+        exclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            # Count recursive functions only once per stack
+            for name in set(stack):
+                inclusive[name] += count
+            exclusive[stack[-1]] += count
+        lines = [f"{total} samples taken every {self.interval * 1000:g} ms, "
+                 f"top {number_of_top_functions} functions by cumulative samples",
+                 f"{'cumulative':>10} {'self':>10}  function"]
+        for name, count in inclusive.most_common(number_of_top_functions):
+            lines.append(f"{count / total:>10.1%} {exclusive[name] / total:>10.1%}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+def start(mode: str = "cprofile") -> None:
+    global active_profiler, sampler
+    if mode not in modes:
+        raise ValueError(f"mode has to be one of {modes}")
+    if active_profiler is not None or sampler is not None:
+        raise ValueError("the profiler was already started")
+    if mode == "cprofile":
+        active_profiler = cProfile.Profile()
+        active_profiler.enable()
+    else:
+        sampler = Sampler(thread_id=threading.get_ident(),
+                          interval=config.profiling_sample_interval)
+        sampler.start()
+    logger.info(f"Started profiling using {mode}")
+
+
+@contextmanager
+def paused() -> Iterator[None]:
+    """Exclude the block, e.g. waiting for input, from the profile"""
+    global pause_depth
+    pause_depth += 1
+    if pause_depth == 1:
+        if active_profiler is not None:
+            active_profiler.disable()
+        if sampler is not None:
+            sampler.paused = True
+    try:
+        yield
+    finally:
+        pause_depth -= 1
+        if pause_depth == 0:
+            if active_profiler is not None:
+                active_profiler.enable()
+            if sampler is not None:
+                sampler.paused = False
+
+
+def stop(output_directory: str = None) -> None:
+    """Stop the profiler and write the output files"""
+    global active_profiler, sampler
+    if output_directory is None:
+        raise ValueError("output_directory was None")
+    os.makedirs(output_directory, exist_ok=True)
+    summary_path = os.path.join(output_directory, "summary.txt")
+    if active_profiler is not None:
+        active_profiler.disable()
+        profile_path = os.path.join(output_directory, "session.prof")
+        active_profiler.dump_stats(profile_path)
+        stream = io.StringIO()
+        pstats.Stats(active_profiler, stream=stream).sort_stats(
+            pstats.SortKey.CUMULATIVE
+        ).print_stats(number_of_top_functions)
+        summary = stream.getvalue()
+        active_profiler = None
+    elif sampler is not None:
+        sampler.stop()
+        profile_path = os.path.join(output_directory, "session.folded")
+        with open(profile_path, "w") as file:
+            file.write(sampler.folded())
+        summary = sampler.summary()
+        sampler = None
+    else:
+        raise ValueError("the profiler was not started")
+    with open(summary_path, "w") as file:
+        file.write(summary)
+    console.print(f"Wrote the profile to {profile_path} and "
+                  f"the top functions by cumulative time to {summary_path}. "
+                  f"Please attach both if you open a performance issue.")
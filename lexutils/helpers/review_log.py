@@ -0,0 +1,52 @@
+"""Log of the usage examples presented to the user and the decisions
+
+Every line is a JSON object. The finished and declined form pickles only
+remember the form ids, so this log is what evaluate_scoring.py uses to
+compare how early each scorer would have presented the accepted examples."""
+import json
+import logging
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from lexutils.config import config
+from lexutils.config.enums import ReturnValues
+
+if TYPE_CHECKING:
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.form import Form
+
+logger = logging.getLogger(__name__)
+
+
+def log_decision(form: "Form" = None,
+                 usage_example: "UsageExample" = None,
+                 position: int = None,
+                 decision: ReturnValues = None) -> None:
+    """Append the decision on a usage example to the log"""
+    if form is None:
+        raise ValueError("form was None")
+    if usage_example is None:
+        raise ValueError("usage_example was None")
+    if position is None:
+        raise ValueError("position was None")
+    if not config.review_log:
+        return
+    entry = dict(
+        time=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        form_id=form.id,
+        representation=form.representation,
+        language_code=form.language_code.value,
+        source=usage_example.record.source.name,
+        record_id=usage_example.record.id,
+        text=usage_example.text,
+        word_count=usage_example.word_count,
+        score=round(usage_example.score, 4),
+        scorer=config.usage_example_scorer,
+        position=position,
+        decision=decision.name if decision is not None else None,
+    )
+    try:
+        with open(config.review_log, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as exc:
+        logger.warning(f"Could not write to the review log {config.review_log}: {exc}")
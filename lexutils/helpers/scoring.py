@@ -0,0 +1,168 @@
+"""Quality scores for the candidate sentences
+
+The features only depend on the text, so they are computed for all
+the sentences of a corpus at once when it is built. The score is
+computed from the features and the reliability of the source with the
+scorer chosen in config.usage_example_scorer when the corpus is loaded,
+so changing the scorer does not require building the corpus again.
+
+Add a scorer by decorating a function that takes the features and
+returns a Series with @register("name"). Compare the scorers against
+the decisions in the review log with evaluate_scoring.py."""
+import logging
+import re
+from typing import Callable, Dict, Iterable, List, TYPE_CHECKING
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+from lexutils.config import config
+from lexutils.config.enums import SupportedExampleSources
+
+if TYPE_CHECKING:
+    from lexutils.models.usage_example import UsageExample
+
+logger = logging.getLogger(__name__)
+
+# Headings in the Historical Ads. The converter strips them from the start
+# of the sentences but they also appear glued to the following sentence.
+headings = ["ARBETSUPPGIFTER", "KVALIFIKATIONER",
+            "ÖVRIGT", "Villkor", "Kvalifikationer",
+            "Beskrivning", "Om oss", "Arbetsmiljö",
+            "Vi erbjuder:", "Övrigt", "Ansökan",
+            "Placering:", "Lön:", "OM TJÄNSTEN",
+            "OM OSS", "ÖVRIG INFORMATION", "KONTAKT",
+            "VEM ÄR DU", "OM TJÄNSTEN", "Lön:",
+            "Start:", "OM DIG", "OM JOBBET", "Om arbetet"]
+heading_names = list(dict.fromkeys(heading.rstrip(":").capitalize() for heading in headings))
+# A heading starts the text and is followed by a colon, the end or the next
+# sentence, e.g. "Villkor: heltid" or "ÖvrigtVi söker". In capitals it can
+# also be followed by the text, e.g. "ARBETSUPPGIFTER du ska", but
+# "Villkoren är" and "Ansökan ska" are sentences.
+heading_pattern = re.compile(
+    r"^\s*(?:"
+    + "|".join(rf"{re.escape(name.upper())}(?![a-zåäö])" for name in heading_names) + "|"
+    + "|".join(rf"{re.escape(name)}(?=\s*(?::|$|[A-ZÅÄÖ]))" for name in heading_names)
+    + ")"
+)
+# Characters that are rare in good example sentences
+noise_pattern = re.compile(r"[()\[\]§/*•·_…\"'<>|=#&@%+–-]")
+# How much we trust the sentences of each source, 1 is the best
+source_reliability: Dict[SupportedExampleSources, float] = {
+    SupportedExampleSources.RIKSDAGEN: 1.0,
+    SupportedExampleSources.WIKISOURCE: 0.8,
+    SupportedExampleSources.HISTORICAL_ADS: 0.7,
+    SupportedExampleSources.KSAMSOK: 0.5,
+}
+feature_columns = ["word_count", "noise_ratio", "capitalized", "terminated", "has_heading", "has_digits"]
+score_column = "score"
+scorers: Dict[str, Callable[[DataFrame], Series]] = {}
+
+
+def compute_features(texts: Series) -> DataFrame:
+    """Compute the features of all the texts with vectorized string operations"""
+    return DataFrame({
+        # This is computed like UsageExample.word_count
+        "word_count": texts.str.count(" ").add(1).astype("uint16"),
+        "noise_ratio": (texts.str.count(noise_pattern) / texts.str.len().clip(lower=1)).astype("float32"),
+        "capitalized": texts.str[0:1].str.isupper().astype(bool),
+        "terminated": texts.str.contains(r"[.!?]$").astype(bool),
+        "has_heading": texts.str.contains(heading_pattern).astype(bool),
+        "has_digits": texts.str.contains(r"\d").astype(bool),
+    }, index=texts.index)
+
+
+def register(name: str) -> Callable:
+    def decorator(function: Callable[[DataFrame], Series]) -> Callable[[DataFrame], Series]:
+        scorers[name] = function
+        return function
+    return decorator
+
+
+@register("word_count")
+def word_count_scorer(features: DataFrame) -> Series:
+    """The shortest sentence first like before we had scores"""
+    return -features["word_count"].astype("float32")
+
+
+@register("heuristic")
+def heuristic_scorer(features: DataFrame) -> Series:
+    """Prefer short, complete and clean sentences from reliable sources"""
+    length_penalty = (features["word_count"] - config.min_word_count).clip(lower=0) / config.max_word_count
+    return (
+        features["reliability"]
+        + 0.5 * features["capitalized"]
+        + 0.5 * features["terminated"]
+        - 1.0 * features["has_heading"]
+        - 0.5 * features["has_digits"]
+        - 5.0 * features["noise_ratio"]
+        - length_penalty
+    )
+
+
+def score(features: DataFrame,
+          source: SupportedExampleSources = None,
+          scorer: str = None) -> Series:
+    """Score the features of sentences from one source"""
+    if source is None:
+        raise ValueError("source was None")
+    if scorer is None:
+        scorer = config.usage_example_scorer
+    if scorer not in scorers:
+        raise ValueError(f"Unknown scorer '{scorer}', choose one of {list(scorers)}")
+    return scorers[scorer](
+        features.assign(reliability=source_reliability.get(source, 0.5))
+    ).astype("float32")
+
+
+def score_texts(texts: Iterable[str],
+                source: SupportedExampleSources = None,
+                scorer: str = None) -> List[float]:
+    """Score sentences that are not in a corpus, e.g. from the APIs"""
+    texts = pd.Series(list(texts), dtype=object)
+    if len(texts) == 0:
+        return []
+    return score(compute_features(texts), source=source, scorer=scorer).tolist()
+
+
+def score_usage_examples(examples: List["UsageExample"] = None) -> None:
+    """Set the score of usage examples from any source"""
+    if examples is None:
+        raise ValueError("examples was None")
+    for source in {example.record.source for example in examples}:
+        examples_from_source = [example for example in examples if example.record.source == source]
+        scores = score_texts([example.text for example in examples_from_source], source=source)
+        for example, example_score in zip(examples_from_source, scores):
+            example.score = example_score
+
+
+def evaluate(decisions: DataFrame) -> Dict[str, Dict[str, float]]:
+    """Replay the review log with every scorer
+
+    For every form where an example was accepted we rank the examples
+    that were shown for it and find the position of the accepted one.
+    The mean position is the number of examples a reviewer would have
+    been shown per accepted example, so lower is better."""
+    accepted_forms = decisions.loc[decisions["decision"] == "USAGE_EXAMPLE_ADDED", "form_id"].unique()
+    decisions = decisions[decisions["form_id"].isin(accepted_forms)]
+    results = {}
+    if len(decisions) == 0:
+        return results
+    features = compute_features(decisions["text"].astype(object))
+    sources = decisions["source"].map(lambda name: SupportedExampleSources[name])
+    for name in scorers:
+        scores = pd.Series(index=decisions.index, dtype="float32")
+        for source in sources.unique():
+            mask = sources == source
+            scores[mask] = score(features[mask], source=source, scorer=name)
+        ranked = decisions.assign(score=scores).sort_values(
+            ["form_id", "score"], ascending=[True, False], kind="stable"
+        )
+        ranked["position"] = ranked.groupby("form_id").cumcount() + 1
+        positions = ranked.loc[ranked["decision"] == "USAGE_EXAMPLE_ADDED"].groupby("form_id")["position"].min()
+        results[name] = dict(forms=len(positions),
+                             examples_shown_per_accepted_example=round(float(positions.mean()), 3))
+    positions = decisions.loc[decisions["decision"] == "USAGE_EXAMPLE_ADDED"].groupby("form_id")["position"].min()
+    results["as logged"] = dict(forms=len(positions),
+                                examples_shown_per_accepted_example=round(float(positions.mean()), 3))
+    return results
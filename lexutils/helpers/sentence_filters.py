@@ -0,0 +1,87 @@
+"""Declarative filters for the sentences we put in the corpora
+
+A SentenceFilter is created from the rules of a corpus. All the
+"must not contain" rules are compiled into one regex and the prefixes
+to strip into another, and apply() evaluates the rules for a whole
+batch of sentences with vectorized pandas string operations instead
+of a chain of Python checks per sentence. The converters therefore
+collect the sentences of many documents before filtering them."""
+import logging
+import re
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceFilter:
+    """Clean the sentences and keep those that pass all the rules
+
+    min_words and max_words are inclusive and the words are counted like
+    UsageExample.word_count. strip_prefixes, e.g. headings, and then any
+    run of strip_leading_characters and spaces are removed from the start
+    before the rules are checked."""
+    forbidden_pattern: Optional[re.Pattern]
+    prefix_pattern: Optional[re.Pattern]
+
+    def __init__(self,
+                 min_words: int = None,
+                 max_words: int = None,
+                 forbid_digits: bool = False,
+                 forbidden_characters: str = "",
+                 forbidden_substrings: Iterable[str] = (),
+                 forbidden_first_characters: str = "",
+                 allow_lowercase_start: bool = True,
+                 strip_prefixes: Iterable[str] = (),
+                 strip_leading_characters: str = ""):
+        self.min_words = min_words
+        self.max_words = max_words
+        self.allow_lowercase_start = allow_lowercase_start
+        alternatives = [re.escape(substring) for substring in forbidden_substrings]
+        if forbid_digits:
+            alternatives.append(r"\d")
+        if forbidden_characters != "":
+            alternatives.append(f"[{re.escape(forbidden_characters)}]")
+        if forbidden_first_characters != "":
+            alternatives.append(f"^[{re.escape(forbidden_first_characters)}]")
+        self.forbidden_pattern = re.compile("|".join(alternatives)) if len(alternatives) > 0 else None
+        # Longest first so a heading is not cut short by another heading it starts with
+        prefixes = sorted(set(strip_prefixes), key=len, reverse=True)
+        prefix_alternatives = [f"(?:{'|'.join(re.escape(prefix) for prefix in prefixes)})\\s*"] if prefixes else []
+        if strip_leading_characters != "":
+            prefix_alternatives.append(f"[{re.escape(strip_leading_characters)}\\s]+")
+        self.prefix_pattern = (re.compile(f"^(?:{'|'.join(prefix_alternatives)})+")
+                               if len(prefix_alternatives) > 0 else None)
+
+    def clean(self, sentences: Series) -> Series:
+        sentences = sentences.str.strip()
+        if self.prefix_pattern is not None:
+            sentences = sentences.str.replace(self.prefix_pattern, "", regex=True)
+        return sentences.str.replace("  ", " ", regex=False).str.strip()
+
+    def mask(self, sentences: Series) -> Series:
+        """Return whether each of the cleaned sentences passes the rules"""
+        keep = pd.Series(True, index=sentences.index)
+        if self.min_words is not None or self.max_words is not None:
+            word_counts = sentences.str.count(" ") + 1
+            if self.min_words is not None:
+                keep &= word_counts >= self.min_words
+            if self.max_words is not None:
+                keep &= word_counts <= self.max_words
+        if self.forbidden_pattern is not None:
+            keep &= ~sentences.str.contains(self.forbidden_pattern)
+        if not self.allow_lowercase_start:
+            keep &= ~sentences.str[0:1].str.islower().astype(bool)
+        return keep
+
+    def apply(self, dataframe: DataFrame, column: str = "sentence") -> Tuple[DataFrame, int]:
+        """Clean the sentences in the column and keep the rows that pass
+
+        Returns the rows that passed and the number of rows skipped"""
+        if len(dataframe) == 0:
+            return dataframe, 0
+        dataframe = dataframe.assign(**{column: self.clean(dataframe[column].astype(object))})
+        kept = dataframe[self.mask(dataframe[column])]
+        return kept, len(dataframe) - len(kept)
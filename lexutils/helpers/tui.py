@@ -9,10 +9,9 @@ from consolemenu import *
 from rich import print
 
 from lexutils.config import constants
-from lexutils.helpers import util
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import profiling, util
 from lexutils.helpers.console import console
-from lexutils.models.historical_job_ads_record import HistoricalJobAd
-from lexutils.models.riksdagen_record import RiksdagenRecord
 from lexutils.models.wikidata.enums import WikimediaLanguageCode
 
 if TYPE_CHECKING:
@@ -102,8 +101,9 @@ def choose_sense_menu(senses: List[Sense] = None):
     if senses is None:
         raise ValueError("senses was None")
     menu = SelectionMenu(senses, "Select a sense")
-    menu.show()
-    menu.join()
+    with profiling.paused():
+        menu.show()
+        menu.join()
     index = menu.selected_option
     # logger.debug(f"index:{index}")
     # exit(0)
@@ -123,8 +123,9 @@ def select_language_menu():
     #  Consider showing a list based on a sparql result of all wikisource language versions
     logger = logging.getLogger(__name__)
     menu = SelectionMenu(WikimediaLanguageCode.__members__.keys(), "Select a language")
-    menu.show()
-    menu.join()
+    with profiling.paused():
+        menu.show()
+        menu.join()
     selected_language_index = menu.selected_option
     mapping = {}
     for index, item in enumerate(WikimediaLanguageCode):
@@ -150,14 +151,16 @@ def present_sentence(
         raise ValueError("record was None")
     if form is None:
         raise ValueError("form was None")
-    if isinstance(example.record, RiksdagenRecord):
+    # We compare the source instead of the record class to avoid
+    # importing the records and their dependencies at startup
+    if example.record.source == SupportedExampleSources.RIKSDAGEN:
         console.print(_("Presenting sentence " +
                         "{}/{} ".format(count, form.number_of_examples_found) +
                         "from {} from {}".format(
                             example.record.date,
                             example.record.human_readable_url(),
                         )))
-    elif isinstance(example.record, HistoricalJobAd):
+    elif example.record.source == SupportedExampleSources.HISTORICAL_ADS:
         console.print(_("Presenting sentence " +
                         "{}/{} ".format(count, form.number_of_examples_found) +
                         "with id {} from {}".format(
@@ -0,0 +1,321 @@
+"""Upload the accepted usage examples in the background
+
+The interactive loop only builds the statement and enqueue()s it, so
+the user can go on to the next form right away. The queue is a SQLite
+database, so nothing is lost if LexUtils stops before the uploads are
+done. The next session picks up the pending uploads.
+
+The Uploader thread waits until no example has been added to a lexeme
+for config.upload_batch_delay seconds. Then it adds all the pending
+statements of that lexeme in one wbeditentity edit. The edit is based on
+the revision we just read (baserevid), so Wikibase reports a conflict
+instead of silently building on an edit we have not seen. All requests
+are sent with config.upload_maxlag, and there is at least
+config.upload_edit_interval seconds between two edits.
+
+A form is only done when its example was uploaded. The Uploader calls
+on_done with each upload that was added to its lexeme and on_failed with
+each upload that failed config.upload_max_attempts times."""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from lexutils.config import config
+from lexutils.helpers import backend, instrumentation
+from lexutils.helpers.console import console
+
+logger = logging.getLogger(__name__)
+
+pending = "pending"
+done = "done"
+failed = "failed"
+queue: Optional["UploadQueue"] = None
+uploader: Optional["Uploader"] = None
+
+
+class Upload:
+    """A usage example statement waiting to be added to a lexeme"""
+    id: int
+    lexeme_id: str
+    form_id: str
+    sense_id: str
+    claim: Dict[str, Any]
+    queued_at: float
+    attempts: int
+
+    def __init__(self, id: int, lexeme_id: str, form_id: str, sense_id: str,
+                 claim: str, queued_at: float, attempts: int):
+        self.id = id
+        self.lexeme_id = lexeme_id
+        self.form_id = form_id
+        self.sense_id = sense_id
+        self.claim = json.loads(claim)
+        self.queued_at = queued_at
+        self.attempts = attempts
+
+
+class UploadQueue:
+    """The uploads persisted in a SQLite database
+
+    Every method uses its own connection so the queue
+    can be shared between the interactive loop and the Uploader"""
+
+    def __init__(self, path: str = None):
+        if path is None:
+            raise ValueError("path was None")
+        self.path = path
+        with self.__transaction__() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lexeme_id TEXT NOT NULL,
+                    form_id TEXT NOT NULL,
+                    sense_id TEXT NOT NULL,
+                    claim TEXT NOT NULL,
+                    queued_at REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    revision_id INTEGER,
+                    error TEXT
+                )""")
+            connection.execute("CREATE INDEX IF NOT EXISTS uploads_status ON uploads (status, lexeme_id)")
+
+    @contextmanager
+    def __transaction__(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add(self, lexeme_id: str = None, form_id: str = None,
+            sense_id: str = None, claim: Dict[str, Any] = None) -> int:
+        if lexeme_id is None or form_id is None or sense_id is None or claim is None:
+            raise ValueError("we did not get what we need")
+        with self.__transaction__() as connection:
+            cursor = connection.execute(
+                "INSERT INTO uploads (lexeme_id, form_id, sense_id, claim, queued_at, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (lexeme_id, form_id, sense_id, json.dumps(claim, ensure_ascii=False), time.time(), pending)
+            )
+            return cursor.lastrowid
+
+    def pending_by_lexeme(self) -> Dict[str, List[Upload]]:
+        """The pending uploads grouped by lexeme in the order they were queued"""
+        with self.__transaction__() as connection:
+            rows = connection.execute(
+                "SELECT id, lexeme_id, form_id, sense_id, claim, queued_at, attempts "
+                "FROM uploads WHERE status = ? ORDER BY id", (pending,)
+            ).fetchall()
+        uploads: Dict[str, List[Upload]] = {}
+        for row in rows:
+            upload = Upload(*row)
+            uploads.setdefault(upload.lexeme_id, []).append(upload)
+        return uploads
+
+    def mark_done(self, uploads: List[Upload], revision_id: Optional[int] = None) -> None:
+        with self.__transaction__() as connection:
+            connection.executemany(
+                "UPDATE uploads SET status = ?, revision_id = ?, error = NULL WHERE id = ?",
+                [(done, revision_id, upload.id) for upload in uploads]
+            )
+
+    def mark_attempt_failed(self, uploads: List[Upload], error: str = None) -> List[Upload]:
+        """Keep the uploads pending until they have failed config.upload_max_attempts
+        times and return the uploads we gave up on"""
+        with self.__transaction__() as connection:
+            connection.executemany(
+                "UPDATE uploads SET attempts = attempts + 1, error = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END WHERE id = ?",
+                [(error, config.upload_max_attempts, failed, upload.id) for upload in uploads]
+            )
+        return [upload for upload in uploads if upload.attempts + 1 >= config.upload_max_attempts]
+
+    def count(self, status: str = pending) -> int:
+        with self.__transaction__() as connection:
+            return connection.execute("SELECT COUNT(*) FROM uploads WHERE status = ?", (status,)).fetchone()[0]
+
+
+class WikibaseWriter:
+    """Add statements to a lexeme with the Wikibase API"""
+
+    @staticmethod
+    def __call_api__(data: Dict[str, Any], edit: bool = False) -> Dict:
+        from lexutils.models.wikidata.entities import login
+        from wikibaseintegrator.wbi_helpers import mediawiki_api_call_helper
+        if edit and not backend.dry_run:
+            return mediawiki_api_call_helper(data=data, login=login(), maxlag=config.upload_maxlag)
+        # Reading does not need a login and in a dry run the edit is not sent
+        return mediawiki_api_call_helper(data=data, allow_anonymous=True, maxlag=config.upload_maxlag)
+
+    def read(self, lexeme_id: str, props: str = "info") -> Dict:
+        """Read the lexeme, by default only the latest revision id and not the whole lexeme"""
+        with instrumentation.span("wbi read"):
+            result = self.__call_api__(dict(action="wbgetentities", ids=lexeme_id, props=props, format="json"))
+        return result["entities"][lexeme_id]
+
+    def edit(self, lexeme_id: str, claims: List[Dict], revision_id: int, summary: str) -> int:
+        """Add the claims in one edit based on the revision and return the new revision id"""
+        with instrumentation.span("wbi write"):
+            result = self.__call_api__(dict(
+                action="wbeditentity",
+                id=lexeme_id,
+                data=json.dumps(dict(claims=claims), ensure_ascii=False),
+                baserevid=str(revision_id),
+                summary=summary,
+                format="json",
+            ), edit=True)
+        return result["entity"]["lastrevid"]
+
+    def add_claims(self, lexeme_id: str = None, claims: List[Dict] = None, summary: str = None) -> int:
+        from wikibaseintegrator.wbi_exceptions import MWApiError
+        if lexeme_id is None or claims is None or summary is None:
+            raise ValueError("we did not get what we need")
+        revision_id = self.read(lexeme_id)["lastrevid"]
+        try:
+            return self.edit(lexeme_id, claims, revision_id, summary)
+        except MWApiError as exc:
+            if exc.code != "editconflict":
+                raise
+        # Somebody edited the lexeme after we read it. We only add statements,
+        # so we retry on top of their edit but skip any usage examples it added
+        logger.info(f"Edit conflict on {lexeme_id}, retrying on the latest revision")
+        instrumentation.count("upload edit conflicts")
+        lexeme = self.read(lexeme_id, props="info|claims")
+        existing = {statement["mainsnak"].get("datavalue", {}).get("value", {}).get("text")
+                    for statement in lexeme.get("claims", {}).get("P5831", [])}
+        claims = [claim for claim in claims if claim["mainsnak"]["datavalue"]["value"]["text"] not in existing]
+        if len(claims) == 0:
+            return lexeme["lastrevid"]
+        return self.edit(lexeme_id, claims, lexeme["lastrevid"], summary)
+
+
+class Uploader(threading.Thread):
+    """Upload the pending usage examples one lexeme at a time"""
+    last_edit: float = 0.0
+
+    def __init__(self, upload_queue: UploadQueue, writer: Any,
+                 batch_delay: float, edit_interval: float,
+                 on_done: Callable[[Upload], None] = None,
+                 on_failed: Callable[[Upload], None] = None):
+        super().__init__(name="lexutils-uploader", daemon=True)
+        self.queue = upload_queue
+        self.writer = writer
+        self.batch_delay = batch_delay
+        self.edit_interval = edit_interval
+        self.on_done = on_done
+        self.on_failed = on_failed
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+
+    def notify(self):
+        self.wake_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.batch_delay)
+            self.wake_event.clear()
+            if not self.stop_event.is_set():
+                self.upload_ready()
+        # Upload everything that is left before the session ends
+        while self.queue.count(pending) > 0:
+            self.upload_ready(flush=True)
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        self.join()
+
+    def upload_ready(self, flush: bool = False) -> None:
+        """Upload the lexemes that have had no new examples for batch_delay seconds"""
+        now = time.time()
+        for lexeme_id, uploads in self.queue.pending_by_lexeme().items():
+            if flush or now - uploads[-1].queued_at >= self.batch_delay:
+                self.upload_lexeme(lexeme_id, uploads)
+
+    def upload_lexeme(self, lexeme_id: str, uploads: List[Upload]) -> None:
+        if len(uploads) == 1:
+            summary = "Added usage example"
+        else:
+            summary = f"Added {len(uploads)} usage examples"
+        summary += " with [[Wikidata:Tools/LexUtils]] v{}".format(config.version)
+        wait = self.last_edit + self.edit_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            revision_id = self.writer.add_claims(lexeme_id=lexeme_id,
+                                                 claims=[upload.claim for upload in uploads],
+                                                 summary=summary)
+        except Exception as exc:
+            logger.warning(f"Could not upload {len(uploads)} usage examples to {lexeme_id}: {exc}")
+            instrumentation.count("upload failures")
+            self.__notify__(self.on_failed, self.queue.mark_attempt_failed(uploads, error=str(exc)))
+        else:
+            logger.info(f"Uploaded {len(uploads)} usage examples to {lexeme_id} in revision {revision_id}")
+            instrumentation.count("usage examples uploaded", increment=len(uploads))
+            self.queue.mark_done(uploads, revision_id=revision_id)
+            self.__notify__(self.on_done, uploads)
+        finally:
+            self.last_edit = time.monotonic()
+
+    @staticmethod
+    def __notify__(callback: Optional[Callable[[Upload], None]], uploads: List[Upload]) -> None:
+        if callback is None:
+            return
+        for upload in uploads:
+            try:
+                callback(upload)
+            except Exception:
+                # The uploads must go on
+                logger.exception(f"Could not handle the upload of {upload.form_id}")
+
+
+def start(writer: Any = None, on_done: Callable[[Upload], None] = None,
+          on_failed: Callable[[Upload], None] = None) -> None:
+    """Start uploading in the background, including uploads left by an earlier session"""
+    global queue, uploader
+    if uploader is not None:
+        raise ValueError("the uploader was already started")
+    queue = UploadQueue(path=config.upload_queue)
+    number_of_pending_uploads = queue.count(pending)
+    if number_of_pending_uploads > 0:
+        console.print(f"Uploading {number_of_pending_uploads} usage examples "
+                      f"left from an earlier session in the background")
+    uploader = Uploader(upload_queue=queue,
+                        writer=writer if writer is not None else WikibaseWriter(),
+                        batch_delay=config.upload_batch_delay,
+                        edit_interval=config.upload_edit_interval,
+                        on_done=on_done,
+                        on_failed=on_failed)
+    uploader.start()
+
+
+def enqueue(lexeme_id: str = None, form_id: str = None,
+            sense_id: str = None, claim: Dict[str, Any] = None) -> None:
+    """Persist the statement and let the uploader add it later"""
+    if queue is None or uploader is None:
+        raise ValueError("the uploader was not started")
+    queue.add(lexeme_id=lexeme_id, form_id=form_id, sense_id=sense_id, claim=claim)
+    instrumentation.count("usage examples queued")
+    uploader.notify()
+
+
+def stop() -> None:
+    """Wait for the pending uploads and stop the uploader"""
+    global queue, uploader
+    if queue is None or uploader is None:
+        raise ValueError("the uploader was not started")
+    number_of_pending_uploads = queue.count(pending)
+    with console.status(f"Uploading the last {number_of_pending_uploads} usage examples..."):
+        uploader.stop()
+    number_of_failed_uploads = queue.count(failed)
+    if number_of_failed_uploads > 0:
+        console.print(f"{number_of_failed_uploads} usage examples could not be uploaded, "
+                      f"see the error column in {config.upload_queue}")
+    queue = None
+    uploader = None
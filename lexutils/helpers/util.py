@@ -3,11 +3,10 @@ import gettext
 import logging
 import sys
 
-import httpx
-
 # from time import sleep
 # import asyncio
 from lexutils.config.enums import ReturnValues
+from lexutils.helpers import profiling
 
 _ = gettext.gettext
 
@@ -31,7 +30,8 @@ def yes_no_skip_question(message: str) -> ReturnValues:
     # I%E2%80%99m-new-to-Python-how-can-I-write-a-yes-no-question
     # this will loop forever
     while True:
-        answer = input(_("{} [(Y)es/(n)o/(s)kip this form]: ".format(message)))
+        with profiling.paused():
+            answer = input(_("{} [(Y)es/(n)o/(s)kip this form]: ".format(message)))
         if len(answer) == 0 or answer[0].lower() in ('y', 'n', 's'):
             if len(answer) == 0:
                 return ReturnValues.ACCEPT_USAGE_EXAMPLE
@@ -50,7 +50,8 @@ def yes_no_question(message: str):
     # I%E2%80%99m-new-to-Python-how-can-I-write-a-yes-no-question
     # this will loop forever
     while True:
-        answer = input(_("{} [Y/n]: ".format(message)))
+        with profiling.paused():
+            answer = input(_("{} [Y/n]: ".format(message)))
         if len(answer) == 0 or answer[0].lower() in ('y', 'n'):
             if len(answer) == 0:
                 return True
@@ -60,6 +61,7 @@ def yes_no_question(message: str):
 
 
 async def async_fetch_from_url(url):
+    import httpx
     async with httpx.AsyncClient() as client:
         response = await client.get(url)
         return response
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import re
+from os.path import exists
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+import requests
+
+from lexutils.config import config
+from lexutils.config.enums import SupportedCachePickles, SupportedExampleSources
+from lexutils.helpers import instrumentation
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+# This talks directly to the MediaWiki API of the Wikisources
+# instead of going through the WDQS mwapi service
+
+logger = logging.getLogger(__name__)
+
+# The API does not return more than this per request for normal users
+search_page_size = 50
+searchmatch_pattern = re.compile(r'<span class="searchmatch">|</span>')
+# Results per (language code, representation) for this session
+search_cache: Dict[Tuple[str, str], List[Dict]] = {}
+# The API accepts this many titles per request for normal users
+titles_batch_size = 50
+# QID or None per (language code, title), loaded from disk on first use.
+# Only the QIDs are saved, a page without one can get it later.
+qid_cache: Optional[Dict[Tuple[str, str], Optional[str]]] = None
+
+
+def api_url(language_code: WikimediaLanguageCode) -> str:
+    return f"https://{language_code.value}.wikisource.org/w/api.php"
+
+
+def search_limit(language_code: WikimediaLanguageCode) -> int:
+    if language_code in config.fast_nlp_languages:
+        return config.wikisource_max_results_size_fast_nlp
+    else:
+        return config.wikisource_max_results_size_slow_nlp
+
+
+async def __search__(
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        language_code: WikimediaLanguageCode,
+        representation: str,
+        limit: int
+) -> Optional[List[Dict]]:
+    """Page through the search results using sroffset until we have enough
+
+    Returns None if any request failed"""
+    results = []
+    offset = 0
+    while offset is not None and len(results) < limit:
+        params = dict(
+            action="query",
+            list="search",
+            srsearch=representation,
+            srprop="snippet",
+            srlimit=min(search_page_size, limit - len(results)),
+            sroffset=offset,
+            format="json",
+        )
+        async with semaphore:
+            try:
+                response = await client.get(api_url(language_code), params=params)
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as exc:
+                logger.warning(f"Searching {language_code.value}.wikisource.org "
+                               f"for '{representation}' failed: {exc}")
+                return None
+        for hit in data.get("query", {}).get("search", []):
+            results.append(dict(
+                title=hit["title"],
+                snippet=searchmatch_pattern.sub("", hit["snippet"]),
+            ))
+        offset = data.get("continue", {}).get("sroffset")
+    return results
+
+
+async def __search_many__(
+        language_code: WikimediaLanguageCode,
+        representations: List[str],
+        limit: int
+) -> List[Optional[List[Dict]]]:
+    semaphore = asyncio.Semaphore(config.wikisource_max_concurrent_requests)
+    async with httpx.AsyncClient(headers={"User-Agent": config.user_agent}) as client:
+        return await asyncio.gather(
+            *[__search__(client, semaphore, language_code, representation, limit)
+              for representation in representations]
+        )
+
+
+def search(
+        language_code: WikimediaLanguageCode = None,
+        representations: List[str] = None,
+        limit: int = None
+) -> Dict[str, Optional[List[Dict]]]:
+    """Search the Wikisource in the given language for all the representations
+    concurrently and return the hits per representation
+
+    A representation maps to None if the search failed"""
+    if language_code is None:
+        raise ValueError("language_code was None")
+    if representations is None:
+        raise ValueError("representations was None")
+    if limit is None:
+        limit = search_limit(language_code)
+    missing = list(dict.fromkeys(
+        representation for representation in representations
+        if (language_code.value, representation) not in search_cache
+    ))
+    instrumentation.count("search cache miss", source=SupportedExampleSources.WIKISOURCE,
+                          increment=len(missing))
+    instrumentation.count("search cache hit", source=SupportedExampleSources.WIKISOURCE,
+                          increment=len(set(representations)) - len(missing))
+    if len(missing) > 0:
+        logger.info(f"Searching the {language_code.name.title()} Wikisource "
+                    f"for {len(missing)} representations")
+        with instrumentation.span("http search", source=SupportedExampleSources.WIKISOURCE):
+            results = asyncio.run(__search_many__(language_code, missing, limit))
+        for representation, hits in zip(missing, results):
+            # We don't cache failures so they are retried next time
+            if hits is not None:
+                search_cache[(language_code.value, representation)] = hits
+    return {
+        representation: search_cache.get((language_code.value, representation))
+        for representation in representations
+    }
+
+
+def __load_qid_cache__() -> Dict[Tuple[str, str], Optional[str]]:
+    global qid_cache
+    if qid_cache is None:
+        qid_cache = {}
+        pickle_filename = SupportedCachePickles.WIKISOURCE_QIDS.value
+        if exists(pickle_filename):
+            df = pd.read_pickle(pickle_filename)
+            for row in df.itertuples(index=False):
+                # Older versions saved the misses too, as None or NaN
+                if isinstance(row.qid, str):
+                    qid_cache[(row.language_code, row.title)] = row.qid
+            logger.debug(f"Loaded {len(qid_cache)} titles from {pickle_filename}")
+    return qid_cache
+
+
+def __save_qid_cache__() -> None:
+    pd.DataFrame(
+        data=[dict(language_code=language_code, title=title, qid=qid)
+              for (language_code, title), qid in qid_cache.items()
+              if qid is not None],
+        columns=["language_code", "title", "qid"]
+    ).to_pickle(SupportedCachePickles.WIKISOURCE_QIDS.value)
+
+
+def __query_pageprops__(
+        language_code: WikimediaLanguageCode,
+        titles: List[str]
+) -> Dict[str, Optional[str]]:
+    """Look up the wikibase_item of the titles in batches and return
+    the QID or None per title we asked for
+
+    The API normalizes titles and follows redirects so we
+    map back from the resulting pages to the titles we asked for"""
+    #  https://stackoverflow.com/questions/37024807/how-to-get-wikidata-id-for-an-wikipedia-article-by-api
+    qids = {}
+    for start in range(0, len(titles), titles_batch_size):
+        batch = titles[start:start + titles_batch_size]
+        logger.info(f"Looking up the QID of {len(batch)} titles in the "
+                    f"{language_code.name.title()} Wikisource")
+        try:
+            response = requests.get(
+                api_url(language_code),
+                params=dict(action="query", prop="pageprops", ppprop="wikibase_item",
+                            redirects=1, format="json", titles="|".join(batch)),
+                headers={"Accept": "application/json", "User-Agent": config.user_agent}
+            )
+        except requests.RequestException as exc:
+            raise ValueError(f"Could not reach the Wikisource API: {exc}")
+        if response.status_code != 200:
+            raise ValueError(f"Got {response.status_code} from the Wikisource API, see {response.url}")
+        if 'application/json' not in response.headers['Content-Type']:
+            raise ValueError("Got no JSON result from Wikisource")
+        query = response.json().get("query", {})
+        # Follow the title through normalization and redirects
+        mapping = {title: title for title in batch}
+        for key in ("normalized", "redirects"):
+            renames = {rename["from"]: rename["to"] for rename in query.get(key, [])}
+            mapping = {title: renames.get(target, target) for title, target in mapping.items()}
+        page_qids = {}
+        for page_data in query.get("pages", {}).values():
+            page_qids[page_data["title"]] = page_data.get("pageprops", {}).get("wikibase_item")
+        for title, target in mapping.items():
+            qids[title] = page_qids.get(target)
+    return qids
+
+
+def resolve_qids(
+        language_code: WikimediaLanguageCode = None,
+        titles: Iterable[str] = None
+) -> Dict[str, Optional[str]]:
+    """Return the QID or None for each of the titles
+
+    Titles without a QID are retried with the title truncated
+    at the first slash, e.g. the work of a chapter. The QIDs are cached
+    on disk and the misses only for this session, so a title is asked
+    for again in the next session until it has a QID."""
+    if language_code is None:
+        raise ValueError("language_code was None")
+    if titles is None:
+        raise ValueError("titles was None")
+    cache = __load_qid_cache__()
+    titles = list(dict.fromkeys(titles))
+    missing = [title for title in titles if (language_code.value, title) not in cache]
+    instrumentation.count("qid cache miss", source=SupportedExampleSources.WIKISOURCE,
+                          increment=len(missing))
+    instrumentation.count("qid cache hit", source=SupportedExampleSources.WIKISOURCE,
+                          increment=len(titles) - len(missing))
+    if len(missing) > 0:
+        with instrumentation.span("qid lookup", source=SupportedExampleSources.WIKISOURCE):
+            qids = __query_pageprops__(language_code, missing)
+            truncated_titles = {
+                title: title.split("/")[0] for title in missing
+                if qids[title] is None and title.split("/")[0] != title
+            }
+            if len(truncated_titles) > 0:
+                logger.info(f"Trying to find QIDs using {len(truncated_titles)} truncated titles")
+                truncated_qids = __query_pageprops__(
+                    language_code, list(dict.fromkeys(truncated_titles.values()))
+                )
+                for title, truncated_title in truncated_titles.items():
+                    qids[title] = truncated_qids[truncated_title]
+            for title, qid in qids.items():
+                cache[(language_code.value, title)] = qid
+            __save_qid_cache__()
+    return {title: cache[(language_code.value, title)] for title in titles}
@@ -0,0 +1,272 @@
+"""Share the work between sessions running at the same time
+
+The sessions lease the forms they fetched before looking for usage
+examples, so two reviewers never search for or review the same form.
+A lease expires after config.work_lease_duration seconds unless it is
+renewed, so the forms of a session that crashed are handed out again.
+A finished or declined form is never handed out again. Unlike the
+pickles in the working directory, this is shared by all sessions that
+use the same config.work_allocation_path.
+
+The allocator also keeps the cursors the sessions page through the
+forms without an example with, so the next session goes on where the
+last one stopped. A session only keeps a page if it could advance the
+cursor from where the page started, so two sessions never get the
+same page.
+
+The allocator is a local SQLite database. Another store, e.g. a lease
+service for reviewers on different hosts, can replace it by subclassing
+WorkAllocator and assigning it to allocator."""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from lexutils.config import config
+from lexutils.helpers import backend
+
+if TYPE_CHECKING:
+    from lexutils.models.wikidata.form import Form
+
+logger = logging.getLogger(__name__)
+
+leased = "leased"
+finished = "finished"
+declined = "declined"
+# Who holds the leases of this session
+owner = f"{socket.gethostname()}-{os.getpid()}"
+allocator: Optional["WorkAllocator"] = None
+# SQLite allows 999 parameters in a query in older versions
+batch_size = 500
+
+
+class WorkAllocator(ABC):
+    """Hands out disjoint leases on forms"""
+
+    @abstractmethod
+    def lease(self, owner: str = None, form_ids: List[str] = None,
+              duration: float = None, number: int = None) -> List[str]:
+        """Lease up to number of the forms that are neither finished nor
+        declined nor leased by another owner, and return them in order"""
+        pass
+
+    @abstractmethod
+    def renew(self, owner: str = None, duration: float = None) -> int:
+        """Extend all the leases of the owner and return how many there are"""
+        pass
+
+    @abstractmethod
+    def release(self, owner: str = None, form_ids: List[str] = None) -> int:
+        """Give up the leases of the owner on the forms, by default all of
+        them, and return how many there were"""
+        pass
+
+    @abstractmethod
+    def complete(self, owner: str = None, form_id: str = None, status: str = None) -> None:
+        """Mark the form finished or declined so nobody gets it again"""
+        pass
+
+    @abstractmethod
+    def read_cursor(self, name: str = None) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def advance_cursor(self, name: str = None, expected: Optional[str] = None,
+                       value: Optional[str] = None) -> bool:
+        """Set the cursor to value if it still is expected and return whether
+        it was, in one transaction. None is the beginning."""
+        pass
+
+
+class SqliteWorkAllocator(WorkAllocator):
+    """The leases in a SQLite database, one row per form
+
+    The leases are taken in immediate transactions, so two
+    sessions leasing at the same time are served one after the other"""
+
+    def __init__(self, path: str = None):
+        if path is None:
+            raise ValueError("path was None")
+        self.path = path
+        with self.__transaction__() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS forms (
+                    form_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    expires_at REAL,
+                    updated_at REAL NOT NULL
+                )""")
+            connection.execute("CREATE INDEX IF NOT EXISTS forms_owner ON forms (owner, status)")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cursors (
+                    name TEXT PRIMARY KEY,
+                    value TEXT,
+                    updated_at REAL NOT NULL
+                )""")
+
+    @contextmanager
+    def __transaction__(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def __states__(connection: sqlite3.Connection,
+                   form_ids: List[str]) -> Dict[str, Tuple[str, Optional[str], Optional[float]]]:
+        states = {}
+        for start in range(0, len(form_ids), batch_size):
+            batch = form_ids[start:start + batch_size]
+            rows = connection.execute(
+                f"SELECT form_id, status, owner, expires_at FROM forms "
+                f"WHERE form_id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            states.update({form_id: (status, form_owner, expires_at)
+                           for form_id, status, form_owner, expires_at in rows})
+        return states
+
+    def lease(self, owner: str = None, form_ids: List[str] = None,
+              duration: float = None, number: int = None) -> List[str]:
+        if owner is None or form_ids is None or duration is None:
+            raise ValueError("we did not get what we need")
+        now = time.time()
+        with self.__transaction__() as connection:
+            states = self.__states__(connection, form_ids)
+            available = []
+            for form_id in dict.fromkeys(form_ids):
+                if number is not None and len(available) == number:
+                    break
+                if form_id in states:
+                    status, form_owner, expires_at = states[form_id]
+                    if status != leased or (form_owner != owner and expires_at > now):
+                        continue
+                available.append(form_id)
+            connection.executemany(
+                "INSERT INTO forms (form_id, status, owner, expires_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (form_id) DO UPDATE SET status = excluded.status, owner = excluded.owner, "
+                "expires_at = excluded.expires_at, updated_at = excluded.updated_at",
+                [(form_id, leased, owner, now + duration, now) for form_id in available]
+            )
+        return available
+
+    def renew(self, owner: str = None, duration: float = None) -> int:
+        if owner is None or duration is None:
+            raise ValueError("we did not get what we need")
+        now = time.time()
+        with self.__transaction__() as connection:
+            return connection.execute(
+                "UPDATE forms SET expires_at = ?, updated_at = ? WHERE owner = ? AND status = ?",
+                (now + duration, now, owner, leased)
+            ).rowcount
+
+    def release(self, owner: str = None, form_ids: List[str] = None) -> int:
+        if owner is None:
+            raise ValueError("owner was None")
+        with self.__transaction__() as connection:
+            if form_ids is None:
+                return connection.execute("DELETE FROM forms WHERE owner = ? AND status = ?",
+                                          (owner, leased)).rowcount
+            number_of_leases = 0
+            for start in range(0, len(form_ids), batch_size):
+                batch = form_ids[start:start + batch_size]
+                number_of_leases += connection.execute(
+                    f"DELETE FROM forms WHERE owner = ? AND status = ? "
+                    f"AND form_id IN ({','.join('?' * len(batch))})", [owner, leased] + batch
+                ).rowcount
+            return number_of_leases
+
+    def complete(self, owner: str = None, form_id: str = None, status: str = None) -> None:
+        if owner is None or form_id is None or status not in (finished, declined):
+            raise ValueError("we did not get what we need")
+        with self.__transaction__() as connection:
+            connection.execute(
+                "INSERT INTO forms (form_id, status, owner, expires_at, updated_at) VALUES (?, ?, ?, NULL, ?) "
+                "ON CONFLICT (form_id) DO UPDATE SET status = excluded.status, owner = excluded.owner, "
+                "expires_at = NULL, updated_at = excluded.updated_at",
+                (form_id, status, owner, time.time())
+            )
+
+    def read_cursor(self, name: str = None) -> Optional[str]:
+        if name is None:
+            raise ValueError("name was None")
+        with self.__transaction__(write=False) as connection:
+            row = connection.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def advance_cursor(self, name: str = None, expected: Optional[str] = None,
+                       value: Optional[str] = None) -> bool:
+        if name is None:
+            raise ValueError("name was None")
+        with self.__transaction__() as connection:
+            row = connection.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+            if (row[0] if row is not None else None) != expected:
+                return False
+            connection.execute(
+                "INSERT INTO cursors (name, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (name, value, time.time())
+            )
+        return True
+
+
+def get_allocator() -> WorkAllocator:
+    global allocator
+    if allocator is None:
+        allocator = SqliteWorkAllocator(path=config.work_allocation_path)
+    return allocator
+
+
+def lease_forms(forms: List[Form] = None, number: int = None) -> List[Form]:
+    """Return up to number of the forms that no other session works on
+    and that nobody finished or declined, leased to this session"""
+    if forms is None:
+        raise ValueError("forms was None")
+    form_ids = set(get_allocator().lease(owner=owner, form_ids=[form.id for form in forms],
+                                         duration=config.work_lease_duration, number=number))
+    if len(form_ids) < len(forms):
+        logger.info(f"Skipping {len(forms) - len(form_ids)} forms that other sessions "
+                    f"work on or that were finished or declined")
+    return [form for form in forms if form.id in form_ids]
+
+
+def renew() -> None:
+    get_allocator().renew(owner=owner, duration=config.work_lease_duration)
+
+
+def complete(form_id: str = None, status: str = None) -> None:
+    if backend.dry_run:
+        # Nothing was uploaded so we want to see the form again
+        return
+    get_allocator().complete(owner=owner, form_id=form_id, status=status)
+
+
+def read_cursor(name: str = None) -> Optional[str]:
+    return get_allocator().read_cursor(name=name)
+
+
+def advance_cursor(name: str = None, expected: Optional[str] = None, value: Optional[str] = None) -> bool:
+    """Claim the page from expected to value, False if another session got it first"""
+    if backend.dry_run:
+        # Show the same forms again in the next session
+        return True
+    return get_allocator().advance_cursor(name=name, expected=expected, value=value)
+
+
+def release(form_ids: List[str] = None) -> None:
+    """Hand the forms we did not get to back to the other sessions"""
+    number_of_leases = get_allocator().release(owner=owner, form_ids=form_ids)
+    logger.info(f"Released {number_of_leases} forms")
@@ -0,0 +1,87 @@
+"""Find the usage examples of many lexemes in the dataframes with a pool of processes
+
+Creating the records and usage examples from the matching rows is pure
+Python, so with hundreds of lexemes the threads would only take turns on
+one core. The dataframes are exported to corpus stores in a temporary
+directory which every worker memory maps when it starts, so the corpora
+are neither pickled nor copied to the workers. The lexemes are split
+between the workers and the results come back in the order of the
+lexemes, so they are the same whatever the number of processes."""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import List, Tuple, Type, TYPE_CHECKING
+
+from lexutils.helpers import instrumentation
+from lexutils.helpers.corpus_store import CorpusStore
+
+if TYPE_CHECKING:
+    from lexutils.models.dataframe_usage_examples import DataframeUsageExamples
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.form import Form
+
+logger = logging.getLogger(__name__)
+
+# Per source the usage examples of each form in the order of
+# the forms and the number of matching rows that were found
+LexemeResult = List[Tuple[List[List["UsageExample"]], int]]
+# The sources of the worker process, see __open_corpus_stores__()
+sources: List["DataframeUsageExamples"] = []
+
+
+def __open_corpus_stores__(classes_and_directories: List[Tuple[Type["DataframeUsageExamples"], str]]) -> None:
+    for class_, directory in classes_and_directories:
+        # We skip __init__ to avoid loading the pickle,
+        # the rows come from the corpus store instead
+        usage_examples = class_.__new__(class_)
+        usage_examples.corpus_store = CorpusStore(directory=directory)
+        sources.append(usage_examples)
+
+
+def __find_usage_examples_of_lexeme__(forms: List["Form"], limit: int = None) -> LexemeResult:
+    result = []
+    for usage_examples in sources:
+        iterators = usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=forms)
+        examples = [list(islice(iterators[form], limit)) for form in forms]
+        result.append((examples, usage_examples.number_of_matches))
+    return result
+
+
+def find_usage_examples(dataframe_usage_examples: List["DataframeUsageExamples"] = None,
+                        lexeme_forms: List[List["Form"]] = None,
+                        processes: int = None,
+                        limit: int = None) -> List[LexemeResult]:
+    """Find the usage examples of the forms of each lexeme in all the
+    dataframes with the given number of processes
+
+    Returns the results in the order of the lexemes"""
+    if dataframe_usage_examples is None or lexeme_forms is None or processes is None:
+        raise ValueError("we did not get what we need")
+    if len(lexeme_forms) == 0:
+        return []
+    with tempfile.TemporaryDirectory(prefix="lexutils-corpus-") as directory:
+        classes_and_directories = []
+        with instrumentation.span("corpus export"):
+            for usage_examples in dataframe_usage_examples:
+                store_directory = os.path.join(directory, usage_examples.pickle_path.name.lower())
+                usage_examples.export_to_corpus_store(directory=store_directory)
+                classes_and_directories.append((type(usage_examples), store_directory))
+        logger.info(f"Searching the dataframes for {len(lexeme_forms)} lexemes with {processes} processes")
+        # A few chunks per process evens out the lexemes with many matches
+        chunksize = max(1, len(lexeme_forms) // (processes * 4))
+        # Forking would copy the locks held by the threads of the console
+        # and the upload queue, so the workers are started afresh
+        with instrumentation.span("dataframe matching"), ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=__open_corpus_stores__,
+            initargs=(classes_and_directories,)
+        ) as executor:
+            return list(executor.map(partial(__find_usage_examples_of_lexeme__, limit=limit),
+                                     lexeme_forms, chunksize=chunksize))
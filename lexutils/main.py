@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
+import argparse
 import gettext
 import logging
 import warnings
 
 from lexutils.config import config
-from lexutils.modules import usage_examples_module
+from lexutils.helpers import backend, profiling
+from lexutils.models.wikidata.enums import WikimediaLanguageCode, WikimediaLanguageQID
+from lexutils.modules import prepare_module, usage_examples_module
 # from prompt_toolkit import prompt
 # from prompt_toolkit.history import FileHistory
 # from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
@@ -32,9 +35,78 @@ Commands = ['examples', 'statistics']
 #             yield Completion(m, start_position=-len(word_before_cursor))
 
 
+def parse_arguments(arguments=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="lexutils.py")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=profiling.modes,
+                        help="profile the session (default cprofile) excluding the time "
+                             "spent waiting for input")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="directory to write the profile and summary to")
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument("--record", metavar="DIRECTORY",
+                          help="save every response from Wikidata and the other APIs to the directory")
+    fixtures.add_argument("--replay", metavar="DIRECTORY",
+                          help="answer the requests with the responses recorded in the directory "
+                               "instead of using the network")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="do not send any edits to Wikidata")
+    parser.add_argument("--candidates", metavar="FILE",
+                        help="review the forms in a candidates file from the prepare command")
+    commands = parser.add_subparsers(dest="command")
+    prepare = commands.add_parser("prepare", help="find usage examples for many forms without asking "
+                                                  "anything and write them to a candidates file")
+    prepare.add_argument("language", choices=[language_code.value for language_code in WikimediaLanguageCode])
+    prepare.add_argument("--forms", type=int, default=1000,
+                         help="number of forms without an example to fetch")
+    prepare.add_argument("--output", metavar="FILE",
+                         help="the candidates file, by default candidates-LANGUAGE.jsonl.gz")
+    serve = commands.add_parser("serve", help="load the Swedish dataframes once and answer the "
+                                              "sessions that have corpus_server_url set in config.py")
+    serve.add_argument("--host", default=config.corpus_server_host)
+    serve.add_argument("--port", type=int, default=config.corpus_server_port)
+    ingest = commands.add_parser("ingest", help="index a Wikidata lexeme dump to answer the form and "
+                                                "count queries locally, see lexeme_dump_index in config.py")
+    ingest.add_argument("dump", help="the dump, e.g. latest-lexemes.json.bz2")
+    ingest.add_argument("--output", metavar="FILE",
+                        help="the index, by default lexeme_dump_index in config.py or lexemes.sqlite")
+    ingest.add_argument("--language", action="append",
+                        choices=[language_code.value for language_code in WikimediaLanguageCode
+                                 if language_code.name in WikimediaLanguageQID.__members__],
+                        help="only index the lexemes in the language, can be given more than once")
+    return parser.parse_args(arguments)
+
+
 def main():
     # logger = logging.getLogger(__name__)
-    usage_examples_module.start()
+    arguments = parse_arguments()
+    if arguments.record:
+        backend.activate("record", directory=arguments.record, dry=arguments.dry_run)
+    elif arguments.replay:
+        backend.activate("replay", directory=arguments.replay, dry=arguments.dry_run)
+    elif arguments.dry_run:
+        backend.activate("live", dry=True)
+    if arguments.profile:
+        profiling.start(mode=arguments.profile)
+    try:
+        if arguments.command == "prepare":
+            prepare_module.start(language_code=WikimediaLanguageCode(arguments.language),
+                                 number_of_forms=arguments.forms,
+                                 output_path=arguments.output or f"candidates-{arguments.language}.jsonl.gz")
+        elif arguments.command == "serve":
+            from lexutils.helpers import corpus_server
+            corpus_server.serve(host=arguments.host, port=arguments.port)
+        elif arguments.command == "ingest":
+            from lexutils.helpers import lexeme_dump
+            languages = ([WikimediaLanguageQID[WikimediaLanguageCode(language).name].value
+                          for language in arguments.language] if arguments.language else None)
+            lexeme_dump.ingest(dump_path=arguments.dump,
+                               index_path=arguments.output or config.lexeme_dump_index or "lexemes.sqlite",
+                               languages=languages)
+        else:
+            usage_examples_module.start(candidates_path=arguments.candidates)
+    finally:
+        if arguments.profile:
+            profiling.stop(output_directory=arguments.profile_dir)
     # # TODO enable choosing work language
     # print(_('This is the REPL. ' +
     #         'Type one of the names of the tools to begin: ' +
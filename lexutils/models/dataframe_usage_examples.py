@@ -1,27 +1,74 @@
 import logging
 from abc import abstractmethod
+from collections import deque
 from os.path import exists
-from typing import List, Optional
+from typing import Deque, Dict, Iterator, List, Optional
 
 import pandas as pd
 from pandas import DataFrame
 
-from lexutils.config.enums import SupportedPicklePaths
+from lexutils.config.enums import SupportedExampleSources, SupportedPicklePaths
 from lexutils.exceptions import DataNotFoundException
+from lexutils.config import config
+from lexutils.helpers import corpus_server, corpus_store, instrumentation, matching, near_duplicates, scoring
+from lexutils.helpers.corpus_store import CorpusStore
+from lexutils.models.record import Record
 from lexutils.models.usage_example import UsageExample
 from lexutils.models.usage_examples import UsageExamples
 from lexutils.models.wikidata.form import Form
 
+word_count_column = "word_count"
+
+
+def add_scores(dataframe: DataFrame,
+               source: SupportedExampleSources = None,
+               target_column: str = "sentence") -> DataFrame:
+    """Add the quality features and the score of every sentence
+    and sort the rows by descending score
+
+    The features are only computed if they are missing. The sorting makes
+    the matches come out best first, so we can yield usage examples lazily
+    in the order they are presented. The shortest sentence wins a tie."""
+    if source is None:
+        raise ValueError("source was None")
+    if not set(scoring.feature_columns).issubset(dataframe.columns):
+        dataframe = dataframe.assign(**scoring.compute_features(dataframe[target_column]))
+    scores = scoring.score(dataframe[scoring.feature_columns], source=source)
+    dataframe = dataframe.assign(**{scoring.score_column: scores})
+    if scores.is_monotonic_decreasing:
+        return dataframe
+    return dataframe.sort_values(
+        [scoring.score_column, word_count_column], ascending=[False, True],
+        kind="stable", ignore_index=True
+    )
+
+
+def without_features(dataframe: DataFrame) -> DataFrame:
+    """The columns the records are created from and the score"""
+    unused_columns = scoring.feature_columns + [near_duplicates.fingerprint_column]
+    return dataframe.drop(columns=[column for column in dataframe.columns if column in unused_columns])
+
 
 class DataframeUsageExamples(UsageExamples):
+    # The memory mapped rows a worker process searches instead of the dataframe,
+    # see lexutils/helpers/worker_pool.py
+    corpus_store: CorpusStore = None
     dataframe: DataFrame = None
     matches: DataFrame = None
     number_of_matches: int = 0
     pickle_path: SupportedPicklePaths = None
     pickle_url: str = None
+    # The corpus server we ask for the matching rows instead of loading the pickle
+    server_url: str = None
+    source: SupportedExampleSources = None
     usage_examples: List[UsageExample] = None
+    target_column = "sentence"
 
-    def __init__(self):
+    def __init__(self, server_url: str = None):
+        if server_url is not None:
+            self.server_url = server_url.rstrip("/")
+            corpus_server.check(url=self.server_url, source=self.source)
+            return
         self.__check_if_the_pickle_exist__()
         self.__load_into_memory__()
 
@@ -38,25 +85,156 @@ class DataframeUsageExamples(UsageExamples):
         logger = logging.getLogger(__name__)
         logger.info(f"Loading the {self.pickle_path.name.title()} dataframe into memory")
         # return pd.read_pickle("test.pkl.gz")
-        self.dataframe = pd.read_pickle(self.pickle_path.value)
+        with instrumentation.span("corpus loading", source=self.pickle_path):
+            self.dataframe = pd.read_pickle(self.pickle_path.value)
+            if not set(scoring.feature_columns).issubset(self.dataframe.columns):
+                logger.info("Computing the features of the sentences. "
+                            "Convert the data again to avoid doing this every time")
+            # The score is always computed because the scorer can be changed in the config
+            self.dataframe = add_scores(self.dataframe, source=self.source,
+                                        target_column=self.target_column)
+            if near_duplicates.fingerprint_column not in self.dataframe.columns:
+                logger.info("Dropping the near duplicate sentences. "
+                            "Convert the data again to avoid doing this every time")
+                self.dataframe = near_duplicates.drop_near_duplicates(
+                    self.dataframe, target_column=self.target_column
+                )
+
+    @property
+    @abstractmethod
+    def max_results_size(self) -> int:
+        pass
+
+    def __find_matching_rows__(self, representations: List[str] = None) -> DataFrame:
+        """Return the rows containing any of the representations
+        in descending score order and set number_of_matches"""
+        if self.server_url is not None:
+            with instrumentation.span("corpus server", source=self.source):
+                self.number_of_matches, matches = corpus_server.find(
+                    url=self.server_url, source=self.source, representations=representations,
+                    min_words=config.min_word_count, max_words=config.max_word_count,
+                    limit=self.max_results_size
+                )
+            return matches
+        if self.dataframe is None:
+            raise ValueError("dataframe was None")
+        pattern = matching.compile_representations(representations)
+        with instrumentation.span("dataframe matching", source=self.pickle_path):
+            matches = self.dataframe[self.dataframe[self.target_column].str.contains(pattern)]
+        self.number_of_matches = len(matches)
+        return matches
+
+    def __iterate_corpus_store_rows__(self, representations: List[str] = None) -> Iterator:
+        self.number_of_matches = 0
+        for index in self.corpus_store.find_rows(column=self.target_column, representations=representations):
+            self.number_of_matches += 1
+            yield self.corpus_store.row(index)
+
+    def __iterate_matching_rows__(self, representations: List[str] = None) -> Iterator:
+        """Yield the rows containing any of the representations in descending
+        score order like DataFrame.itertuples(index=False) does
+
+        The rows of a corpus store are found as they are needed, so
+        number_of_matches is the number of rows found so far."""
+        if self.corpus_store is not None:
+            return self.__iterate_corpus_store_rows__(representations=representations)
+        self.matches = self.__find_matching_rows__(representations=representations)
+        logging.getLogger(__name__).info(f"Found {self.number_of_matches} rows matching any of "
+                                         f"{len(representations)} forms in the {self.pickle_path.name.title()}")
+        return self.matches.itertuples(index=False)
+
+    @abstractmethod
+    def create_record(self, row) -> Record:
+        """Create a record from a row of the dataframe"""
+        pass
 
     def find_form_representation_in_the_dataframe(
             self,
             form: Form = None
     ) -> Optional[List[UsageExample]]:
-        if self.dataframe is None:
-            raise ValueError("dataframe was None")
         if form is None:
             raise ValueError("form was None")
         # logger = logging.getLogger(__name__)
-        target_column = "sentence"
-        self.matches = self.dataframe[self.dataframe[target_column].str.contains(form.representation)]
-        self.number_of_matches = len(self.matches)
+        self.matches = self.__find_matching_rows__(representations=[form.representation])
         return self.convert_matches_to_user_examples(form=form)
 
-    @abstractmethod
+    def export_to_corpus_store(self, directory: str = None) -> None:
+        """Write the rows without the quality features to a corpus store
+        the worker processes can share, see lexutils/helpers/corpus_store.py"""
+        if self.dataframe is None:
+            raise ValueError("dataframe was None")
+        corpus_store.export(dataframe=without_features(self.dataframe), directory=directory)
+
+    def iterate_lexeme_forms_in_the_dataframe(
+            self,
+            forms: List[Form] = None
+    ) -> Dict[Form, Iterator[UsageExample]]:
+        """Find the rows matching any of the forms of one lexeme in a single
+        scan of the dataframe and return an iterator per form that creates
+        the usage examples on demand in descending score order
+
+        The iterators share one pass over the matches so every row is only
+        turned into a record once. The examples for the other forms are
+        kept until their iterators get to them."""
+        if forms is None:
+            raise ValueError("forms was None")
+        rows = self.__iterate_matching_rows__(representations=[form.representation for form in forms])
+        pending: Dict[Form, Deque[UsageExample]] = {form: deque() for form in forms}
+        number_of_examples: Dict[Form, int] = {form: 0 for form in forms}
+
+        def scan_next_row() -> bool:
+            """Returns False when there are no more rows to scan"""
+            remaining_forms = [form for form in forms
+                               if number_of_examples[form] < self.max_results_size]
+            row = next(rows, None) if len(remaining_forms) > 0 else None
+            if row is None:
+                return False
+            record = self.create_record(row)
+            for form, example in record.extract_usage_examples_for_forms(forms=remaining_forms).items():
+                number_of_examples[form] += 1
+                # The score is of the whole row which can contain more than the example
+                example.score = row.score
+                pending[form].append(example)
+            return True
+
+        def iterate(form: Form) -> Iterator[UsageExample]:
+            while True:
+                if len(pending[form]) > 0:
+                    yield pending[form].popleft()
+                elif number_of_examples[form] >= self.max_results_size or not scan_next_row():
+                    return
+
+        return {form: iterate(form) for form in forms}
+
     def convert_matches_to_user_examples(
             self,
             form: Form = None
     ):
-        pass
+        logger = logging.getLogger(__name__)
+        # maximum_result_size_reached = False
+        if self.number_of_matches > 0:
+            logger.info(f"Found {self.number_of_matches} number of rows matching "
+                        f"{form.representation} in the {self.pickle_path.name.title()}")
+            examples = []
+            count = 1
+            for row in self.matches.itertuples(index=False):
+                logger.debug(row)
+                if count < self.max_results_size:
+                    if self.number_of_matches > self.max_results_size:
+                        logger.debug(f"Processing match {count}/{self.max_results_size} "
+                                     f"out of a total of {self.number_of_matches} matches")
+                    else:
+                        logger.debug(f"Processing match {count}/{self.number_of_matches} matches")
+                    record = self.create_record(row)
+                    example = record.extract_usage_example_if_suitable(form=form)
+                    if example is not None:
+                        # logger.info("Looking up the QID for the document")
+                        # example.record.lookup_qid()
+                        examples.append(example)
+                    count += 1
+                else:
+                    break
+            logger.debug(f"returning {len(examples)} examples")
+            return examples
+        else:
+            logger.info(f"Found no rows matching {form.representation} in the {self.pickle_path.name.title()}")
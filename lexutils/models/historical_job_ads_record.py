@@ -10,6 +10,7 @@ logger = logging.getLogger(__name__)
 
 
 class HistoricalJobAd(Record):
+    __slots__ = ()
     base_url = BaseURLs.ARBETSFORMEDLINGEN_HISTORICAL_ADS.value
     language_style = LanguageStyle.FORMAL
     type_of_reference = ReferenceType.WRITTEN
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import logging
+
+from lexutils.config.enums import LanguageStyle, ReferenceType, SupportedExampleSources, BaseURLs
+from lexutils.models.record import Record
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+logger = logging.getLogger(__name__)
+
+
+class KsamsokRecord(Record):
+    """This models an item description from the K-samsök API
+
+    The id is the K-samsök URI without the base url, e.g. MM/foto/703356.
+    K-samsök does not have dates on the creation of objects
+    nor on when e.g. a photo was taken so we never have a date."""
+    __slots__ = ()
+    api_name = "K-samsök API"
+    base_url = BaseURLs.KSAMSOK.value
+    language_style = LanguageStyle.FORMAL
+    type_of_reference = ReferenceType.WRITTEN
+    source = SupportedExampleSources.KSAMSOK
+    # The descriptions are written by Swedish museums
+    language_code = WikimediaLanguageCode.SWEDISH
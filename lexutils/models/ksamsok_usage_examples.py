@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+
+from lexutils.config import config
+from lexutils.config.enums import BaseURLs, SupportedExampleSources
+from lexutils.helpers import instrumentation
+from lexutils.models.api_usage_examples import APIUsageExamples
+from lexutils.models.ksamsok_record import KsamsokRecord
+from lexutils.models.usage_example import UsageExample
+
+logger = logging.getLogger(__name__)
+
+# Responses are cached per url during the session because the
+# same representation is often searched for more than once
+response_cache: Dict[str, Dict] = {}
+
+
+def extract_item_descriptions(page: Dict) -> Iterator[Tuple[str, str]]:
+    """Yield (ksamsok_id, description) for every usable
+    ItemDescription in a page of JSON-LD search results
+
+    We walk the @graph of each record only once and skip OCR garbage."""
+    for result in page["result"]["records"]:
+        record = result["record"]
+        if "@graph" not in record:
+            logger.debug("@graph not found in record")
+            continue
+        ksamsok_id = None
+        descriptions = []
+        for item in record["@graph"]:
+            item_type = item.get("@type")
+            if item_type == "Entity" and ksamsok_id is None:
+                ksamsok_id = item["@id"].replace(BaseURLs.KSAMSOK.value, "")
+            elif item_type == "ItemDescription" and "desc" in item:
+                description = item["desc"].strip()
+                if "[OCR]" in description.upper():
+                    logger.debug(f"ocr description {description} skipped")
+                    continue
+                descriptions.append(description)
+        if ksamsok_id is not None:
+            for description in descriptions:
+                yield ksamsok_id, description
+
+
+class KsamsokUsageExamples(APIUsageExamples):
+    """This fetches item descriptions from K-samsök and
+    turns them into usage examples
+
+    The first page tells us the total number of hits, the rest of the
+    pages are fetched concurrently with a bounded number of requests."""
+    api_name = "K-samsök API"
+    api_url = "http://kulturarvsdata.se/ksamsok/api"
+    headers = {'Accept': 'application/json'}
+    page_size = 50
+
+    def __params__(self, start_record: int) -> Dict:
+        return {
+            "x-api": "test",
+            "method": "search",
+            "hitsPerPage": self.page_size,
+            "query": self.form.representation,
+            "startRecord": start_record,
+        }
+
+    async def __get_page__(
+            self,
+            client: httpx.AsyncClient,
+            semaphore: asyncio.Semaphore,
+            start_record: int
+    ) -> Optional[Dict]:
+        request = client.build_request("GET", self.api_url,
+                                       params=self.__params__(start_record),
+                                       headers=self.headers)
+        url = str(request.url)
+        if url in response_cache:
+            logger.debug(f"Got {url} from the cache")
+            instrumentation.count("response cache hit", source=SupportedExampleSources.KSAMSOK)
+            return response_cache[url]
+        instrumentation.count("response cache miss", source=SupportedExampleSources.KSAMSOK)
+        async with semaphore:
+            # catch read timeouts gracefully
+            # https://github.com/encode/httpx/blob/
+            # e3a7b6d7318f943b2289437f74028cb36b5b02e4/docs/exceptions.md
+            try:
+                response = await client.send(request)
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as exc:
+                logger.info(f"An error occurred while requesting {url!r}: {exc}")
+                return None
+        response_cache[url] = data
+        return data
+
+    async def __fetch_pages__(self) -> List[Dict]:
+        semaphore = asyncio.Semaphore(config.ksamsok_max_concurrent_requests)
+        async with httpx.AsyncClient() as client:
+            first_page = await self.__get_page__(client, semaphore, 1)
+            if first_page is None:
+                return []
+            total_hits = min(int(first_page["result"]["totalHits"]),
+                             config.ksamsok_max_results_size)
+            logger.info(f"Found {total_hits} hits in the {self.api_name}")
+            pages = await asyncio.gather(
+                *[self.__get_page__(client, semaphore, start_record)
+                  for start_record in range(1 + self.page_size, total_hits + 1, self.page_size)]
+            )
+        return [first_page] + [page for page in pages if page is not None]
+
+    def get_records(self) -> None:
+        logger.info(f"Fetching usage examples from the {self.api_name}...")
+        with instrumentation.span("http search", source=SupportedExampleSources.KSAMSOK):
+            pages = asyncio.run(self.__fetch_pages__())
+        self.records = []
+        # The same description is often used for many objects
+        seen_descriptions = set()
+        for page in pages:
+            for ksamsok_id, description in extract_item_descriptions(page):
+                if description not in seen_descriptions:
+                    seen_descriptions.add(description)
+                    self.records.append(KsamsokRecord(id=ksamsok_id, text=description))
+        logger.info(f"Got {len(self.records)} records")
+
+    def process_records_into_usage_examples(
+            self
+    ) -> List[UsageExample]:
+        self.usage_examples = []
+        if self.records:
+            # Filter on length for all descriptions at once before
+            # doing the more expensive matching per record
+            texts = pd.Series([record.text for record in self.records])
+            word_counts = texts.str.split().str.len()
+            suitable = (word_counts > config.min_word_count) & (word_counts < config.max_word_count)
+            for record, is_suitable in zip(self.records, suitable):
+                if is_suitable:
+                    example = record.extract_usage_example_if_suitable(form=self.form)
+                    if example is not None:
+                        self.usage_examples.append(example)
+        logger.info(f"Found {len(self.usage_examples)} suitable usage examples from the {self.api_name}")
+        return self.usage_examples
@@ -0,0 +1,66 @@
+import heapq
+from typing import Iterable, Iterator, List, Tuple
+
+from lexutils.config import config
+from lexutils.helpers import instrumentation, near_duplicates
+from lexutils.models.usage_example import UsageExample
+
+
+def rank(example: UsageExample) -> Tuple[float, int]:
+    """The best score first and the shortest example first on a tie"""
+    return -example.score, example.word_count
+
+
+class LazyUsageExamples:
+    """The usage examples of a form from all sources in descending score order
+
+    The examples from the APIs are fetched up front but the dataframe
+    sources are iterators that create the records and usage examples on
+    demand, so we only pay for the examples the user actually gets to see.
+    Each source has to yield its examples in descending score order.
+    Near duplicates of an example we already produced are skipped, also
+    when they come from different sources.
+    The examples produced so far are kept, so this can be iterated more than once."""
+    __slots__ = ("eager_examples", "number_of_candidates", "_merged", "_produced", "_near_duplicates")
+    eager_examples: List[UsageExample]
+    # This is an upper bound because the rows from the dataframes
+    # are only checked for suitability when they are reached
+    number_of_candidates: int
+
+    def __init__(self,
+                 eager_examples: List[UsageExample] = None,
+                 lazy_sources: Iterable[Iterator[UsageExample]] = None,
+                 number_of_lazy_candidates: int = 0):
+        self.eager_examples = sorted(eager_examples or [], key=rank)
+        self.number_of_candidates = len(self.eager_examples) + number_of_lazy_candidates
+        self._merged = heapq.merge(self.eager_examples, *(lazy_sources or []), key=rank)
+        self._produced: List[UsageExample] = []
+        self._near_duplicates = near_duplicates.NearDuplicateIndex(
+            max_distance=config.near_duplicate_max_distance_in_candidates
+        )
+
+    def __next_distinct__(self):
+        for example in self._merged:
+            if self._near_duplicates.add_if_new(near_duplicates.fingerprint(example.text)):
+                return example
+            instrumentation.count("near duplicates collapsed", source=example.record.source)
+        return None
+
+    def __iter__(self) -> Iterator[UsageExample]:
+        index = 0
+        while True:
+            if index == len(self._produced):
+                example = self.__next_distinct__()
+                if example is None:
+                    return
+                self._produced.append(example)
+            yield self._produced[index]
+            index += 1
+
+    def is_empty(self) -> bool:
+        """This produces at most the first example"""
+        return next(iter(self), None) is None
+
+    @property
+    def number_of_examples_produced(self) -> int:
+        return len(self._produced)
@@ -1,26 +1,79 @@
 from __future__ import annotations
 import logging
-import random
-from typing import List, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 from wikibaseintegrator.wbi_helpers import execute_sparql_query
 
 from lexutils.config import config, constants
-from lexutils.config.enums import SupportedFormPickles
-from lexutils.helpers import wdqs, tui, util
+from lexutils.config.enums import SupportedFormPickles, SupportedExampleSources
+from lexutils.helpers import instrumentation, lexeme_dump, matching, scoring, wdqs, tui, util, wikisource, \
+    work_allocation
 from lexutils.helpers.console import console
 from lexutils.helpers.handle_pickles import read_from_pickle, add_to_pickle
+from lexutils.models.lazy_usage_examples import LazyUsageExamples
 from lexutils.models.usage_example import UsageExample
 from lexutils.models.wikidata.entities import Lexeme
+from lexutils.models.wikidata.entity_id import EntityID
 from lexutils.models.wikidata.enums import WikimediaLanguageCode, WikimediaLanguageQID
-from lexutils.models.wikidata.form import Form
-from lexutils.models.wikisource_usage_examples import WikisourceUsageExamples
+from lexutils.models.wikidata.form import Form, parse_forms
 
 if TYPE_CHECKING:
     from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
     from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
     from lexutils.models.dataframe_usage_examples import DataframeUsageExamples
 
+# Wikisource is not searched for a form with this many candidates from better sources
+enough_candidates = 50
+
+
+def forms_without_an_example_query(language_qid: WikimediaLanguageQID = None,
+                                   number_of_forms: int = None,
+                                   after: Optional[str] = None,
+                                   shard: int = 0,
+                                   shards: int = 1) -> str:
+    """Forms that have no example demonstrating them and that have at least
+    one sense with P5137 (item for this sense) in the order of the lexeme
+    number and the form number like EntityID, starting after the form id in after
+
+    Filtering on the position instead of using an offset means WDQS never
+    computes rows only to skip them. With more than one shard only the
+    lexemes with a number that is shard modulo shards are included."""
+    if language_qid is None or number_of_forms is None:
+        raise ValueError("we did not get what we need")
+    filters = []
+    if after is not None:
+        after = EntityID(after)
+        filters.append(f"FILTER(?number > {after.number} || "
+                       f"(?number = {after.number} && ?form_number > {after.sub_number}))")
+    if shards > 1:
+        # SPARQL has no modulo operator
+        filters.append(f"FILTER(?number - {shards} * FLOOR(?number / {shards}) = {shard})")
+    return f'''
+        select ?lexeme ?form ?form_representation ?category
+        (group_concat(distinct ?feature; separator = ",") as ?grammatical_features)
+        WHERE {{
+            ?lexeme dct:language wd:{language_qid.value};
+                    wikibase:lemma ?lemma;
+                    wikibase:lexicalCategory ?category;
+                    ontolex:lexicalForm ?form;
+                    ontolex:sense ?sense.
+            ?sense wdt:P5137 [].
+            ?form ontolex:representation ?form_representation;
+            wikibase:grammaticalFeature ?feature.
+            BIND(xsd:integer(STRAFTER(STR(?lexeme), "{config.wd_prefix}L")) AS ?number)
+            BIND(xsd:integer(STRAFTER(STR(?form), "-F")) AS ?form_number)
+            {" ".join(filters)}
+            MINUS {{
+            ?lexeme p:P5831 ?statement.
+            ?statement ps:P5831 ?example;
+                     pq:P6072 [];
+                     pq:P5830 ?form_with_example.
+            }}
+        }}
+        group by ?lexeme ?number ?form ?form_number ?form_representation ?category
+        order by ?number ?form_number
+        limit {number_of_forms}'''
+
 
 class Lexemes:
     """This class holds all lexemes and forms we currently work on
@@ -39,9 +92,53 @@ class Lexemes:
     number_of_forms_without_an_example: int = 0
     number_of_senses_with_P5137: int = 0
 
+    def __find_usage_examples_in_the_dataframes__(
+            self,
+            forms: List[Form] = None,
+            processes: int = 1,
+    ) -> Tuple[Dict[Form, List[Iterator[UsageExample]]], Dict[Form, int]]:
+        """Scan the dataframes once per lexeme for all its forms
+
+        Returns the lazy iterators over the usage examples per form
+        and the number of candidate rows per form. With more than one
+        process the lexemes are split between a pool of processes which
+        create the best config.prepare_candidates_per_source examples
+        of each form up front. A corpus server is already fast so
+        the processes are not used with one."""
+        if forms is None:
+            raise ValueError("forms was None")
+        logger = logging.getLogger(__name__)
+        sources: Dict[Form, List[Iterator[UsageExample]]] = {form: [] for form in forms}
+        number_of_candidates: Dict[Form, int] = {form: 0 for form in forms}
+        if (self.language_code == WikimediaLanguageCode.SWEDISH and processes > 1
+                and config.corpus_server_url is None):
+            from lexutils.helpers import worker_pool
+            dataframes = [self.historical_ads_usage_examples, self.riksdagen_usage_examples]
+            groups = list(matching.group_forms_by_lexeme(forms).values())
+            results = worker_pool.find_usage_examples(dataframe_usage_examples=dataframes, lexeme_forms=groups,
+                                                      processes=processes,
+                                                      limit=config.prepare_candidates_per_source)
+            for lexeme_forms, result in zip(groups, results):
+                for dataframe_usage_examples, (examples, number_of_rows) in zip(dataframes, result):
+                    for form, form_examples in zip(lexeme_forms, examples):
+                        sources[form].append(iter(form_examples))
+                        number_of_candidates[form] += min(number_of_rows, dataframe_usage_examples.max_results_size)
+        elif self.language_code == WikimediaLanguageCode.SWEDISH:
+            logger.info("Trying to find usage examples in the dataframes")
+            for lexeme_forms in matching.group_forms_by_lexeme(forms).values():
+                for dataframe_usage_examples in [self.historical_ads_usage_examples,
+                                                 self.riksdagen_usage_examples]:
+                    found = dataframe_usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=lexeme_forms)
+                    for form, iterator in found.items():
+                        sources[form].append(iterator)
+                        number_of_candidates[form] += min(dataframe_usage_examples.number_of_matches,
+                                                          dataframe_usage_examples.max_results_size)
+        return sources, number_of_candidates
+
     def __get_usage_examples_from_apis__(
             self,
             form: Form = None,
+            number_of_dataframe_candidates: int = 0,
     ) -> List[UsageExample]:
         """Find examples and return them as Example objects"""
         if form is None:
@@ -57,38 +154,33 @@ class Lexemes:
         #     records[record] = europarl_records[record]
         # logger.debug(f"records in total:{len(records)}")
         if self.language_code == WikimediaLanguageCode.SWEDISH:
-            logger.info("Trying to find usage examples in the dataframes")
-            historical_ads_examples = self.historical_ads_usage_examples.find_form_representation_in_the_dataframe(
-                form=form)
-            if historical_ads_examples is not None:
-                examples.extend(historical_ads_examples)
-            # print("debug exit")
-            # exit()
-            riksdagen_examples = self.riksdagen_usage_examples.find_form_representation_in_the_dataframe(form=form)
-            if riksdagen_examples is not None:
-                examples.extend(riksdagen_examples)
-        # ksamsok
-        # Disabled because it yields very little of value
-        # unfortunately because the data is such low quality overall
-        # ksamsok_records = ksamsok.get_records(form)
-        # for record in ksamsok_records:
-        #     records[record] = ksamsok_records[record]
-        # logger.debug(f"records in total:{len(records)}")
+            # K-samsök is disabled by default because it yields
+            # very little of value as the data is such low quality overall
+            if config.enable_ksamsok:
+                from lexutils.models.ksamsok_usage_examples import KsamsokUsageExamples
+                ksamsok = KsamsokUsageExamples(
+                    form=form,
+                    lexemes=self
+                )
+                examples.extend(ksamsok.usage_examples)
         # Wikisource
-        if len(examples) < 50:
-            # If we already got 50 examples from a better source,
+        if number_of_dataframe_candidates + len(examples) < enough_candidates:
+            # If we already got enough candidates from a better source,
             # then don't fetch from Wikisource
-            wikisource = WikisourceUsageExamples(
+            from lexutils.models.wikisource_usage_examples import WikisourceUsageExamples
+            wikisource_examples = WikisourceUsageExamples(
                 form=form,
                 lexemes=self
             )
-            wikisource_usage_examples = wikisource.process_records_into_usage_examples()
+            wikisource_usage_examples = wikisource_examples.process_records_into_usage_examples()
             if wikisource_usage_examples is not None:
                 examples.extend(wikisource_usage_examples)
         # Check for nested list
         for example in examples:
             if not isinstance(example, UsageExample):
                 raise ValueError("Nested list error")
+        # The dataframe examples get their score from the precomputed column
+        scoring.score_usage_examples(examples)
         if len(examples) > 0:
             logger.debug(f"examples found:{[example.text for example in examples]}")
         return examples
@@ -97,54 +189,62 @@ class Lexemes:
         self.language_code = WikimediaLanguageCode(language_code)
         self.language_qid = WikimediaLanguageQID[self.language_code.name]
 
-    def fetch_forms_without_an_example(self):
-        logger = logging.getLogger(__name__)
-        # title:Forms that have no example demonstrating them and that have at least
-        # one sense with P5137 (item for this sense)
-        random_offset = random.randint(20, 1000)
-        logger.info(f"random offset:{random_offset}")
-        results = execute_sparql_query(f'''
-                select ?lexeme ?form ?form_representation ?category  
-                (group_concat(distinct ?feature; separator = ",") as ?grammatical_features)
-                WHERE {{
-                    ?lexeme dct:language wd:{self.language_qid.value};
-                            wikibase:lemma ?lemma;
-                            wikibase:lexicalCategory ?category;
-                            ontolex:lexicalForm ?form;
-                            ontolex:sense ?sense.
-                    ?sense wdt:P5137 [].
-                    ?form ontolex:representation ?form_representation;
-                    wikibase:grammaticalFeature ?feature.
-                    MINUS {{
-                    ?lexeme p:P5831 ?statement.
-                    ?statement ps:P5831 ?example;
-                             pq:P6072 [];
-                             pq:P5830 ?form_with_example.
-                    }}
-                }}
-                group by ?lexeme ?form ?form_representation ?category
-                offset {random_offset}
-                limit {config.number_of_forms_to_fetch}''',
-                                       debug=False)
-        self.forms_without_an_example = []
+    def __fetch_page_of_forms_without_an_example__(self, number_of_forms: int = None,
+                                                   after: Optional[str] = None) -> List[Dict]:
+        index = lexeme_dump.get_index()
+        if index is not None:
+            with instrumentation.span("lexeme index query", source="forms"):
+                return index.forms_without_an_example(
+                    language_qid=self.language_qid.value, number_of_forms=number_of_forms, after=after,
+                    shard=config.form_shard, shards=config.form_shards
+                )
+        with instrumentation.span("wdqs query", source="forms"):
+            results = execute_sparql_query(forms_without_an_example_query(
+                language_qid=self.language_qid, number_of_forms=number_of_forms, after=after,
+                shard=config.form_shard, shards=config.form_shards
+            ))
         # pprint(results)
         if "results" in results:
             if "bindings" in results["results"]:
-                # logger.debug(f"data:{results['results']['bindings']}")
-                forms = results["results"]['bindings']
-                logger.info(f"Got {len(forms)} lexemes")
-                for entry in forms:
-                    # logger.info(f"data:{entry.keys()}")
-                    # logging.debug(f"lexeme_json:{entry}")
-                    form = Form(entry, language_code=self.language_code)
-                    logger.info(f"appending {form} to list of forms")
-                    # logger.info("debug exit")
-                    # exit(0)
-                    self.forms_without_an_example.append(form)
+                return results["results"]['bindings']
             else:
                 raise ValueError("Got no bindings dict from WD")
         else:
             raise ValueError("Got no results dict from WD")
+
+    @property
+    def forms_cursor_name(self) -> str:
+        if config.form_shards > 1:
+            return f"forms-{self.language_code.value}-{config.form_shard}of{config.form_shards}"
+        return f"forms-{self.language_code.value}"
+
+    def fetch_forms_without_an_example(self, number_of_forms: int = None):
+        """Fetch the next page of forms without an example
+
+        The position is kept between sessions, see lexutils/helpers/work_allocation.py.
+        The page is only kept if no other session claimed it while we
+        fetched it, otherwise we fetch the page after theirs. After the
+        last page we start over to get the forms that were skipped or
+        handed back since."""
+        logger = logging.getLogger(__name__)
+        if number_of_forms is None:
+            number_of_forms = config.number_of_forms_to_fetch
+        while True:
+            after = work_allocation.read_cursor(name=self.forms_cursor_name)
+            logger.info(f"Fetching {number_of_forms} forms after {after}")
+            forms = self.__fetch_page_of_forms_without_an_example__(number_of_forms=number_of_forms, after=after)
+            if len(forms) == 0 and after is not None:
+                logger.info("Reached the end of the forms without an example, starting over")
+                forms = self.__fetch_page_of_forms_without_an_example__(number_of_forms=number_of_forms)
+            logger.info(f"Got {len(forms)} lexemes")
+            with instrumentation.span("form parsing"):
+                self.forms_without_an_example = parse_forms(bindings=forms, language_code=self.language_code)
+            # A short page is the last one
+            end = self.forms_without_an_example[-1].id if len(forms) == number_of_forms else None
+            # This also claims the first page when we started over
+            if work_allocation.advance_cursor(name=self.forms_cursor_name, expected=after, value=end):
+                break
+            logger.info(f"Another session claimed the forms after {after}, fetching the next page")
         if len(self.forms_without_an_example) == 0:
             console.print("Got no forms from Wikidata to work on for this language "
                           "if you think this is a bug, please open an issue here "
@@ -167,6 +267,9 @@ class Lexemes:
     def count_number_of_lexemes(self):
         """Returns an int"""
         logger = logging.getLogger(__name__)
+        index = lexeme_dump.get_index()
+        if index is not None:
+            return index.count_lexemes(language_qid=self.language_qid.value)
         result = (execute_sparql_query(f'''
             SELECT
             (COUNT(?l) as ?count)
@@ -181,6 +284,9 @@ class Lexemes:
     def count_number_of_senses_with_p5137(self):
         """Returns an int"""
         logger = logging.getLogger(__name__)
+        index = lexeme_dump.get_index()
+        if index is not None:
+            return index.count_senses_with_p5137(language_qid=self.language_qid.value)
         result = (execute_sparql_query(f'''
             SELECT
             (COUNT(?sense) as ?count)
@@ -199,6 +305,12 @@ class Lexemes:
     def count_number_of_forms_without_an_example(self):
         """Returns an int"""
         # TODO fix this to count all senses in a given language
+        index = lexeme_dump.get_index()
+        if index is not None:
+            self.number_of_forms_without_an_example = index.count_forms_without_an_example(
+                language_qid=self.language_qid.value
+            )
+            return
         result = (execute_sparql_query(f'''
             SELECT
             (COUNT(?form) as ?count)
@@ -218,8 +330,13 @@ class Lexemes:
     def count_number_of_forms_with_examples(self):
         pass
 
-    def fetch_usage_examples(self):
-        """Fetch usage examples for all forms"""
+    def fetch_usage_examples(self, confirm: bool = None, processes: int = 1):
+        """Fetch usage examples for all forms
+
+        The user is asked to confirm each form if confirm
+        is True, by default if config.require_form_confirmation.
+        The dataframes are searched with a pool of processes
+        if processes is more than 1."""
         if self.forms_without_an_example is None:
             raise ValueError("self.forms_without_an_example was None")
         number_of_forms = len(self.forms_without_an_example)
@@ -228,19 +345,13 @@ class Lexemes:
         logger = logging.getLogger(__name__)
         # console.print(f"Fetching usage examples for {len(self.forms_without_an_example)} forms")
         # console.print(f"Fetching usage examples for all forms")
-        # from http://stackoverflow.com/questions/306400/ddg#306417
-        # We do this now because we only want to do it once
-        # and keep it in memory during the looping through all the forms
-        if self.language_code == WikimediaLanguageCode.SWEDISH:
-            logger.info("Loading Swedish dataframes now")
-            from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
-            from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
-            self.historical_ads_usage_examples = HistoricalJobAdsUsageExamples()
-            self.riksdagen_usage_examples = RiksdagenUsageExamples()
         self.forms_with_usage_examples_found = []
-        count = 1
         approved_forms = []
-        if config.require_form_confirmation:
+        if confirm is None:
+            confirm = config.require_form_confirmation
+        if confirm:
+            # The prompts come first so the time it takes to answer them
+            # is not part of the fetch usage examples stage
             for form in self.forms_without_an_example:
                 if util.yes_no_question(tui.work_on(form=form)):
                     approved_forms.append(form)
@@ -248,28 +359,89 @@ class Lexemes:
                     logger.info("Adding form to declined pickle_path")
                     add_to_pickle(pickle=SupportedFormPickles.DECLINED_FORMS,
                                   form_id=form.id)
+                    work_allocation.complete(form_id=form.id, status=work_allocation.declined)
         else:
             # Approve all forms
             approved_forms.extend(self.forms_without_an_example)
-        for form in approved_forms:
+        self.__fetch_usage_examples_of_forms__(forms=approved_forms, processes=processes)
+
+    @instrumentation.timed("fetch usage examples")
+    def __fetch_usage_examples_of_forms__(self, forms: List[Form] = None, processes: int = 1):
+        if forms is None:
+            raise ValueError("forms was None")
+        logger = logging.getLogger(__name__)
+        # from http://stackoverflow.com/questions/306400/ddg#306417
+        # We do this now because we only want to do it once
+        # and keep it in memory during the looping through all the forms
+        if self.language_code == WikimediaLanguageCode.SWEDISH:
+            logger.info("Loading Swedish dataframes now")
+            from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+            from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+            # With a corpus server the dataframes are not loaded here
+            self.historical_ads_usage_examples = HistoricalJobAdsUsageExamples(server_url=config.corpus_server_url)
+            self.riksdagen_usage_examples = RiksdagenUsageExamples(server_url=config.corpus_server_url)
+        forms_to_process = []
+        for form in forms:
             finished = read_from_pickle(pickle=SupportedFormPickles.FINISHED_FORMS,
                                         form_id=form.id)
             declined = read_from_pickle(pickle=SupportedFormPickles.DECLINED_FORMS,
                                         form_id=form.id)
             if not finished and not declined:
-                with console.status(f"Processing form {count}/{number_of_forms}"):
-                    if form.lexeme_id is None:
-                        raise ValueError("lexeme_id on form was None")
-                    # fetch usage examples
-                    # Fetch sentence data from all APIs
-                    form.usage_examples: List[UsageExample] = self.__get_usage_examples_from_apis__(
+                if form.lexeme_id is None:
+                    raise ValueError("lexeme_id on form was None")
+                forms_to_process.append(form)
+        with console.status("Searching the dataframes"):
+            dataframe_sources, dataframe_candidates = self.__find_usage_examples_in_the_dataframes__(
+                forms=forms_to_process,
+                processes=processes
+            )
+        # Search Wikisource concurrently up front for the forms that
+        # need it, so the loop below only hits the cache
+        wikisource.search(language_code=self.language_code,
+                          representations=[form.representation for form in forms_to_process
+                                           if dataframe_candidates[form] < enough_candidates])
+        for count, form in enumerate(forms_to_process, start=1):
+            with console.status(f"Processing form {count}/{len(forms_to_process)}"):
+                # Fetch sentence data from all APIs and merge them with the
+                # dataframe rows which are only turned into examples when needed
+                form.usage_examples = LazyUsageExamples(
+                    eager_examples=self.__get_usage_examples_from_apis__(
                         form=form,
-                    )
-                    form.number_of_examples_found = len(form.usage_examples)
-                    logger.info(f"Found {form.number_of_examples_found} usage examples for '{form.representation}'")
-                    if form.number_of_examples_found > 0:
-                        self.forms_with_usage_examples_found.append(form)
-            count += 1
+                        number_of_dataframe_candidates=dataframe_candidates[form]
+                    ),
+                    lazy_sources=dataframe_sources[form],
+                    number_of_lazy_candidates=dataframe_candidates[form]
+                )
+                form.number_of_examples_found = form.usage_examples.number_of_candidates
+                logger.info(f"Found {form.number_of_examples_found} candidate usage examples "
+                            f"for '{form.representation}'")
+                if not form.usage_examples.is_empty():
+                    self.forms_with_usage_examples_found.append(form)
+        self.resolve_wikisource_qids()
+
+    def resolve_wikisource_qids(self):
+        """Look up the QIDs of all the Wikisource pages we found examples
+        in at once so accepting an example does not have to wait for it"""
+        logger = logging.getLogger(__name__)
+        records = [
+            example.record
+            for form in self.forms_with_usage_examples_found
+            # The Wikisource examples are always fetched up front
+            for example in form.usage_examples.eager_examples
+            if example.record.source == SupportedExampleSources.WIKISOURCE
+        ]
+        if len(records) > 0:
+            try:
+                qids = wikisource.resolve_qids(
+                    language_code=self.language_code,
+                    titles=[record.document_title for record in records]
+                )
+            except ValueError as exc:
+                # The records will try again when the example is accepted
+                logger.warning(f"Could not resolve the Wikisource QIDs: {exc}")
+                return
+            for record in records:
+                record.document_qid = qids[record.document_title]
 
     def orthohin_url(self):
         return f"{constants.orthohin}add/{self.language_code.value}"
@@ -1,31 +1,35 @@
 import logging
-from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from sys import intern
+from typing import Dict, List, Optional
 from urllib.parse import quote
 
 from lexutils.config import config
+from lexutils.config.enums import LanguageStyle, ReferenceType, SupportedExampleSources
+from lexutils.helpers import normalizer
 from lexutils.models.usage_example import UsageExample
 from lexutils.models.wikidata.enums import WikimediaLanguageCode
 from lexutils.models.wikidata.form import Form
 
 
 class Record:
+    """Base model for a text we look for usage examples in
+
+    The metadata that is the same for all records from a source is
+    kept in class attributes and only the per record values in slots.
+    Subclasses have to define __slots__ too or they get a __dict__."""
+    __slots__ = ("id", "text", "date", "document_qid", "filename")
     base_url: str = None
-    id: str = None
-    date: datetime = None
-    # Used for Riksdagen records
-    document_qid = None
-    exact_hit: bool = False
-    inexact_hit: bool = False
+    id: str
+    date: Optional[datetime]
+    # Used for Riksdagen and Wikisource records
+    document_qid: Optional[str]
     language_code: WikimediaLanguageCode = None
-    language_style = LanguageStyle = None
-    # This is needed for the europarl source
-    line_number: int = None
-    source = SupportedExampleSources = None
-    text: str = None
-    type_of_reference = ReferenceType = None
-    filename: str = None
+    language_style: LanguageStyle = None
+    source: SupportedExampleSources = None
+    text: str
+    type_of_reference: ReferenceType = None
+    filename: Optional[str]
 
     def __init__(
             self,
@@ -39,12 +43,13 @@ class Record:
         if text is None:
             raise ValueError("text was None")
         self.text = text
-        self.id = id
+        # Many sentences come from the same document so we intern the
+        # ids and filenames to keep only one copy of each
+        self.id = intern(id) if type(id) is str else id
         # Optional
-        if date is not None:
-            self.date = date
-        if filename is not None:
-            self.filename = filename
+        self.date = date
+        self.filename = intern(filename) if type(filename) is str else filename
+        self.document_qid = None
 
     def find_usage_examples_from_summary(
             self,
@@ -60,26 +65,36 @@ class Record:
         # away all chars and then split the text into words
         if form is None:
             raise ValueError("form was None")
+        examples = self.extract_usage_examples_for_forms(forms=[form])
+        if form in examples:
+            return examples[form]
+
+    def extract_usage_examples_for_forms(
+            self,
+            forms: List[Form] = None,
+    ) -> Dict[Form, UsageExample]:
+        """Return a usage example for each of the forms that appear in the text
+
+        The text is normalized only once and a form only gets an example
+        if one of the words is exactly its representation, so a hit for
+        one form of a lexeme does not count as a hit for the others"""
+        if forms is None:
+            raise ValueError("forms was None")
         logger = logging.getLogger(__name__)
         # This is a very crude test for relevancy, we lower first to improve matching
-        logger.debug(f"Sentence before cleaning: {self.text}")
-        cleaned_sentence = self.text.lower()
-        punctuations = [".", ",", "!", "?", "„", "“", "\n",
-                       ":", ";", "`", "´", "$", "€"]
-        for punctuation in punctuations:
-            if punctuation in cleaned_sentence:
-                cleaned_sentence = cleaned_sentence.replace(punctuation, " ")
-        logger.debug(f"cleaned sentence: {cleaned_sentence}")
-        if form.representation.lower() in cleaned_sentence.split():
-            logger.info(f"The form '{form.representation}' was found in the cleaned sentence. :)")
-            sentence_length = len(cleaned_sentence.split(" "))
-            if (
-                    config.min_word_count < sentence_length < config.max_word_count
-            ):
-                return UsageExample(text=self.text,
-                                    record=self)
-            else:
-                logger.debug(f"{cleaned_sentence} was discarded based on length")
+        words = normalizer.tokenize(self.text, self.language_code)
+        examples = {}
+        for form in forms:
+            if form.representation.lower() in words:
+                logger.debug(f"The form '{form.representation}' was found in the cleaned sentence. :)")
+                if (
+                        config.min_word_count < len(words) < config.max_word_count
+                ):
+                    examples[form] = UsageExample(text=self.text,
+                                                  record=self)
+                else:
+                    logger.debug(f"{self.text} was discarded based on length")
+        return examples
 
     def lookup_qid(self):
         pass
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING, Optional
+from typing import Dict, List, TYPE_CHECKING, Optional
 
 from wikibaseintegrator.wbi_helpers import execute_sparql_query
 
-from lexutils.config import config
 from lexutils.config.enums import SupportedExampleSources, LanguageStyle, ReferenceType, BaseURLs
 from lexutils.helpers.wdqs import extract_the_first_wikibase_value_from_a_wdqs_result_set
 from lexutils.models.record import Record
 from lexutils.models.usage_example import UsageExample
+from lexutils.models.wikidata.entity_id import EntityID
 from lexutils.models.wikidata.enums import WikimediaLanguageCode
 
 if TYPE_CHECKING:
@@ -18,6 +18,7 @@ if TYPE_CHECKING:
 
 class RiksdagenRecord(Record):
     """This models a record in the Riksdagen dataset"""
+    __slots__ = ()
     api_name = "Riksdagen API"
     base_url = BaseURLs.RIKSDAGEN.value
     # Because of language detection during the pre-processing
@@ -42,3 +43,25 @@ class RiksdagenRecord(Record):
         self.document_qid = extract_the_first_wikibase_value_from_a_wdqs_result_set(result, "item")
         logging.info(f"document_qid:{self.document_qid}")
 
+
+def lookup_qids(ids: List[str] = None) -> Dict[str, Optional[str]]:
+    """Look up the QIDs of many Riksdagen documents in one query"""
+    if ids is None:
+        raise ValueError("ids was None")
+    values = " ".join(f'"{id}"' for id in ids)
+    result = execute_sparql_query(
+        f"""
+            SELECT ?id ?item
+            WHERE 
+            {{
+              VALUES ?id {{{values}}}.
+              ?item wdt:P8433 ?id.
+            }}
+            """
+    )
+    qids: Dict[str, Optional[str]] = {id: None for id in ids}
+    for row in result["results"]["bindings"]:
+        # We pick only the first like lookup_qid
+        if qids.get(row["id"]["value"]) is None:
+            qids[row["id"]["value"]] = EntityID(row["item"]["value"])
+    return qids
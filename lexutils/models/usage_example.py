@@ -1,15 +1,18 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from lexutils.models.record import Record
 
 
 class UsageExample:
-    # This contains the example, usually a single text
-    text: str
+    # The text is only stored when it differs from the text of the record
+    __slots__ = ("_text", "record", "score", "word_count")
+    _text: Optional[str]
     record: Record
-    word_count: int = None
+    # Higher is better, see lexutils.helpers.scoring
+    score: float
+    word_count: int
 
     def __init__(self,
                  text: str = None,
@@ -19,15 +22,21 @@ class UsageExample:
         Note we pass both the text and the record,
         because the record.text can contain more text
         than the text we found in it"""
-        if text is not None:
-            self.text = text
-            self.word_count = len(self.text.split(" "))
-        else:
+        if text is None:
             raise Exception("Missing text")
-        if record is not None:
-            self.record = record
-        else:
+        if record is None:
             raise Exception("Missing record")
+        self.record = record
+        self._text = None if text == record.text else text
+        self.word_count = len(text.split(" "))
+        self.score = 0.0
+
+    @property
+    def text(self) -> str:
+        """This contains the example, usually a single sentence"""
+        if self._text is None:
+            return self.record.text
+        return self._text
 
     def __str__(self):
         return f"{self.text} (from {self.record.id} at {self.record.source.name.title()})"
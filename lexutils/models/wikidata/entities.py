@@ -4,59 +4,44 @@ import logging
 from datetime import datetime, timezone
 from typing import List, TYPE_CHECKING
 
-from wikibaseintegrator import wbi_config, wbi_login, WikibaseIntegrator
-from wikibaseintegrator.datatypes import ExternalID, Form as WBIForm, Sense as WBISense, Time, MonolingualText, Item, \
-    URL, String
-from wikibaseintegrator.wbi_enums import ActionIfExists
-from wikibaseintegrator.wbi_helpers import execute_sparql_query
-
 from lexutils.config import config
 from lexutils.config.enums import SupportedExampleSources
-from lexutils.helpers import wdqs
+from lexutils.helpers import instrumentation, wdqs
 from lexutils.helpers.console import console
 from lexutils.models.usage_example import UsageExample
-from lexutils.models.wikidata.enums import WikidataNamespaceLetters
+from lexutils.models.wikidata.entity_id import EntityID
 
 if TYPE_CHECKING:
     from lexutils.models.wikidata.form import Form
     from lexutils.models.wikidata.sense import Sense
 
-wbi_config.config['USER_AGENT'] = config.user_agent
 
+def configure_wikibaseintegrator():
+    """Set our User-Agent before WikibaseIntegrator talks to Wikidata
 
-class EntityID:
-    letter: WikidataNamespaceLetters
-    # This can be e.g. "32698-F1" in the case of a lexeme
-    rest: str
+    This is not done at import time because importing
+    WikibaseIntegrator slows down the startup"""
+    from wikibaseintegrator import wbi_config
+    wbi_config.config['USER_AGENT'] = config.user_agent
 
-    def __init__(self,
-                 entity_id: str):
-        logger = logging.getLogger(__name__)
-        if entity_id is not None:
-            # Remove prefix if found
-            if config.wd_prefix in entity_id:
-                logger.debug("Removing prefix")
-                entity_id = entity_id.replace(config.wd_prefix, "")
-            if len(entity_id) > 1:
-                logger.debug(f"entity_id:{entity_id}")
-                self.letter = WikidataNamespaceLetters(entity_id[0])
-                self.rest = entity_id[1:]
-            else:
-                raise ValueError("Entity ID was too short.")
-        else:
-            raise ValueError("Entity ID was None")
-
-    def __str__(self):
-        return f"{self.letter.value}{self.rest}"
 
-    # def extract_wdqs_json_entity_id(self, json: Dict, sparql_variable: str):
-    #     self.__init__(json[sparql_variable]["value"].replace(
-    #         config.wd_prefix, ""
-    #     ))
+def login():
+    """Log in with WikibaseIntegrator the first time we need to edit"""
+    if config.login_instance is None:
+        from wikibaseintegrator import wbi_config, wbi_login
+        config.login_instance = wbi_login.Login(
+            auth_method='login',
+            user=config.username,
+            password=config.password,
+            debug=False
+        )
+        # Set User-Agent
+        wbi_config.config["USER_AGENT_DEFAULT"] = config.user_agent
+    return config.login_instance
 
 
 class Lexeme:
-    id: str
+    id: EntityID
     lemma: str
     lexical_category: EntityID
     forms: List[Form]
@@ -66,7 +51,7 @@ class Lexeme:
                  id: str = None,
                  lemma: str = None,
                  lexical_category: str = None):
-        self.id = str(EntityID(id))
+        self.id = EntityID(id)
         self.lemma = lemma
         if lexical_category is not None:
             self.lexical_category = EntityID(lexical_category)
@@ -83,7 +68,7 @@ class Lexeme:
                 sense = Sense(variable)
                 self.senses.append(sense)
             if variable == "category":
-                self.lexical_category = str(EntityID(extract_wikibase_value_from_result(variable)))
+                self.lexical_category = EntityID(extract_wikibase_value_from_result(variable))
 
     def url(self):
         return f"{config.wd_prefix}{self.id}"
@@ -124,6 +109,7 @@ class Lexeme:
 
     def count_number_of_senses_with_P5137(self):
         """Returns an int"""
+        from wikibaseintegrator.wbi_helpers import execute_sparql_query
         result = (execute_sparql_query(f'''
         SELECT
         (COUNT(?sense) as ?count)
@@ -138,14 +124,16 @@ class Lexeme:
         logging.debug(f"count:{count}")
         return count
 
-    def add_usage_example(
+    def usage_example_claim(
             self,
             form: Form = None,
             sense: Sense = None,
             usage_example: UsageExample = None
     ):
-        """This only has side effects"""
+        """Build the usage example statement with its qualifiers and reference"""
         # TODO convert to use OOP
+        from wikibaseintegrator.datatypes import ExternalID, Form as WBIForm, Sense as WBISense, Time, \
+            MonolingualText, Item, URL, String
         logger = logging.getLogger(__name__)
         if form is None:
             raise ValueError("form was None")
@@ -153,8 +141,7 @@ class Lexeme:
             raise ValueError("sense was None")
         if usage_example is None:
             raise ValueError("usage_example was None")
-        logger.info("Adding usage example with WBI")
-        # Use WikibaseIntegrator aka wbi to upload the changes in one edit
+        logger.info("Building the usage example statement")
         link_to_form = WBIForm(
             prop_nr="P5830",
             # FIXME debug why this is the lexeme id
@@ -234,7 +221,8 @@ class Lexeme:
                     ]
         elif usage_example.record.source == SupportedExampleSources.WIKISOURCE:
             logger.info("Wikisource record detected")
-            usage_example.record.lookup_qid()
+            if usage_example.record.document_qid is None:
+                usage_example.record.lookup_qid()
             if usage_example.record.document_qid is not None:
                 logger.info(f"using document QID {usage_example.record.document_qid} as value for P248")
                 stated_in = Item(
@@ -313,6 +301,23 @@ class Lexeme:
                 published_date,
                 type_of_reference_qualifier,
             ]
+        elif usage_example.record.source == SupportedExampleSources.KSAMSOK:
+            logger.info("K-samsök record detected")
+            # No date is provided unfortunately, so we don't add a publication date
+            stated_in = Item(
+                prop_nr="P248",
+                value=SupportedExampleSources.KSAMSOK.value
+            )
+            document_id = ExternalID(
+                prop_nr="P1260",  # K-samsök URI
+                value=usage_example.record.id
+            )
+            reference = [
+                stated_in,
+                document_id,
+                retrieved_date,
+                type_of_reference_qualifier,
+            ]
         # elif source == "europarl":
         #     stated_in = wbi_datatype.ItemID(
         #         prop_nr="P248",
@@ -357,49 +362,13 @@ class Lexeme:
         #         ),
         #         type_of_reference_qualifier,
         #     ]
-        # elif source == "ksamsok":
-        #     # No date is provided unfortunately, so we set it to unknown value
-        #     stated_in = wbi_datatype.ItemID(
-        #         prop_nr="P248",
-        #         value="Q7654799",
-        #         is_reference=True
-        #     )
-        #     document_id = wbi_datatype.ExternalID(
-        #         # K-Samsök URI
-        #         prop_nr="P1260",
-        #         value=document_id,
-        #         is_reference=True
-        #     )
-        #     reference = [
-        #         stated_in,
-        #         document_id,
-        #         wbi_datatype.Time(
-        #             prop_nr="P813",  # Fetched today
-        #             time=datetime.utcnow().replace(
-        #                 tzinfo=timezone.utc
-        #             ).replace(
-        #                 hour=0,
-        #                 minute=0,
-        #                 second=0,
-        #             ).strftime("+%Y-%m-%dT%H:%M:%SZ"),
-        #             is_reference=True,
-        #         ),
-        #         wbi_datatype.Time(
-        #             # We don't know the value of the publication dates unfortunately
-        #             prop_nr="P577",  # Publication date
-        #             time="",
-        #             snak_type="somevalue",
-        #             is_reference=True,
-        #         ),
-        #         type_of_reference_qualifier,
-        #     ]
         else:
             raise ValueError(f"Did not recognize the source {usage_example.record.source.name.title()}")
         if reference is None:
             raise ValueError(_("No reference defined, cannot add usage example"))
         else:
             # This is the usage example statement
-            claim = MonolingualText(
+            return MonolingualText(
                 text=usage_example.text,
                 prop_nr="P5831",
                 language=usage_example.record.language_code.value,
@@ -412,32 +381,43 @@ class Lexeme:
                 # Add reference
                 references=[reference],
             )
-            # if config.debug_json:
-            #     logging.debug(f"claim:{claim.get_json_representation()}")
-            if config.login_instance is None:
-                # Authenticate with WikibaseIntegrator
-                with console.status("Logging in with WikibaseIntegrator..."):
-                    config.login_instance = wbi_login.Login(
-                        auth_method='login',
-                        user=config.username,
-                        password=config.password,
-                        debug=False
-                    )
-                    # Set User-Agent
-                    wbi_config.config["USER_AGENT_DEFAULT"] = config.user_agent
-            wbi = WikibaseIntegrator(login=config.login_instance)
+
+    def add_usage_example(
+            self,
+            form: Form = None,
+            sense: Sense = None,
+            usage_example: UsageExample = None
+    ):
+        """Add the usage example right away in its own edit
+
+        This only has side effects. The usage examples module
+        uses the upload queue instead, see lexutils/helpers/upload_queue.py"""
+        from wikibaseintegrator import WikibaseIntegrator
+        from wikibaseintegrator.wbi_enums import ActionIfExists
+        logger = logging.getLogger(__name__)
+        claim = self.usage_example_claim(form=form, sense=sense, usage_example=usage_example)
+        logger.info("Adding usage example with WBI")
+        # if config.debug_json:
+        #     logging.debug(f"claim:{claim.get_json_representation()}")
+        if config.login_instance is None:
+            # Authenticate with WikibaseIntegrator
+            with console.status("Logging in with WikibaseIntegrator..."):
+                login()
+        wbi = WikibaseIntegrator(login=config.login_instance)
+        with instrumentation.span("wbi read", source=usage_example.record.source):
             lexeme = wbi.lexeme.get(form.lexeme_id)
-            lexeme.add_claims(
-                [claim],
-                action_if_exists=ActionIfExists.APPEND
-            )
-            # if config.debug_json:
-            #     print(item.get_json_representation())
+        lexeme.add_claims(
+            [claim],
+            action_if_exists=ActionIfExists.APPEND
+        )
+        # if config.debug_json:
+        #     print(item.get_json_representation())
 
+        with instrumentation.span("wbi write", source=usage_example.record.source):
             result = lexeme.write(
                 summary=("Added usage example " +
                          "with [[Wikidata:Tools/LexUtils]] v{}".format(config.version))
             )
-            # logging.debug(f"result from WBI:{result}")
-            # TODO add handling of result from WBI and return True == Success or False
-            return result
+        # logging.debug(f"result from WBI:{result}")
+        # TODO add handling of result from WBI and return True == Success or False
+        return result
@@ -0,0 +1,95 @@
+import re
+from typing import Dict, Optional, Tuple
+
+from lexutils.models.wikidata.enums import WikidataNamespaceLetters
+
+# Every id parsed in this session by the value it was parsed from and by the
+# id itself. There are a few thousand per session so they are kept.
+entity_ids: Dict[str, "EntityID"] = {}
+pattern = re.compile(r"([PQL])([0-9]+)(?:-([FS])([0-9]+))?")
+
+
+class EntityID(str):
+    """The id of a Wikibase entity, e.g. Q1084, L42, L42-F2 or L42-S1
+
+    EntityID is a str so it can be used wherever the ids are used, e.g. as a
+    key, in a query or in JSON. Each id is parsed once and EntityID() returns
+    the same object for the same id whether it got the bare id or the URI
+    like http://www.wikidata.org/entity/L42-F2. The ids cannot be changed
+    and two of them are ordered by their numbers, so L9 comes before L10 and
+    L10-F2 before L10-F10 like in the paging of the forms."""
+    letter: WikidataNamespaceLetters
+    number: int
+    # F or S if this is the id of a form or sense of a lexeme
+    sub_letter: Optional[str]
+    sub_number: Optional[int]
+    key: Tuple[str, int, str, int]
+
+    def __new__(cls, entity_id: str):
+        if type(entity_id) is cls:
+            return entity_id
+        if entity_id is None:
+            raise ValueError("Entity ID was None")
+        parsed = entity_ids.get(entity_id)
+        if parsed is not None:
+            return parsed
+        # Remove the prefix if found
+        value = entity_id[entity_id.rfind("/") + 1:]
+        parsed = entity_ids.get(value)
+        if parsed is None:
+            match = pattern.fullmatch(value)
+            # Only lexemes have forms and senses
+            if match is None or (match.group(3) is not None and match.group(1) != "L"):
+                raise ValueError(f"{entity_id} is not an entity id")
+            letter, number, sub_letter, sub_number = match.groups()
+            parsed = super().__new__(cls, value)
+            parsed.__dict__.update(
+                letter=WikidataNamespaceLetters(letter),
+                number=int(number),
+                sub_letter=sub_letter,
+                sub_number=int(sub_number) if sub_number is not None else None,
+                key=(letter, int(number), sub_letter or "", int(sub_number) if sub_number is not None else 0),
+            )
+            parsed = entity_ids.setdefault(value, parsed)
+        entity_ids[entity_id] = parsed
+        return parsed
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EntityID cannot be changed")
+
+    def __delattr__(self, name):
+        raise AttributeError("EntityID cannot be changed")
+
+    def __reduce__(self):
+        # Unpickled ids are interned too
+        return EntityID, (str(self),)
+
+    def __lt__(self, other):
+        if isinstance(other, EntityID):
+            return self.key < other.key
+        return str.__lt__(self, other)
+
+    def __le__(self, other):
+        if isinstance(other, EntityID):
+            return self.key <= other.key
+        return str.__le__(self, other)
+
+    def __gt__(self, other):
+        if isinstance(other, EntityID):
+            return self.key > other.key
+        return str.__gt__(self, other)
+
+    def __ge__(self, other):
+        if isinstance(other, EntityID):
+            return self.key >= other.key
+        return str.__ge__(self, other)
+
+    def __repr__(self):
+        return f"EntityID({str.__repr__(self)})"
+
+    @property
+    def lexeme_id(self) -> "EntityID":
+        """The lexeme of a form or sense id, the id itself otherwise"""
+        if self.sub_letter is None:
+            return self
+        return EntityID(f"{self.letter.value}{self.number}")
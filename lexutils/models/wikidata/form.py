@@ -1,107 +1,55 @@
 import logging
-from typing import List, Optional
+from sys import intern
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
 from urllib.parse import quote
 
-from wikibaseintegrator import WikibaseIntegrator
-from wikibaseintegrator.models import LanguageValue
-from wikibaseintegrator.wbi_helpers import execute_sparql_query
+from wikibaseintegrator.wbi_helpers import execute_sparql_query, mediawiki_api_call_helper
 
 from lexutils.config import config, constants
-from lexutils.config.config import login_instance
-from lexutils.helpers.caching import read_from_cache, add_to_cache
+from lexutils.helpers import instrumentation, lexeme_dump
+from lexutils.helpers.caching import add_labels_to_cache, read_labels_from_cache
 from lexutils.helpers.console import console
 from lexutils.models.usage_example import UsageExample
-from lexutils.models.wikidata.entities import EntityID
+from lexutils.models.wikidata.entity_id import EntityID
 from lexutils.models.wikidata.enums import WikimediaLanguageCode
 from lexutils.models.wikidata.sense import Sense
 
+if TYPE_CHECKING:
+    from lexutils.models.lazy_usage_examples import LazyUsageExamples
+    from lexutils.models.lexemes import Lexemes
+
 
 class Form:
     """
     Model for a Wikibase form
+
+    The ids are EntityIDs and the labels are interned because the forms of a lexeme
+    share the lexeme id and all forms share a handful of category and feature labels
     """
-    id: str
+    __slots__ = ("id", "representation", "grammatical_features", "language_code", "lexeme_id",
+                 "lexeme_category", "number_of_examples_found", "senses", "usage_examples", "lexemes")
+    id: EntityID
     representation: str
     grammatical_features: List[str]
-    language_code: WikimediaLanguageCode = None
+    language_code: WikimediaLanguageCode
     # We store these on the form because they are needed
     # to determine if an example fits or not
-    lexeme_id: str
-    lexeme_category: str = None
-    number_of_examples_found: int = 0
-    senses: List[Sense] = None
-    usage_examples: List[UsageExample]
+    lexeme_id: EntityID
+    lexeme_category: Optional[str]
+    number_of_examples_found: int
+    senses: Optional[List[Sense]]
+    usage_examples: Optional["LazyUsageExamples"]
+    lexemes: Optional["Lexemes"]
 
     def __init__(
             self,
             entry_data,
             language_code: WikimediaLanguageCode = None
     ):
-        """Parse the form entry_data"""
-        # TODO split this up into methods
-        logger = logging.getLogger(__name__)
+        """Parse the form entry_data, use parse_forms() to parse many"""
         if language_code is None:
             raise ValueError("language_code was None")
-        self.language_code = language_code
-        try:
-            logger.debug(entry_data["lexeme"])
-            self.lexeme_id = str(EntityID(entry_data["lexeme"]["value"]))
-        except KeyError:
-            pass
-        try:
-            logger.debug(entry_data["form"])
-            self.id = str(EntityID(entry_data["form"]["value"]))
-        except KeyError:
-            pass
-        try:
-            self.representation: str = entry_data["form_representation"]["value"]
-        except KeyError:
-            pass
-        try:
-            qid = str(EntityID(entry_data["category"]["value"]))
-            label: Optional[str] = read_from_cache(qid=qid)
-            logger.debug(f"got {label} from the cache")
-            if label is not None:
-                self.lexeme_category = label
-            else:
-                wbi = WikibaseIntegrator(login=login_instance)
-                item = wbi.item.get(entity_id=qid)
-                # TODO get the language code from somewhere
-                # label = item.labels.get(language=)
-                # English is fallback
-                wbi_label: LanguageValue = item.labels.get(language="en")
-                logger.debug(f"fetched feature not found in the cache: {wbi_label.value}")
-                add_to_cache(qid=qid, label=wbi_label.value)
-                self.lexeme_category = wbi_label.value
-            # print("debug exit")
-            # exit()
-        except ValueError:
-            logger.error(f'Could not find lexical category from '
-                         f'{entry_data["category"]["value"]}')
-        except KeyError:
-            pass
-        try:
-            self.grammatical_features = []
-            logger.debug(entry_data["grammatical_features"])
-            for feature in entry_data["grammatical_features"]["value"].split(","):
-                qid = str(EntityID(feature))
-                label: Optional[str] = read_from_cache(qid=qid)
-                logger.debug(f"got {label} from the cache")
-                if label is None:
-                    wbi = WikibaseIntegrator(login=login_instance)
-                    item = wbi.item.get(entity_id=qid)
-                    # TODO get the language code from somewhere
-                    # label = item.labels.get(language=)
-                    # English is fallback
-                    label: LanguageValue = item.labels.get(language="en")
-                    logger.debug(f"fetched feature not found in the cache: {label.value}")
-                    add_to_cache(qid=qid, label=label.value)
-                if isinstance(label, LanguageValue):
-                    self.grammatical_features.append(label.value)
-                else:
-                    self.grammatical_features.append(label)
-        except KeyError:
-            pass
+        __fill_forms__(forms=[self], bindings=[entry_data], language_code=language_code)
 
     def __str__(self):
         return f"{self.id}/{self.lexeme_id}/{self.representation}"
@@ -170,7 +118,7 @@ class Form:
             raise ValueError("usage_example was None")
         # Thanks to Lucas Werkmeister https://www.wikidata.org/wiki/Q57387675 for
         # helping with this query.
-        with console.status("Fetching senses..."):
+        with console.status("Fetching senses..."), instrumentation.span("wdqs query", source="senses"):
             logging.info(f"...from {self.lexeme_id}")
             result = sparql_query()
             self.senses = []
@@ -210,3 +158,126 @@ class Form:
                 "profile=advanced&fulltext=0&" +
                 "advancedSearch-current=%7B%7D&ns0=1"
         )
+
+
+# Items fetched in one wbgetentities request, the API allows 50
+labels_per_request = 50
+
+
+def resolve_labels(qids: Iterable[str] = None) -> Dict[str, str]:
+    """Return the English labels of the items
+
+    The labels come from the cache and the ones not in it are fetched from
+    Wikidata in batches and added to the cache. An item without an English
+    label gets its QID as label."""
+    # TODO get the language code from somewhere
+    if qids is None:
+        raise ValueError("qids was None")
+    qids = set(qids)
+    if len(qids) == 0:
+        return {}
+    with instrumentation.span("label lookup", source="cache"):
+        labels = read_labels_from_cache(qids=qids)
+    instrumentation.count("label cache hit", increment=len(labels))
+    missing = sorted(qids - labels.keys())
+    if len(missing) > 0:
+        instrumentation.count("label cache miss", increment=len(missing))
+        fetched = {}
+        with instrumentation.span("label lookup", source="wbi"):
+            for start in range(0, len(missing), labels_per_request):
+                result = mediawiki_api_call_helper(data=dict(
+                    action="wbgetentities", ids="|".join(missing[start:start + labels_per_request]),
+                    props="labels", languages="en", format="json"
+                ), login=config.login_instance, allow_anonymous=True)
+                for qid, entity in result["entities"].items():
+                    fetched[qid] = entity.get("labels", {}).get("en", {}).get("value", qid)
+        logging.getLogger(__name__).debug(f"fetched labels not found in the cache: {fetched}")
+        add_labels_to_cache(labels=fetched)
+        labels.update(fetched)
+    return labels
+
+
+def __fill_forms__(forms: List[Form], bindings: List[Dict], language_code: WikimediaLanguageCode) -> None:
+    # The group_concat of the features repeats a lot so each one is split once
+    features: Dict[str, List[EntityID]] = {}
+    categories: Dict[str, EntityID] = {}
+    for row in bindings:
+        if "category" in row:
+            category = row["category"]["value"]
+            if category not in categories:
+                categories[category] = EntityID(category)
+        if "grammatical_features" in row:
+            value = row["grammatical_features"]["value"]
+            if value not in features:
+                features[value] = [EntityID(feature) for feature in value.split(",") if feature != ""]
+    labels = {qid: intern(label) for qid, label in resolve_labels(
+        qids=set(categories.values()).union(*features.values())
+    ).items()}
+    category_labels = {category: labels[qid] for category, qid in categories.items()}
+    feature_labels = {value: [labels[qid] for qid in qids] for value, qids in features.items()}
+    for form, row in zip(forms, bindings):
+        form.language_code = language_code
+        form.number_of_examples_found = 0
+        form.senses = None
+        form.usage_examples = None
+        form.lexemes = None
+        if "lexeme" in row:
+            form.lexeme_id = EntityID(row["lexeme"]["value"])
+        if "form" in row:
+            form.id = EntityID(row["form"]["value"])
+        if "form_representation" in row:
+            form.representation = row["form_representation"]["value"]
+        form.lexeme_category = category_labels[row["category"]["value"]] if "category" in row else None
+        form.grammatical_features = (list(feature_labels[row["grammatical_features"]["value"]])
+                                     if "grammatical_features" in row else [])
+
+
+def parse_forms(bindings: List[Dict] = None,
+                language_code: WikimediaLanguageCode = None) -> List[Form]:
+    """Parse the bindings of a WDQS result into forms
+
+    The QIDs of the categories and grammatical features of all the rows are
+    collected first, so every label is resolved once in one lookup instead
+    of once per row. The ids and labels are interned. A row without a
+    variable leaves the attribute of its form unset like Form() does."""
+    if bindings is None or language_code is None:
+        raise ValueError("we did not get what we need")
+    forms = [Form.__new__(Form) for _ in bindings]
+    __fill_forms__(forms=forms, bindings=bindings, language_code=language_code)
+    return forms
+
+
+def fetch_senses_of_lexemes(lexeme_ids: List[str] = None,
+                            language_code: WikimediaLanguageCode = None) -> Dict[str, List[Sense]]:
+    """Fetch the senses of many lexemes in one query
+
+    Like Form.fetch_senses the glosses are in the language with
+    fallback to English for the lexemes that have none in the language"""
+    if lexeme_ids is None or language_code is None:
+        raise ValueError("we did not get what we need")
+    index = lexeme_dump.get_index()
+    if index is not None:
+        with instrumentation.span("lexeme index query", source="senses"):
+            result = dict(results=dict(bindings=index.glosses(lexeme_ids=lexeme_ids,
+                                                              languages=[language_code.value, "en"])))
+    else:
+        values = " ".join(f"wd:{lexeme_id}" for lexeme_id in lexeme_ids)
+        with instrumentation.span("wdqs query", source="senses"):
+            result = execute_sparql_query(f'''
+                SELECT ?lexeme ?sense ?gloss (LANG(?gloss) AS ?language)
+                WHERE {{
+                  VALUES ?lexeme {{{values}}}.
+                  ?lexeme ontolex:sense ?sense.
+                  ?sense skos:definition ?gloss.
+                  FILTER(LANG(?gloss) = "{language_code.value}" || LANG(?gloss) = "en")
+                }}''')
+    senses: Dict[str, Dict[str, List[Sense]]] = {lexeme_id: {} for lexeme_id in lexeme_ids}
+    for row in result["results"]["bindings"]:
+        lexeme_id = EntityID(row["lexeme"]["value"])
+        senses[lexeme_id].setdefault(row["language"]["value"], []).append(
+            Sense(id=row["sense"]["value"], gloss=row["gloss"]["value"])
+        )
+    return {
+        lexeme_id: by_language.get(language_code.value) or by_language.get("en", [])
+        for lexeme_id, by_language in senses.items()
+    }
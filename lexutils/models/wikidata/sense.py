@@ -1,12 +1,13 @@
 from lexutils.config import config
-from lexutils.models.wikidata.entities import EntityID
+from lexutils.models.wikidata.entity_id import EntityID
 
 
 class Sense:
     """
     Model for a Wikibase sense
     """
-    id: str
+    __slots__ = ("id", "gloss")
+    id: EntityID
     # For now we only support one gloss
     gloss: str
     # statements: List[statement]
@@ -16,7 +17,7 @@ class Sense:
             id: str = None,
             gloss: str = None
     ):
-        self.id = str(EntityID(id))
+        self.id = EntityID(id)
         self.gloss = gloss.strip()
 
     def __str__(self):
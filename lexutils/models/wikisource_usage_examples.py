@@ -1,9 +1,10 @@
 import logging
-from typing import List
+from typing import Dict, List
 
 from wikibaseintegrator.wbi_helpers import execute_sparql_query
 
-from lexutils.config import config
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import instrumentation, wikisource
 from lexutils.models.api_usage_examples import APIUsageExamples
 from lexutils.models.usage_example import UsageExample
 from lexutils.models.wikisource_record import WikisourceRecord
@@ -15,18 +16,13 @@ class WikisourceUsageExamples(APIUsageExamples):
     When instantiated it fetches and processes records into usage examples
     and stores them in an attribute."""
 
-    def get_records(self) -> None:
-        logger = logging.getLogger(__name__)
-        if self.lexemes.language_code in config.fast_nlp_languages:
-            limit = config.wikisource_max_results_size_fast_nlp
-        else:
-            limit = config.wikisource_max_results_size_slow_nlp
-        logger.info(
-            f"Fetching usage examples from the {self.lexemes.language_code.name.title()} Wikisource...")
+    def __search_using_sparql__(self, limit: int) -> List[Dict]:
+        """This is the fallback if the MediaWiki API could not be reached directly"""
         # search using sparql
         # borrowed from Scholia
         # thanks to Vigneron for the tip :)
-        results = execute_sparql_query(f'''
+        with instrumentation.span("wdqs query", source=SupportedExampleSources.WIKISOURCE):
+            results = execute_sparql_query(f'''
             SELECT ?title ?titleUrl ?snippet WHERE {{
             SERVICE wikibase:mwapi {{
               bd:serviceParam wikibase:api "Search" .
@@ -37,15 +33,37 @@ class WikisourceUsageExamples(APIUsageExamples):
               ?snippet_ wikibase:apiOutput "@snippet" .
             }}
             hint:Prior hint:runFirst "true" .
-            BIND(CONCAT("https://br.wikisource.org/wiki/", ENCODE_FOR_URI(?title)) AS ?titleUrl)
+            BIND(CONCAT("https://{self.lexemes.language_code.value}.wikisource.org/wiki/",
+                        ENCODE_FOR_URI(?title)) AS ?titleUrl)
             BIND(REPLACE(REPLACE(?snippet_, '</span>', ''), '<span class="searchmatch">', '') AS ?snippet)
             }}
             LIMIT {limit}
     ''')
-        logger.debug(f"results:{results}")
+        return [
+            dict(title=item["title"]["value"], snippet=item["snippet"]["value"])
+            for item in results["results"]["bindings"]
+        ]
+
+    def get_records(self) -> None:
+        logger = logging.getLogger(__name__)
+        limit = wikisource.search_limit(self.lexemes.language_code)
+        logger.info(
+            f"Fetching usage examples from the {self.lexemes.language_code.name.title()} Wikisource...")
+        # This is usually already cached because Lexemes
+        # searches for all the forms at once
+        hits = wikisource.search(
+            language_code=self.lexemes.language_code,
+            representations=[self.form.representation],
+            limit=limit
+        )[self.form.representation]
+        if hits is None:
+            logger.info("Falling back to searching via WDQS")
+            hits = self.__search_using_sparql__(limit=limit)
+        logger.debug(f"hits:{hits}")
         self.records = []
-        for item in results["results"]["bindings"]:
-            self.records.append(WikisourceRecord(json=item,
+        for hit in hits:
+            self.records.append(WikisourceRecord(title=hit["title"],
+                                                 snippet=hit["snippet"],
                                                  lexemes=self.lexemes))
         length = len(self.records)
         logger.info(f"Got {length} records")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, List, TYPE_CHECKING
+
+from lexutils.config import config
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import candidates, instrumentation
+from lexutils.helpers.console import console
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+if TYPE_CHECKING:
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.form import Form
+
+# Program flow
+#
+# entrypoint: start()
+# fetch the forms without an example like the usage examples module
+# but without asking the user to confirm them
+# find the usage examples for all the forms and keep the best ones,
+# the Swedish dataframes are searched by a pool of processes
+# look up the senses of all the lexemes and the QIDs of the
+# Riksdagen documents in batches, a few batches at a time
+# write the forms with senses and examples to the candidates file
+# which the usage examples module can review without any lookups
+
+logger = logging.getLogger(__name__)
+
+
+def in_batches(function: Callable[[List[str]], Dict], items: List[str]) -> Dict:
+    """Call the function with batches of the items concurrently and merge the results"""
+    batches = [items[start:start + config.prepare_batch_size]
+               for start in range(0, len(items), config.prepare_batch_size)]
+    results = {}
+    with ThreadPoolExecutor(max_workers=config.prepare_max_concurrent_queries) as executor:
+        # map() returns the results in the order of the batches
+        for result in executor.map(function, batches):
+            results.update(result)
+    return results
+
+
+def resolve_senses(forms: List[Form] = None,
+                   language_code: WikimediaLanguageCode = None) -> None:
+    from lexutils.models.wikidata.form import fetch_senses_of_lexemes
+    lexeme_ids = list(dict.fromkeys(form.lexeme_id for form in forms))
+    with instrumentation.span("resolve senses"):
+        senses = in_batches(lambda batch: fetch_senses_of_lexemes(lexeme_ids=batch, language_code=language_code),
+                            lexeme_ids)
+    for form in forms:
+        form.senses = senses[form.lexeme_id]
+
+
+def resolve_riksdagen_qids(examples: List[UsageExample] = None) -> None:
+    from lexutils.models.riksdagen_record import lookup_qids
+    records = [example.record for example in examples
+               if example.record.source == SupportedExampleSources.RIKSDAGEN]
+    if len(records) > 0:
+        with instrumentation.span("resolve qids", source=SupportedExampleSources.RIKSDAGEN):
+            qids = in_batches(lambda batch: lookup_qids(ids=batch),
+                              list(dict.fromkeys(record.id for record in records)))
+        for record in records:
+            record.document_qid = qids[record.id]
+
+
+def start(language_code: WikimediaLanguageCode = None,
+          number_of_forms: int = None,
+          output_path: str = None):
+    """Find usage examples for the forms without asking anything
+    and write them to the candidates file"""
+    if language_code is None or number_of_forms is None or output_path is None:
+        raise ValueError("we did not get what we need")
+    from lexutils.models.lexemes import Lexemes
+    from lexutils.models.wikidata.entities import configure_wikibaseintegrator
+    configure_wikibaseintegrator()
+    start_time = time.perf_counter()
+    with console.status(f"Fetching {number_of_forms} lexeme forms for {language_code.name.title()}"):
+        lexemes = Lexemes(language_code=language_code.value)
+        lexemes.fetch_forms_without_an_example(number_of_forms=number_of_forms)
+    lexemes.fetch_usage_examples(confirm=False, processes=config.prepare_worker_processes)
+    forms = lexemes.forms_with_usage_examples_found
+    examples: Dict[Form, List[UsageExample]] = {
+        # The best examples come first and we only create those we keep
+        form: list(islice(form.usage_examples, config.prepare_examples_per_form))
+        for form in forms
+    }
+    with console.status(f"Looking up the senses and document QIDs for {len(forms)} forms"):
+        resolve_senses(forms=forms, language_code=language_code)
+        resolve_riksdagen_qids(examples=[example for form in forms for example in examples[form]])
+    # Forms without senses in the language or English cannot be reviewed
+    forms = [form for form in forms if len(form.senses) > 0]
+    count = candidates.write(path=output_path,
+                             forms=(candidates.form_to_dict(form, examples[form]) for form in forms))
+    console.print(f"Wrote {count} forms with "
+                  f"{sum(len(examples[form]) for form in forms)} usage examples to {output_path} "
+                  f"in {round(time.perf_counter() - start_time)} seconds. "
+                  f"Review them with: python lexutils.py --candidates {output_path}")
+    if config.show_timing_report:
+        instrumentation.report()
@@ -1,5 +1,7 @@
 from lexutils.models.lexeme_staitstics import LexemeStatistics
+from lexutils.models.wikidata.entities import configure_wikibaseintegrator
 
 
 def main():
+    configure_wikibaseintegrator()
     stats = LexemeStatistics()
\ No newline at end of file
@@ -1,29 +1,25 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import gettext
 import logging
 import time
 from time import sleep
-from typing import Union, Optional
+from typing import List, Union, Optional, TYPE_CHECKING
 
-from riksdagenapi.dokument import Dokument
-from riksdagenapi.dokumentlista import Dokumentlista
-from riksdagenapi.riksdagen import Riksdagen
 from rich import print
 
 from lexutils.config import config
 from lexutils.config.enums import ReturnValues, SupportedFormPickles, SupportedExampleSources
-from lexutils.helpers import tui, util
+from lexutils.helpers import candidates, instrumentation, review_log, tui, upload_queue, util, work_allocation
 from lexutils.helpers.console import console
-from lexutils.helpers.handle_pickles import add_to_pickle
-from lexutils.models.lexemes import Lexemes
-from lexutils.models.riksdagen_record import RiksdagenRecord
-from lexutils.models.usage_example import UsageExample
 # from lexutils.modules import europarl
-# from lexutils.modules import ksamsok
-from lexutils.models.wikidata.entities import Lexeme
 from lexutils.models.wikidata.enums import WikimediaLanguageCode
-from lexutils.models.wikidata.form import Form
-from lexutils.models.wikidata.sense import Sense
+
+if TYPE_CHECKING:
+    from lexutils.models.usage_example import UsageExample
+    from lexutils.models.wikidata.form import Form
+    from lexutils.models.wikidata.sense import Sense
 
 _ = gettext.gettext
 
@@ -37,8 +33,15 @@ _ = gettext.gettext
 # ignoring those we already declined or uploaded examples to earlier
 # then we loop through each usage example and ask the user if it is suitable by
 # calling tui.present_sentence()
-# if the user approves it we call add_usage_example() and add it to WD
+# if the user approves it we build the statement and put it in the upload
+# queue which adds it to WD in the background
 # save the results to pickles to avoid working on the same form twice
+#
+# With a candidates file from the prepare command we skip the language menu
+# and the fetching and review the prepared forms right away
+#
+# The heavy dependencies like pandas, spaCy and WikibaseIntegrator are
+# imported in the functions that need them so the menu appears quickly
 
 
 def introduction():
@@ -58,24 +61,115 @@ def introduction():
         return False
 
 
-def start():
+def read_candidates(path: str = None) -> List[Form]:
+    """Read the forms prepared with the prepare command that we have not worked on yet"""
+    if path is None:
+        raise ValueError("path was None")
+    from lexutils.helpers.handle_pickles import read_form_ids
+    done = (read_form_ids(pickle=SupportedFormPickles.FINISHED_FORMS) |
+            read_form_ids(pickle=SupportedFormPickles.DECLINED_FORMS))
+    with console.status(f"Reading the candidates from {path}"):
+        forms = [form for form in candidates.read(path=path) if form.id not in done]
+        # Other reviewers can work on the same file
+        forms = work_allocation.lease_forms(forms=forms)
+    console.print(f"Found {sum(form.number_of_examples_found for form in forms)} "
+                  f"candidate usage examples for {len(forms)} forms in {path}")
+    return forms
+
+
+def review(forms: List[Form] = None):
+    """Present the usage examples of each form and save the results"""
+    if forms is None:
+        raise ValueError("forms was None")
+    from lexutils.helpers.handle_pickles import add_to_pickle
+    if len(forms) > 0:
+        if config.upload_in_background:
+            upload_queue.start(on_done=finish_uploaded_form, on_failed=hand_back_form)
+        try:
+            for form in forms:
+                result = process_usage_examples(form=form)
+                # Save the results to persistent memory
+                if result == ReturnValues.SKIP_FORM:
+                    add_to_pickle(pickle=SupportedFormPickles.DECLINED_FORMS,
+                                  form_id=form.id)
+                    work_allocation.complete(form_id=form.id, status=work_allocation.declined)
+                elif result == ReturnValues.USAGE_EXAMPLE_ADDED and not config.upload_in_background:
+                    # The uploader finishes the form when the upload succeeded
+                    add_to_pickle(pickle=SupportedFormPickles.FINISHED_FORMS,
+                                  form_id=form.id)
+                    work_allocation.complete(form_id=form.id, status=work_allocation.finished)
+                # Keep the forms we have not got to yet
+                work_allocation.renew()
+        finally:
+            # Keep the leases of the forms that are being uploaded until they are finished
+            if config.upload_in_background:
+                upload_queue.stop()
+            # Hand back the forms we did not get to
+            work_allocation.release()
+        tui.run_again()
+    else:
+        work_allocation.release()
+
+
+def finish_uploaded_form(upload: upload_queue.Upload) -> None:
+    from lexutils.helpers.handle_pickles import add_to_pickle
+    add_to_pickle(pickle=SupportedFormPickles.FINISHED_FORMS, form_id=upload.form_id)
+    work_allocation.complete(form_id=upload.form_id, status=work_allocation.finished)
+
+
+def hand_back_form(upload: upload_queue.Upload) -> None:
+    """Let somebody else try the form when its upload failed for good"""
     logger = logging.getLogger(__name__)
+    logger.warning(f"Handing back {upload.form_id} because its usage example could not be uploaded")
+    work_allocation.release(form_ids=[upload.form_id])
+
+
+def start(candidates_path: str = None):
+    from lexutils.models.wikidata.entities import configure_wikibaseintegrator
+    # Reviewing candidates never creates a Lexemes but reads and edits anyway
+    configure_wikibaseintegrator()
+    if candidates_path is not None:
+        # The forms were prepared with the prepare command
+        review(forms=read_candidates(path=candidates_path))
+    else:
+        discover_and_review()
+    if config.show_timing_report:
+        instrumentation.report()
+    if config.timing_export_path:
+        instrumentation.export(config.timing_export_path)
+
+
+def discover_and_review():
     # disabled for now
     # begin = introduction()
     begin = True
     if begin:
         choosen_language: WikimediaLanguageCode = tui.select_language_menu()
+        from lexutils.models.lexemes import Lexemes
         # TODO store lexuse_introduction_read=True to e.g. settings.pkl
         with console.status(f"Fetching {config.number_of_forms_to_fetch} "
                             f"lexeme forms to work on for "
                             f"{choosen_language.name.title()}"):
             lexemes = Lexemes(language_code=choosen_language.value)
-            lexemes.fetch_forms_without_an_example()
+            # Only look for examples for the forms no other session works on.
+            # The pages are disjoint, but after starting over a page can hold
+            # forms that other sessions still work on.
+            for _ in range(3):
+                lexemes.fetch_forms_without_an_example()
+                lexemes.forms_without_an_example = work_allocation.lease_forms(
+                    forms=lexemes.forms_without_an_example
+                )
+                if len(lexemes.forms_without_an_example) > 0:
+                    break
+        if len(lexemes.forms_without_an_example) == 0:
+            console.print("Other sessions are working on all the forms we got. "
+                          "Run the script again to get other forms")
+            return
         console.print(f"Fetching usage examples to work on. "
                       f"This might take some minutes.")
-        start = time.time()
+        start = time.perf_counter()
         lexemes.fetch_usage_examples()
-        end = time.time()
+        end = time.perf_counter()
         total_number_of_examples = sum(
             [form.number_of_examples_found for form in lexemes.forms_with_usage_examples_found]
         )
@@ -83,22 +177,12 @@ def start():
             console.print("Found no usage examples for any of the forms.")
         else:
             console.print(f"Found {total_number_of_examples} "
-                          f"usage examples for a total of "
+                          f"candidate usage examples for a total of "
                           f"{len(lexemes.forms_with_usage_examples_found)} forms "
                           f"in {round(end - start)} seconds")
-        if len(lexemes.forms_with_usage_examples_found) > 0:
-            for form in lexemes.forms_with_usage_examples_found:
-                form.lexemes = lexemes
-                result = process_usage_examples(form=form)
-                # Save the results to persistent memory
-                if result == ReturnValues.SKIP_FORM:
-                    add_to_pickle(pickle=SupportedFormPickles.DECLINED_FORMS,
-                                  form_id=form.id)
-                    continue
-                if result == ReturnValues.USAGE_EXAMPLE_ADDED:
-                    add_to_pickle(pickle=SupportedFormPickles.FINISHED_FORMS,
-                                  form_id=form.id)
-            tui.run_again()
+        for form in lexemes.forms_with_usage_examples_found:
+            form.lexemes = lexemes
+        review(forms=lexemes.forms_with_usage_examples_found)
 
 
 def prompt_single_sense(form: Form = None) -> Union[ReturnValues, Sense]:
@@ -168,12 +252,18 @@ def choose_sense_handler(
     #     senses=senses,
     #     form=form
     # )
+    from lexutils.models.wikidata.entities import Lexeme
+    from lexutils.models.wikidata.sense import Sense
     if isinstance(sense_choice, Sense):
         logger.info("We got a sense that was accepted")
         # Prepare
-        if isinstance(usage_example.record, RiksdagenRecord):
-            usage_example.record.lookup_qid()
+        if usage_example.record.source == SupportedExampleSources.RIKSDAGEN:
+            if usage_example.record.document_qid is None:
+                usage_example.record.lookup_qid()
             if usage_example.record.document_qid is None:
+                from riksdagenapi.dokument import Dokument
+                from riksdagenapi.dokumentlista import Dokumentlista
+                from riksdagenapi.riksdagen import Riksdagen
                 # TODO lookup publication date via the Riksdagen API
                 # lookup using id
                 rd = Riksdagen()
@@ -192,10 +282,22 @@ def choose_sense_handler(
                     raise ValueError("Could not lookup publication date via the Riksdagen API")
         sense = sense_choice
         lexeme = Lexeme(id=form.lexeme_id)
-        if usage_example.record.source == SupportedExampleSources.RIKSDAGEN:
+        if (usage_example.record.source == SupportedExampleSources.RIKSDAGEN and
+                usage_example.record.document_qid is None):
             logger.info("Looking up the QID for the source document")
             usage_example.record.lookup_qid()
         # Add
+        if config.upload_in_background:
+            claim = lexeme.usage_example_claim(
+                form=form,
+                sense=sense,
+                usage_example=usage_example
+            )
+            upload_queue.enqueue(lexeme_id=lexeme.id, form_id=form.id,
+                                 sense_id=sense.id, claim=claim.get_json())
+            print("Queued usage example for upload to " +
+                  f"{lexeme.usage_example_url()}")
+            return ReturnValues.USAGE_EXAMPLE_ADDED
         result = lexeme.add_usage_example(
             form=form,
             sense=sense,
@@ -234,8 +336,10 @@ def handle_usage_example(
         )
     )
     if result is ReturnValues.ACCEPT_USAGE_EXAMPLE:
-        # The sentence was accepted
-        form.fetch_senses(usage_example=usage_example)
+        # The sentence was accepted. The senses are only fetched once
+        # per form and the prepared forms already have them
+        if form.senses is None:
+            form.fetch_senses(usage_example=usage_example)
         if len(form.senses) == 0:
             return ReturnValues.SKIP_USAGE_EXAMPLE
         else:
@@ -258,17 +362,14 @@ def process_usage_examples(
     """Go through each usage example and present it"""
     if form is None:
         raise ValueError("form was None")
-    if form.usage_examples is None or len(form.usage_examples) == 0:
+    if form.usage_examples is None or form.usage_examples.is_empty():
         raise ValueError("form had no usage examples")
     logger = logging.getLogger(__name__)
-    # Sort so that the shortest sentence is first
     count = 1
-    # Sort the usage examples by word count
-    # https://stackoverflow.com/questions/403421/how-to-sort-a-list-of-objects-based-on-an-attribute-of-the-objects
-    form.usage_examples.sort(key=lambda x: x.word_count, reverse=False)
     tui.print_separator()
     tui.present_form(form)
-    # Loop through usage examples
+    # Loop through usage examples. They come best first and
+    # are only created from the dataframes when we get to them
     for example in form.usage_examples:
         tui.present_sentence(
             count=count,
@@ -280,6 +381,8 @@ def process_usage_examples(
             usage_example=example
         )
         logger.info(f"process_result: result: {result}")
+        review_log.log_decision(form=form, usage_example=example,
+                                position=count, decision=result)
         count += 1
         if result == ReturnValues.SKIP_USAGE_EXAMPLE:
             continue
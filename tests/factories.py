@@ -0,0 +1,44 @@
+"""Objects shared by the tests and the benchmarks"""
+from itertools import count
+
+from lexutils.models.dataframe_usage_examples import add_scores
+from lexutils.models.record import Record
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.usage_example import UsageExample
+from lexutils.models.wikidata.entity_id import EntityID
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+from lexutils.models.wikidata.form import Form
+
+# Every form gets its own number like the forms from Wikidata
+form_numbers = count(1)
+
+
+def create_form(representation: str, lexeme_id: str = "L1") -> Form:
+    form = Form(
+        dict(),
+        language_code=WikimediaLanguageCode.SWEDISH
+    )
+    form.id = EntityID(f"{lexeme_id}-F{next(form_numbers)}")
+    form.lexeme_id = EntityID(lexeme_id)
+    form.representation = representation
+    return form
+
+
+def create_usage_examples(class_, dataframe, source=None):
+    """Scores the rows if the source is given"""
+    # We skip __init__ to avoid loading the pickle
+    usage_examples = class_.__new__(class_)
+    if source is not None:
+        dataframe = add_scores(dataframe, source=source)
+    usage_examples.dataframe = dataframe
+    return usage_examples
+
+
+def create_example(text: str = None, score: float = 0.0, record: Record = None) -> UsageExample:
+    """The text of the record is used if no text is given
+    and a Riksdagen record with the text if no record is given"""
+    if record is None:
+        record = RiksdagenRecord(id=text, text=text)
+    example = UsageExample(text=text or record.text, record=record)
+    example.score = score
+    return example
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+
+import httpx
+import requests
+
+from lexutils.config import config
+from lexutils.exceptions import FixtureNotFoundException
+from lexutils.helpers import backend
+
+
+class Handler(BaseHTTPRequestHandler):
+    number_of_requests = 0
+
+    def respond(self, body: bytes = b""):
+        Handler.number_of_requests += 1
+        content = json.dumps(dict(path=self.path, body=body.decode("utf-8"),
+                                  number=Handler.number_of_requests)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def log_message(self, *args):
+        pass
+
+
+async def fetch_with_httpx(url: str):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url)
+        return response.json()
+
+
+class TestBackend(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = dict(upload_queue=config.upload_queue, upload_edit_interval=config.upload_edit_interval)
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        backend.deactivate()
+        self.server.shutdown()
+        self.server.server_close()
+        for name, value in self.settings.items():
+            setattr(config, name, value)
+        self.directory.cleanup()
+
+    def session(self):
+        return [
+            requests.get(f"{self.url}/sparql?query=select&format=json").json(),
+            # The token is left out when matching so a new token still matches
+            requests.post(f"{self.url}/api.php", data=dict(action="wbgetentities", ids="L1",
+                                                           token=str(Handler.number_of_requests))).json(),
+            requests.post(f"{self.url}/api.php", data=dict(action="wbgetentities", ids="L1")).json(),
+            asyncio.run(fetch_with_httpx(f"{self.url}/w/api.php?action=query&list=search")),
+        ]
+
+    def test_record_and_replay(self):
+        backend.activate("record", directory=self.directory.name)
+        recorded = self.session()
+        backend.deactivate()
+        self.server.shutdown()
+        backend.activate("replay", directory=self.directory.name)
+        # The same request is answered in the recorded order
+        self.assertEqual(self.session(), recorded)
+        self.assertEqual([response["number"] for response in recorded[1:3]],
+                         [recorded[1]["number"], recorded[1]["number"] + 1])
+        with self.assertRaises(FixtureNotFoundException):
+            requests.get(f"{self.url}/sparql?query=other")
+
+    def test_dry_run(self):
+        backend.activate("live", dry=True)
+        number_of_requests = Handler.number_of_requests
+        result = requests.post(f"{self.url}/api.php", data=dict(
+            action="wbeditentity", id="L1", data=json.dumps(dict(claims=[])), baserevid="1"
+        )).json()
+        self.assertEqual(result["entity"]["id"], "L1")
+        self.assertEqual(Handler.number_of_requests, number_of_requests)
+        # Reading is not affected
+        self.assertEqual(requests.get(f"{self.url}/read").json()["path"], "/read")
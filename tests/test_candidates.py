@@ -0,0 +1,83 @@
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.helpers import candidates
+from lexutils.models.historical_job_ads_record import HistoricalJobAd
+from lexutils.models.lexemes import Lexemes
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+from lexutils.models.wikidata.form import Form, fetch_senses_of_lexemes
+from lexutils.models.wikidata.sense import Sense
+from lexutils.models.wikisource_record import WikisourceRecord
+from tests.factories import create_example
+
+
+class TestCandidates(TestCase):
+    def test_round_trip(self):
+        form = Form(dict(), language_code=WikimediaLanguageCode.SWEDISH)
+        form.id = "L1-F2"
+        form.lexeme_id = "L1"
+        form.representation = "husen"
+        form.lexeme_category = "noun"
+        form.grammatical_features = ["plural", "definite"]
+        form.senses = [Sense(id="L1-S1", gloss="byggnad")]
+        riksdagen = RiksdagenRecord(id="H5091", text="Regeringen vill bygga fler husen i staden.")
+        riksdagen.document_qid = "Q123"
+        ad = HistoricalJobAd(id="42", text="Vi söker en vaktmästare till husen.",
+                             date=datetime(1990, 5, 1), filename="1990.jsonl")
+        wikisource = WikisourceRecord(title="Sida", snippet="Husen stod tomma. Det var kallt.",
+                                      lexemes=Lexemes(language_code="sv"))
+        examples = [create_example(record=riksdagen, score=2.0), create_example(record=ad, score=1.5),
+                    create_example(record=wikisource, score=1.0, text="Husen stod tomma.")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "candidates.jsonl.gz")
+            self.assertEqual(candidates.write(path=path, forms=[candidates.form_to_dict(form, examples)]), 1)
+            [read_form] = list(candidates.read(path=path))
+        self.assertEqual((read_form.id, read_form.lexeme_id, read_form.representation, read_form.language_code),
+                         ("L1-F2", "L1", "husen", WikimediaLanguageCode.SWEDISH))
+        self.assertEqual(read_form.grammatical_features, ["plural", "definite"])
+        self.assertEqual([(sense.id, sense.gloss) for sense in read_form.senses], [("L1-S1", "byggnad")])
+        self.assertEqual(read_form.number_of_examples_found, 3)
+        read_examples = list(read_form.usage_examples)
+        self.assertEqual([example.text for example in read_examples], [example.text for example in examples])
+        self.assertEqual([type(example.record) for example in read_examples],
+                         [RiksdagenRecord, HistoricalJobAd, WikisourceRecord])
+        self.assertEqual(read_examples[0].record.document_qid, "Q123")
+        self.assertEqual(read_examples[1].record.date, datetime(1990, 5, 1))
+        self.assertEqual(read_examples[2].record.url(), wikisource.url())
+
+    def test_fetch_senses_of_lexemes(self):
+        def row(lexeme_id, sense_id, gloss, language):
+            return dict(lexeme=dict(value=f"http://www.wikidata.org/entity/{lexeme_id}"),
+                        sense=dict(value=f"http://www.wikidata.org/entity/{sense_id}"),
+                        gloss=dict(value=gloss), language=dict(value=language))
+        result = dict(results=dict(bindings=[
+            row("L1", "L1-S1", "byggnad", "sv"),
+            row("L1", "L1-S1", "building", "en"),
+            row("L2", "L2-S1", "car", "en"),
+        ]))
+        with patch("lexutils.models.wikidata.form.execute_sparql_query", return_value=result):
+            senses = fetch_senses_of_lexemes(lexeme_ids=["L1", "L2", "L3"],
+                                             language_code=WikimediaLanguageCode.SWEDISH)
+        # English is the fallback like in Form.fetch_senses
+        self.assertEqual({lexeme_id: [sense.gloss for sense in lexeme_senses]
+                          for lexeme_id, lexeme_senses in senses.items()},
+                         {"L1": ["byggnad"], "L2": ["car"], "L3": []})
+
+    def test_review_sets_the_user_agent(self):
+        from wikibaseintegrator import wbi_config
+
+        from lexutils.config import config
+        from lexutils.modules import usage_examples_module
+        with patch.dict(wbi_config.config, {"USER_AGENT": None}), \
+                patch.object(usage_examples_module, "read_candidates", return_value=[]), \
+                patch.object(usage_examples_module, "review") as review, \
+                patch.object(config, "show_timing_report", False), \
+                patch.object(config, "timing_export_path", None):
+            usage_examples_module.start(candidates_path="candidates-sv.jsonl.gz")
+            review.assert_called_once_with(forms=[])
+            # The review never creates a Lexemes
+            self.assertEqual(wbi_config.config["USER_AGENT"], config.user_agent)
@@ -0,0 +1,16 @@
+from unittest import TestCase
+
+from spacy.lang.sv import Swedish
+
+import convert_historical_ads_to_pandas
+
+
+class TestConverters(TestCase):
+    def test_too_long_ad(self):
+        nlp = Swedish()
+        nlp.add_pipe('sentencizer')
+        ads = [dict(id="1", date=None, external_id=None, filename="2020.jsonl",
+                    text="Vi söker en vaktmästare. " * 4000, mixed=False)]
+        # The caller gets an exception instead of the process exiting
+        with self.assertRaises(ValueError):
+            convert_historical_ads_to_pandas.extract_swedish_sentences(ads=ads, nlp_instance=nlp)
@@ -0,0 +1,67 @@
+import threading
+from datetime import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.exceptions import CorpusServerException
+from lexutils.helpers import corpus_server
+from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+from tests.factories import create_form, create_usage_examples
+
+
+def summary(iterators):
+    return {form.representation: [(example.record.id, example.text, example.score) for example in iterator]
+            for form, iterator in iterators.items()}
+
+
+class TestCorpusServer(TestCase):
+    riksdagen = create_usage_examples(RiksdagenUsageExamples, pd.DataFrame(data=[
+        dict(id="1", sentence="Regeringen vill bygga ett nytt hus i staden nu."),
+        dict(id="2", sentence="Regeringen vill bygga fler hus i staden nu."),
+        dict(id="3", sentence="Regeringen vill riva husen i den gamla staden nu."),
+        dict(id="4", sentence="Husen i staden bordlades av utskottet i dag."),
+        dict(id="5", sentence="Husen rivs."),
+        dict(id="6", sentence="Ett förhus i den gamla staden ska rivas nu."),
+    ]), source=SupportedExampleSources.RIKSDAGEN)
+    historical_ads = create_usage_examples(HistoricalJobAdsUsageExamples, pd.DataFrame(data=[
+        dict(id="7", sentence="Vi söker en vaktmästare till husen i staden.",
+             filename="1990.jsonl", date=datetime(1990, 5, 1)),
+    ]), source=SupportedExampleSources.HISTORICAL_ADS)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = corpus_server.create_server(usage_examples=[cls.riksdagen, cls.historical_ads],
+                                                 host="127.0.0.1", port=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_same_examples_as_the_dataframe(self):
+        for local in [self.riksdagen, self.historical_ads]:
+            client = type(local)(server_url=self.url)
+            self.assertIsNone(client.dataframe)
+            forms = [create_form("hus"), create_form("husen")]
+            self.assertEqual(summary(client.iterate_lexeme_forms_in_the_dataframe(forms=forms)),
+                             summary(local.iterate_lexeme_forms_in_the_dataframe(forms=forms)))
+        # The dates of the Historical Ads survive the JSON
+        [example] = client.find_form_representation_in_the_dataframe(form=create_form("husen"))
+        self.assertEqual((example.record.filename, example.record.date), ("1990.jsonl", datetime(1990, 5, 1)))
+
+    def test_find(self):
+        # The short sentence and the one with förhus are not matches
+        number_of_matches, rows = corpus_server.find(url=self.url, source=SupportedExampleSources.RIKSDAGEN,
+                                                     representations=["hus", "husen"],
+                                                     min_words=5, max_words=15, limit=1)
+        self.assertEqual(number_of_matches, 4)
+        self.assertEqual(len(rows), 2)
+
+    def test_unreachable(self):
+        with self.assertRaises(CorpusServerException):
+            RiksdagenUsageExamples(server_url="http://127.0.0.1:1")
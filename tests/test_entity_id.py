@@ -0,0 +1,37 @@
+import pickle
+from unittest import TestCase
+
+from lexutils.config import config
+from lexutils.models.wikidata.entity_id import EntityID
+from lexutils.models.wikidata.enums import WikidataNamespaceLetters
+
+
+class TestEntityID(TestCase):
+    def test_parse(self):
+        form_id = EntityID(f"{config.wd_prefix}L42-F2")
+        self.assertEqual(form_id, "L42-F2")
+        self.assertIsInstance(form_id, str)
+        self.assertEqual((form_id.letter, form_id.number, form_id.sub_letter, form_id.sub_number),
+                         (WikidataNamespaceLetters.LEXEME, 42, "F", 2))
+        self.assertEqual(form_id.lexeme_id, "L42")
+        self.assertEqual(EntityID("Q1084").letter, WikidataNamespaceLetters.ITEM)
+        self.assertEqual(EntityID("L42-S1").sub_letter, "S")
+        for value in ["Q", "X1", "Q1-F2", "L1-F", "L1-G2", ""]:
+            with self.subTest(value=value):
+                self.assertRaises(ValueError, EntityID, value)
+        self.assertRaises(ValueError, EntityID, None)
+
+    def test_interned(self):
+        # The URI and the bare id give the same object
+        self.assertIs(EntityID(f"{config.wd_prefix}L42-F2"), EntityID("L42-F2"))
+        self.assertIs(EntityID(EntityID("L42")), EntityID("L42"))
+        self.assertIs(pickle.loads(pickle.dumps(EntityID("L42-F2"))), EntityID("L42-F2"))
+        self.assertEqual({EntityID("L42"): 1}["L42"], 1)
+        with self.assertRaises(AttributeError):
+            EntityID("L42").number = 43
+
+    def test_ordering(self):
+        ids = [EntityID(value) for value in ["L10-F10", "L9", "L10-F2", "L10", "L10-S1", "L100-F1"]]
+        self.assertEqual(sorted(ids), ["L9", "L10", "L10-F2", "L10-F10", "L10-S1", "L100-F1"])
+        self.assertLess(EntityID("Q9"), EntityID("Q10"))
+        self.assertGreaterEqual(EntityID("L10-F10"), EntityID("L10-F2"))
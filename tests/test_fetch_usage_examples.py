@@ -0,0 +1,44 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.helpers import instrumentation
+from lexutils.models import lexemes as lexemes_module
+from lexutils.models.lexemes import Lexemes
+from tests.factories import create_form
+
+
+class TestFetchUsageExamples(TestCase):
+    def setUp(self):
+        self.lexemes = Lexemes(language_code="en")
+        self.house = create_form("house")
+        self.houses = create_form("houses")
+        self.lexemes.forms_without_an_example = [self.house, self.houses]
+        self.candidates = {self.house: lexemes_module.enough_candidates, self.houses: 3}
+
+    def fetch(self, confirm: bool):
+        with patch.object(lexemes_module, "read_from_pickle", return_value=False), \
+                patch.object(Lexemes, "__find_usage_examples_in_the_dataframes__",
+                             return_value=({self.house: [], self.houses: []}, self.candidates)), \
+                patch.object(Lexemes, "__get_usage_examples_from_apis__", return_value=[]), \
+                patch.object(lexemes_module.wikisource, "search") as search:
+            self.lexemes.fetch_usage_examples(confirm=confirm)
+        return search
+
+    def test_only_search_wikisource_for_forms_without_enough_candidates(self):
+        search = self.fetch(confirm=False)
+        search.assert_called_once()
+        self.assertEqual(search.call_args.kwargs["representations"], ["houses"])
+
+    def test_prompts_are_not_timed(self):
+        def think(question):
+            time.sleep(0.2)
+            return True
+        instrumentation.reset()
+        with patch.object(lexemes_module.tui, "work_on"), \
+                patch.object(lexemes_module.util, "yes_no_question", side_effect=think):
+            self.fetch(confirm=True)
+        calls, seconds, _ = instrumentation.spans[("fetch usage examples", "")]
+        self.assertEqual(calls, 1)
+        self.assertLess(seconds, 0.2)
+        instrumentation.reset()
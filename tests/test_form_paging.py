@@ -0,0 +1,85 @@
+import os
+import re
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.config import config
+from lexutils.helpers import work_allocation
+from lexutils.models.lexemes import Lexemes, forms_without_an_example_query
+from lexutils.models.wikidata.enums import WikimediaLanguageQID
+
+
+def binding(form_id: str):
+    lexeme_id = form_id.split("-")[0]
+    return dict(lexeme=dict(value=f"{config.wd_prefix}{lexeme_id}"),
+                form=dict(value=f"{config.wd_prefix}{form_id}"),
+                form_representation=dict(value=form_id.lower()),
+                category=dict(value=f"{config.wd_prefix}Q1084"),
+                grammatical_features=dict(value=f"{config.wd_prefix}Q110786"))
+
+
+class TestFormPaging(TestCase):
+    form_ids = ["L2-F1", "L2-F2", "L10-F1", "L11-F1", "L11-F2"]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = dict(work_allocation_path=config.work_allocation_path)
+        config.work_allocation_path = os.path.join(self.directory.name, "work_allocation.sqlite")
+        work_allocation.allocator = None
+        self.queries = []
+
+    def tearDown(self):
+        for name, value in self.settings.items():
+            setattr(config, name, value)
+        work_allocation.allocator = None
+        self.directory.cleanup()
+
+    def execute_sparql_query(self, query: str):
+        """Answer like WDQS would from form_ids"""
+        self.queries.append(query)
+        after = None
+        if "?form_number >" in query:
+            number, form_number = re.search(r"\?number = (\d+) && \?form_number > (\d+)", query).groups()
+            after = f"L{number}-F{form_number}"
+        limit = int(query.split("limit")[1])
+        position = self.form_ids.index(after) + 1 if after is not None else 0
+        return dict(results=dict(bindings=[binding(form_id)
+                                           for form_id in self.form_ids[position:position + limit]]))
+
+    def fetch(self, lexemes: Lexemes):
+        lexemes.fetch_forms_without_an_example(number_of_forms=2)
+        return [form.id for form in lexemes.forms_without_an_example]
+
+    def test_paging(self):
+        with patch("lexutils.models.lexemes.execute_sparql_query", self.execute_sparql_query), \
+                patch("lexutils.models.wikidata.form.read_labels_from_cache",
+                      lambda qids: {qid: f"label of {qid}" for qid in qids}):
+            lexemes = Lexemes(language_code="sv")
+            self.assertEqual(self.fetch(lexemes), ["L2-F1", "L2-F2"])
+            self.assertEqual(self.fetch(lexemes), ["L10-F1", "L11-F1"])
+            # The cursor is kept between sessions
+            self.assertEqual(self.fetch(Lexemes(language_code="sv")), ["L11-F2"])
+            # After the short last page we start over
+            self.assertEqual(self.fetch(lexemes), ["L2-F1", "L2-F2"])
+        self.assertNotIn("offset", self.queries[0])
+        self.assertIn("FILTER(?number > 11 || (?number = 11 && ?form_number > 1))", self.queries[2])
+
+    def test_page_claimed_by_another_session(self):
+        def execute_sparql_query(query: str):
+            if len(self.queries) == 0:
+                # Another session gets the first page while we fetch it
+                work_allocation.advance_cursor(name="forms-sv", expected=None, value="L2-F2")
+            return self.execute_sparql_query(query)
+        with patch("lexutils.models.lexemes.execute_sparql_query", execute_sparql_query), \
+                patch("lexutils.models.wikidata.form.read_labels_from_cache",
+                      lambda qids: {qid: f"label of {qid}" for qid in qids}):
+            self.assertEqual(self.fetch(Lexemes(language_code="sv")), ["L10-F1", "L11-F1"])
+        self.assertEqual(len(self.queries), 2)
+        self.assertEqual(work_allocation.read_cursor(name="forms-sv"), "L11-F1")
+
+    def test_shards(self):
+        query = forms_without_an_example_query(language_qid=WikimediaLanguageQID.SWEDISH, number_of_forms=10,
+                                               shard=1, shards=3)
+        self.assertIn("FILTER(?number - 3 * FLOOR(?number / 3) = 1)", query)
+        self.assertNotIn("?form_number >", query)
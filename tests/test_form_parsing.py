@@ -0,0 +1,57 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.config import config
+from lexutils.models.wikidata import form as form_module
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+from lexutils.models.wikidata.form import Form, parse_forms
+
+
+def binding(lexeme_id: str, form_id: str, representation: str, category: str, features: str):
+    return dict(lexeme=dict(value=f"{config.wd_prefix}{lexeme_id}"),
+                form=dict(value=f"{config.wd_prefix}{form_id}"),
+                form_representation=dict(value=representation),
+                category=dict(value=f"{config.wd_prefix}{category}"),
+                grammatical_features=dict(value=",".join(f"{config.wd_prefix}{feature}"
+                                                         for feature in features.split(","))))
+
+
+class TestFormParsing(TestCase):
+    cache = dict(Q1084="noun", Q110786="singular")
+
+    def test_parse_forms(self):
+        bindings = [binding("L1", "L1-F1", "hus", "Q1084", "Q110786,Q53997857"),
+                    binding("L1", "L1-F2", "huset", "Q1084", "Q110786,Q53997851"),
+                    binding("L2", "L2-F1", "springa", "Q24905", "Q179230")]
+        entities = dict(entities={qid: dict(labels=dict(en=dict(value=f"label of {qid}")))
+                                  for qid in ["Q24905", "Q179230", "Q53997851"]})
+        # Q53997857 has no English label
+        entities["entities"]["Q53997857"] = dict(labels={})
+        with patch.object(form_module, "read_labels_from_cache",
+                          side_effect=lambda qids: {qid: self.cache[qid] for qid in qids if qid in self.cache}) as read, \
+                patch.object(form_module, "mediawiki_api_call_helper", return_value=entities) as fetch, \
+                patch.object(form_module, "add_labels_to_cache") as add:
+            forms = parse_forms(bindings=bindings, language_code=WikimediaLanguageCode.SWEDISH)
+        # The labels are resolved once for all the rows
+        read.assert_called_once()
+        fetch.assert_called_once()
+        self.assertEqual(fetch.call_args.kwargs["data"]["ids"], "Q24905|Q179230|Q53997851|Q53997857")
+        add.assert_called_once_with(labels={"Q24905": "label of Q24905", "Q179230": "label of Q179230",
+                                            "Q53997851": "label of Q53997851", "Q53997857": "Q53997857"})
+        self.assertEqual([(form.id, form.lexeme_id, form.representation, form.lexeme_category)
+                          for form in forms],
+                         [("L1-F1", "L1", "hus", "noun"), ("L1-F2", "L1", "huset", "noun"),
+                          ("L2-F1", "L2", "springa", "label of Q24905")])
+        self.assertEqual(forms[0].grammatical_features, ["singular", "Q53997857"])
+        self.assertEqual(forms[1].grammatical_features, ["singular", "label of Q53997851"])
+        self.assertIs(forms[0].lexeme_id, forms[1].lexeme_id)
+        self.assertIsNot(forms[0].grammatical_features, forms[1].grammatical_features)
+        self.assertEqual((forms[0].number_of_examples_found, forms[0].senses, forms[0].language_code),
+                         (0, None, WikimediaLanguageCode.SWEDISH))
+
+    def test_form_without_bindings(self):
+        with patch.object(form_module, "read_labels_from_cache") as read:
+            form = Form(dict(), language_code=WikimediaLanguageCode.SWEDISH)
+        read.assert_not_called()
+        self.assertEqual((form.lexeme_category, form.grammatical_features), (None, []))
+        self.assertFalse(hasattr(form, "id"))
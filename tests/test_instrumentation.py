@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import instrumentation
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def test_span_and_timed(self):
+        with instrumentation.span("wdqs query", source="forms"):
+            pass
+
+        @instrumentation.timed("nlp splitting", source=SupportedExampleSources.WIKISOURCE)
+        def split():
+            return 1
+        self.assertEqual(split(), 1)
+        self.assertEqual(split(), 1)
+        spans = {(entry["stage"], entry["source"]): entry
+                 for entry in instrumentation.summary()["spans"]}
+        self.assertEqual(spans[("wdqs query", "forms")]["calls"], 1)
+        self.assertEqual(spans[("nlp splitting", "wikisource")]["calls"], 2)
+
+    def test_span_records_on_exception(self):
+        with self.assertRaises(ValueError):
+            with instrumentation.span("wbi write"):
+                raise ValueError("test")
+        self.assertEqual(instrumentation.summary()["spans"][0]["calls"], 1)
+
+    def test_counters(self):
+        instrumentation.count("label cache hit")
+        instrumentation.count("label cache hit", increment=2)
+        instrumentation.count("label cache miss", increment=0)
+        counters = {entry["name"]: entry["count"] for entry in instrumentation.summary()["counters"]}
+        self.assertEqual(counters, {"label cache hit": 3, "label cache miss": 0})
+
+    def test_export(self):
+        instrumentation.count("qid cache miss", source=SupportedExampleSources.WIKISOURCE)
+        with instrumentation.span("corpus loading", source="riksdagen"):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "timings.json")
+            instrumentation.export(json_path)
+            with open(json_path) as file:
+                data = json.load(file)
+            self.assertEqual(data["counters"][0]["source"], "wikisource")
+            prometheus_path = os.path.join(directory, "timings.prom")
+            instrumentation.export(prometheus_path)
+            with open(prometheus_path) as file:
+                text = file.read()
+        self.assertIn('lexutils_stage_calls_total{stage="corpus loading",source="riksdagen"} 1', text)
+        self.assertIn('lexutils_events_total{name="qid cache miss",source="wikisource"} 1', text)
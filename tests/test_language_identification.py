@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from lexutils.helpers import language_identification
+
+swedish = ["Regeringen vill bygga fler hus i staden nu.",
+           "Vi söker en erfaren medarbetare till vårt kontor i Malmö.",
+           "Utskottet anser att frågan bör utredas vidare."]
+english = ["The committee noted that the proposal was premature.",
+           "We are looking for an experienced colleague to join our office."]
+
+
+class TestLanguageIdentification(TestCase):
+    def test_detect_batch(self):
+        self.assertEqual(language_identification.detect_batch(swedish + english + ["", "1 2 3"], engine="ngram"),
+                         ["sv", "sv", "sv", "en", "en", None, None])
+        self.assertEqual(language_identification.detect("Vi søker en erfaren medarbeider til vårt kontor i Oslo.",
+                                                        engine="ngram"), "no")
+
+    def test_langdetect_is_deterministic(self):
+        text = "Vi söker en erfaren medarbetare."
+        self.assertEqual(len({language_identification.detect(text, engine="langdetect") for _ in range(5)}), 1)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            language_identification.detect("Hej", engine="unknown")
+
+    def test_document_language(self):
+        self.assertEqual(language_identification.document_language(
+            language_identification.split_paragraphs("\n".join(swedish))), "sv")
+        self.assertEqual(language_identification.document_language(swedish + english),
+                         language_identification.mixed)
+        self.assertIsNone(language_identification.document_language([""]))
+
+    def test_select_sentences_in_language(self):
+        self.assertEqual(language_identification.select_sentences_in_language(swedish, language_code="sv"),
+                         swedish)
+        self.assertEqual(language_identification.select_sentences_in_language(english, language_code="sv"), [])
+        # Documents with e.g. an English summary are checked sentence by sentence
+        self.assertEqual(language_identification.select_sentences_in_language(
+            english * 3 + swedish * 2, language_code="sv"), swedish * 2)
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from lexutils.models.lazy_usage_examples import LazyUsageExamples
+from tests.factories import create_example
+
+
+class TestLazyUsageExamples(TestCase):
+    def test_merge_in_ascending_word_count_order(self):
+        consumed = []
+
+        def lazy_source(texts):
+            for text in texts:
+                consumed.append(text)
+                yield create_example(text)
+        examples = LazyUsageExamples(
+            eager_examples=[create_example("tre ord här"), create_example("ett")],
+            lazy_sources=[lazy_source(["två ord", "fyra ord är här"]),
+                          lazy_source(["två till", "fem ord är nog här"])],
+            number_of_lazy_candidates=4
+        )
+        self.assertEqual(examples.number_of_candidates, 6)
+        self.assertFalse(examples.is_empty())
+        iterator = iter(examples)
+        self.assertEqual([next(iterator).text for _ in range(3)], ["ett", "två ord", "två till"])
+        # The longest examples have not been created yet
+        self.assertNotIn("fem ord är nog här", consumed)
+        self.assertEqual([example.word_count for example in examples], [1, 2, 2, 3, 4, 5])
+        self.assertEqual(examples.number_of_examples_produced, 6)
+
+    def test_merge_in_descending_score_order(self):
+        examples = LazyUsageExamples(
+            eager_examples=[create_example("sämst", score=0.1), create_example("bra men lång", score=1.0)],
+            lazy_sources=[iter([create_example("bäst", score=2.0), create_example("bra", score=1.0)])],
+        )
+        self.assertEqual([example.text for example in examples], ["bäst", "bra", "bra men lång", "sämst"])
+
+    def test_collapse_near_duplicates_across_sources(self):
+        examples = LazyUsageExamples(
+            eager_examples=[create_example("Regeringen vill bygga fler hus i staden nu.", score=2.0)],
+            lazy_sources=[iter([create_example("Regeringen vill bygga fler hus i staden nu!", score=1.0),
+                                create_example("Vi söker en säljare till vårt kontor.", score=0.5)])],
+        )
+        self.assertEqual([example.text for example in examples],
+                         ["Regeringen vill bygga fler hus i staden nu.", "Vi söker en säljare till vårt kontor."])
+
+    def test_empty(self):
+        self.assertTrue(LazyUsageExamples(lazy_sources=[iter([])]).is_empty())
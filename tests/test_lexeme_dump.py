@@ -0,0 +1,84 @@
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.config import config
+from lexutils.helpers import lexeme_dump
+from lexutils.models.wikidata.enums import WikimediaLanguageCode, WikimediaLanguageQID
+from lexutils.models.wikidata.form import fetch_senses_of_lexemes
+
+fixture = os.path.join(os.path.dirname(__file__), "fixtures", "lexemes.json")
+swedish = WikimediaLanguageQID.SWEDISH.value
+
+
+def form_ids(bindings):
+    return [binding["form"]["value"].replace(config.wd_prefix, "") for binding in bindings]
+
+
+class TestLexemeDump(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.directory.name, "lexemes.sqlite")
+
+    def tearDown(self):
+        lexeme_dump.index = None
+        self.directory.cleanup()
+
+    def compress(self, opener, extension: str) -> str:
+        path = os.path.join(self.directory.name, f"lexemes.json{extension}")
+        with open(fixture, "rb") as source, opener(path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        return path
+
+    def test_compressed_dumps(self):
+        for opener, extension, decompressors in [
+            (gzip.open, ".gz", {}),
+            (bz2.open, ".bz2", {}),
+            # The same as with pigz and lbzip2 but installed everywhere
+            (gzip.open, ".gz", {".gz": [["gzip", "-dc"]]}),
+            (bz2.open, ".bz2", {".bz2": [["bzip2", "-dc"]]}),
+        ]:
+            with self.subTest(extension=extension, decompressors=decompressors), \
+                    patch.object(lexeme_dump, "parallel_decompressors", decompressors), \
+                    patch.object(lexeme_dump, "block_size", 100):
+                dump = self.compress(opener, extension)
+                self.assertEqual([entity["id"] for entity in lexeme_dump.read_entities(dump)],
+                                 ["L1", "L2", "L3", "L4", "L5", "L6"])
+
+    def test_queries(self):
+        self.assertEqual(lexeme_dump.ingest(dump_path=fixture, index_path=self.index_path, languages=[swedish]), 5)
+        index = lexeme_dump.LexemeIndex(path=self.index_path)
+        page = index.forms_without_an_example(language_qid=swedish, number_of_forms=10)
+        # L2 has no sense with P5137, L3 has an example of a form, L5 is
+        # English and the form of L6 has no grammatical features
+        self.assertEqual(form_ids(page), ["L1-F1", "L1-F2", "L4-F1", "L4-F2", "L4-F10"])
+        self.assertEqual(page[1]["form_representation"]["value"], "huset")
+        self.assertEqual(page[1]["category"]["value"], f"{config.wd_prefix}Q1084")
+        self.assertEqual(page[1]["grammatical_features"]["value"],
+                         f"{config.wd_prefix}Q110786,{config.wd_prefix}Q53997851")
+        self.assertEqual(form_ids(index.forms_without_an_example(language_qid=swedish, number_of_forms=2,
+                                                                 after="L1-F2")), ["L4-F1", "L4-F2"])
+        self.assertEqual(form_ids(index.forms_without_an_example(language_qid=swedish, number_of_forms=10,
+                                                                 shard=0, shards=2)), ["L4-F1", "L4-F2", "L4-F10"])
+        self.assertEqual(index.count_lexemes(language_qid=swedish), 5)
+        self.assertEqual(index.count_lexemes(language_qid=WikimediaLanguageQID.ENGLISH.value), 0)
+        # The deprecated P5137 of L4-S2 does not count
+        self.assertEqual(index.count_senses_with_p5137(language_qid=swedish), 4)
+        # L4 has an example without a form
+        self.assertEqual(index.count_forms_without_an_example(language_qid=swedish), 3)
+        self.assertEqual(index.metadata()["lexemes"], "5")
+
+    def test_senses_of_lexemes(self):
+        lexeme_dump.ingest(dump_path=fixture, index_path=self.index_path)
+        with patch.object(config, "lexeme_dump_index", self.index_path), \
+                patch("lexutils.models.wikidata.form.execute_sparql_query") as query:
+            senses = fetch_senses_of_lexemes(lexeme_ids=["L1", "L4", "L5"],
+                                             language_code=WikimediaLanguageCode.SWEDISH)
+        query.assert_not_called()
+        self.assertEqual({lexeme_id: [(sense.id, sense.gloss) for sense in lexeme_senses]
+                          for lexeme_id, lexeme_senses in senses.items()},
+                         {"L1": [("L1-S1", "byggnad")], "L4": [("L4-S2", "löpa")], "L5": [("L5-S1", "building")]})
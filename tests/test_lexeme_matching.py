@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+from tests.factories import create_form, create_usage_examples
+
+
+class TestLexemeMatching(TestCase):
+    object: RiksdagenUsageExamples = create_usage_examples(RiksdagenUsageExamples, pd.DataFrame(data=[
+        dict(id="1", sentence="Regeringen vill bygga ett nytt hus i staden nu."),
+        dict(id="2", sentence="Regeringen vill bygga fler hus i staden nu."),
+        dict(id="3", sentence="Regeringen vill riva husen i den gamla staden nu."),
+        dict(id="4", sentence="Regeringen vill inte bygga något i staden nu."),
+    ]), source=SupportedExampleSources.RIKSDAGEN)
+
+    def test_iterate_lexeme_forms_in_the_dataframe(self):
+        hus = create_form("hus")
+        husen = create_form("husen")
+        iterators = self.object.iterate_lexeme_forms_in_the_dataframe(forms=[hus, husen])
+        self.assertEqual(self.object.number_of_matches, 3)
+        examples = list(iterators[hus])
+        # The shorter sentence scores higher
+        self.assertEqual([example.record.id for example in examples], ["2", "1"])
+        self.assertGreater(examples[0].score, examples[1].score)
+        self.assertEqual([example.record.id for example in iterators[husen]], ["3"])
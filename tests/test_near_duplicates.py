@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.helpers import near_duplicates
+
+sentence = "Vi söker en säljare till vårt kontor i Stockholm."
+
+
+class TestNearDuplicates(TestCase):
+    def test_fingerprint(self):
+        # Case, digits and punctuation are ignored
+        self.assertEqual(near_duplicates.fingerprint(sentence),
+                         near_duplicates.fingerprint("vi söker en säljare, till vårt kontor i Stockholm 2021!"))
+        self.assertGreater(near_duplicates.hamming_distance(
+            near_duplicates.fingerprint(sentence),
+            near_duplicates.fingerprint("Regeringen vill bygga fler hus i staden nu.")
+        ), 8)
+        self.assertEqual(near_duplicates.fingerprints(["", sentence]).tolist(),
+                         [0, near_duplicates.fingerprint(sentence)])
+
+    def test_index(self):
+        index = near_duplicates.NearDuplicateIndex(max_distance=3)
+        fingerprint = near_duplicates.fingerprint(sentence)
+        self.assertTrue(index.add_if_new(fingerprint))
+        # The 4 bands have 16 bits each. A fingerprint within the distance
+        # is found even if 3 of the bands differ, because then one band is equal.
+        self.assertFalse(index.add_if_new(fingerprint ^ 1 ^ 1 << 20 ^ 1 << 40))
+        self.assertTrue(index.add_if_new(fingerprint ^ 0b1111))
+        # If all the bands differ, the fingerprint is beyond the distance and is new
+        self.assertTrue(index.add_if_new(fingerprint ^ 1 ^ 1 << 20 ^ 1 << 40 ^ 1 << 60))
+        self.assertEqual(index.number_of_duplicates, 1)
+
+    def test_drop_near_duplicates(self):
+        dataframe = near_duplicates.drop_near_duplicates(pd.DataFrame(data=[
+            dict(id="1", sentence=sentence),
+            dict(id="2", sentence="Regeringen vill bygga fler hus i staden nu."),
+            dict(id="3", sentence="Vi söker en säljare till vårt kontor i Stockholm!"),
+            # One different word is a distinct sentence
+            dict(id="4", sentence="Vi söker en säljare till vårt kontor i Göteborg."),
+        ]), max_distance=3)
+        self.assertEqual(dataframe["id"].tolist(), ["1", "2", "4"])
+        self.assertIn(near_duplicates.fingerprint_column, dataframe.columns)
@@ -0,0 +1,35 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.config import config
+from lexutils.helpers import normalizer
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+from tests.factories import create_form
+
+
+class TestNormalizer(TestCase):
+    def test_tokenize(self):
+        words = normalizer.tokenize("Vi söker en „Projektledare“, nu!\nAnsök idag.",
+                                    WikimediaLanguageCode.SWEDISH)
+        self.assertEqual(words, ["vi", "söker", "en", "projektledare", "nu", "ansök", "idag"])
+
+    def test_tokenize_language_punctuation(self):
+        text = "Er sagte ‚Haus‘ dazu"
+        self.assertIn("haus", normalizer.tokenize(text, WikimediaLanguageCode.GERMAN))
+        self.assertNotIn("haus", normalizer.tokenize(text, WikimediaLanguageCode.SWEDISH))
+
+    def test_translation_table(self):
+        text = "Er sagte ‚Haus‘ dazu, nicht: Hof!"
+        self.assertEqual(text.lower().translate(normalizer.translation_table(WikimediaLanguageCode.GERMAN)).split(),
+                         normalizer.tokenize(text, WikimediaLanguageCode.GERMAN))
+
+    def test_word_count_only_counts_words(self):
+        # 7 words. Splitting on single spaces after replacing the
+        # punctuation used to count 10 and discard the sentence.
+        record = RiksdagenRecord(id="H1", text="Vi har hus, bilar, båtar och tåg.")
+        with patch.object(config, "min_word_count", 5), patch.object(config, "max_word_count", 8):
+            self.assertIsNotNone(record.extract_usage_example_if_suitable(form=create_form("bilar")))
+
+    def test_remove_quotation_marks(self):
+        self.assertEqual(normalizer.remove_quotation_marks("„Hej“ sa hon »då«"), "Hej  sa hon  då«")
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from lexutils.helpers import profiling
+
+
+def busy_work():
+    end = time.perf_counter() + 0.2
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def think_time():
+    time.sleep(0.2)
+
+
+class TestProfiling(TestCase):
+    def run_session(self, mode: str, directory: str):
+        profiling.start(mode=mode)
+        try:
+            busy_work()
+            with profiling.paused():
+                think_time()
+        finally:
+            profiling.stop(output_directory=directory)
+
+    def test_cprofile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_session("cprofile", directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "session.prof")))
+            with open(os.path.join(directory, "summary.txt")) as file:
+                summary = file.read()
+        self.assertIn("busy_work", summary)
+        self.assertNotIn("think_time", summary)
+
+    def test_sampling(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_session("sampling", directory)
+            with open(os.path.join(directory, "session.folded")) as file:
+                folded = file.read()
+        self.assertIn("busy_work (test_profiling.py:", folded)
+        self.assertNotIn("think_time", folded)
+        for line in folded.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(int(count) > 0)
+
+    def test_stop_without_start(self):
+        with self.assertRaises(ValueError):
+            profiling.stop(output_directory=tempfile.gettempdir())
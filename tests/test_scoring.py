@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import scoring
+from lexutils.models.dataframe_usage_examples import add_scores
+
+
+class TestScoring(TestCase):
+    def test_compute_features(self):
+        features = scoring.compute_features(pd.Series([
+            "Regeringen vill bygga ett nytt hus.",
+            "ARBETSUPPGIFTER du ska (bland annat) svara i telefon 08-123",
+        ]))
+        self.assertEqual(features["word_count"].tolist(), [6, 9])
+        self.assertEqual(features["capitalized"].tolist(), [True, True])
+        self.assertEqual(features["terminated"].tolist(), [True, False])
+        self.assertEqual(features["has_heading"].tolist(), [False, True])
+        self.assertEqual(features["has_digits"].tolist(), [False, True])
+        self.assertEqual(features["noise_ratio"][0], 0)
+        self.assertGreater(features["noise_ratio"][1], 0)
+
+    def test_headings(self):
+        features = scoring.compute_features(pd.Series([
+            "Villkor: heltid, tillsvidare.",
+            "ÖvrigtVi söker en vaktmästare.",
+            "KVALIFIKATIONER du har körkort.",
+            "Villkoren för bidraget ändras.",
+            "Ansökan ska lämnas in senast i maj.",
+            "Beskrivningen av huset var bra.",
+            "Vi erbjuder dig en trygg anställning.",
+            "Du skickar in din ansökan.",
+        ]))
+        self.assertEqual(features["has_heading"].tolist(), [True, True, True, False, False, False, False, False])
+
+    def test_heuristic_prefers_clean_sentences_from_reliable_sources(self):
+        clean, noisy = scoring.score_texts([
+            "Regeringen vill bygga ett nytt hus.",
+            "ARBETSUPPGIFTER du ska (bland annat) svara i telefon 08-123",
+        ], source=SupportedExampleSources.RIKSDAGEN, scorer="heuristic")
+        self.assertGreater(clean, noisy)
+        [from_ksamsok] = scoring.score_texts(["Regeringen vill bygga ett nytt hus."],
+                                             source=SupportedExampleSources.KSAMSOK)
+        self.assertGreater(clean, from_ksamsok)
+
+    def test_unknown_scorer(self):
+        with self.assertRaises(ValueError):
+            scoring.score_texts(["Ett hus."], source=SupportedExampleSources.RIKSDAGEN, scorer="unknown")
+
+    def test_add_scores_sorts_best_first(self):
+        dataframe = add_scores(pd.DataFrame(data=[
+            dict(id="1", sentence="huset (se bilaga 3) byggs"),
+            dict(id="2", sentence="Huset byggs nu av kommunen."),
+        ]), source=SupportedExampleSources.RIKSDAGEN)
+        self.assertEqual(dataframe["id"].tolist(), ["2", "1"])
+        self.assertTrue(dataframe[scoring.score_column].is_monotonic_decreasing)
+
+    def test_evaluate(self):
+        decisions = pd.DataFrame(data=[
+            dict(form_id="L1-F1", source="RIKSDAGEN", position=1,
+                 text="huset (se bilaga 3) byggs", decision="SKIP_USAGE_EXAMPLE"),
+            dict(form_id="L1-F1", source="RIKSDAGEN", position=2,
+                 text="Huset byggs nu av kommunen.", decision="USAGE_EXAMPLE_ADDED"),
+            # Forms without an accepted example are not counted
+            dict(form_id="L2-F1", source="RIKSDAGEN", position=1,
+                 text="Bilen är röd.", decision="SKIP_FORM"),
+        ])
+        results = scoring.evaluate(decisions)
+        self.assertEqual(results["as logged"], dict(forms=1, examples_shown_per_accepted_example=2))
+        self.assertEqual(results["heuristic"], dict(forms=1, examples_shown_per_accepted_example=1))
@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.helpers.sentence_filters import SentenceFilter
+
+
+def apply(sentence_filter: SentenceFilter, sentences):
+    passed, skipped = sentence_filter.apply(pd.DataFrame(dict(sentence=sentences)))
+    return passed["sentence"].tolist(), skipped
+
+
+class TestSentenceFilters(TestCase):
+    sentence_filter = SentenceFilter(
+        strip_prefixes=["Om oss", "OM OSS", "Lön:"],
+        strip_leading_characters="•-*",
+        min_words=5,
+        max_words=8,
+        forbid_digits=True,
+        forbidden_characters="()§[]/:",
+        forbidden_substrings=["http", ".se"],
+        forbidden_first_characters=",",
+        allow_lowercase_start=False,
+    )
+
+    def test_clean(self):
+        passed, _ = apply(self.sentence_filter, [
+            "Om oss Olle och hans  kollegor driver firman.",
+            "• - Vi söker en glad säljare nu.",
+        ])
+        # The prefix is stripped as a whole and not as a set of characters
+        self.assertEqual(passed, ["Olle och hans kollegor driver firman.",
+                                  "Vi söker en glad säljare nu."])
+
+    def test_rules(self):
+        sentences = [
+            "Vi söker en glad säljare nu.",
+            "Vi söker säljare.",
+            "Vi söker en glad och trevlig säljare till vårt kontor nu.",
+            "Vi söker 2 glada säljare nu.",
+            "Vi söker en glad säljare (heltid).",
+            "Läs mer på https://example.com om jobbet.",
+            "Läs mer på example.se om jobbet.",
+            "Ansök senast: den sista maj i år.",
+            ", och vi söker en glad säljare.",
+            "och vi söker en glad säljare.",
+        ]
+        passed, skipped = apply(self.sentence_filter, sentences)
+        self.assertEqual(passed, ["Vi söker en glad säljare nu."])
+        self.assertEqual(skipped, len(sentences) - 1)
+
+    def test_empty(self):
+        self.assertEqual(apply(SentenceFilter(), []), ([], 0))
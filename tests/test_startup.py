@@ -0,0 +1,24 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+# The language menu should appear well under a second after starting
+import_time_budget_seconds = 0.5
+heavy_modules = ["pandas", "spacy", "wikibaseintegrator", "riksdagenapi", "httpx", "requests"]
+
+
+class TestStartup(TestCase):
+    def test_import_time_of_main(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import lexutils.main"],
+            capture_output=True, text=True, check=True
+        )
+        cumulative_times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, module = line.split("|")
+                if cumulative.strip().isdigit():
+                    cumulative_times[module.strip()] = int(cumulative) / 1_000_000
+        for module in heavy_modules:
+            self.assertNotIn(module, cumulative_times, f"{module} was imported at startup")
+        self.assertLess(cumulative_times["lexutils.main"], import_time_budget_seconds)
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from lexutils.config import config
+from lexutils.helpers import upload_queue
+from lexutils.helpers.upload_queue import UploadQueue, Uploader, WikibaseWriter
+
+
+def create_claim(text: str):
+    return {"mainsnak": {"snaktype": "value", "property": "P5831",
+                         "datavalue": {"value": {"text": text, "language": "sv"}, "type": "monolingualtext"}},
+            "type": "statement", "rank": "normal"}
+
+
+class FakeWriter:
+    def __init__(self, failures: int = 0):
+        self.edits = []
+        self.failures = failures
+
+    def add_claims(self, lexeme_id: str = None, claims=None, summary: str = None) -> int:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Wikidata is down")
+        self.edits.append((lexeme_id, [claim["mainsnak"]["datavalue"]["value"]["text"] for claim in claims], summary))
+        return len(self.edits)
+
+
+class TestUploadQueue(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = {name: getattr(config, name) for name in
+                         ["upload_queue", "upload_batch_delay", "upload_edit_interval", "upload_max_attempts"]}
+        config.upload_queue = os.path.join(self.directory.name, "upload_queue.sqlite")
+        config.upload_batch_delay = 60
+        config.upload_edit_interval = 0
+        config.upload_max_attempts = 2
+
+    def tearDown(self):
+        for name, value in self.settings.items():
+            setattr(config, name, value)
+        self.directory.cleanup()
+
+    def test_merge_the_examples_of_a_lexeme_into_one_edit(self):
+        writer = FakeWriter()
+        upload_queue.start(writer=writer)
+        start = time.perf_counter()
+        upload_queue.enqueue(lexeme_id="L1", form_id="L1-F1", sense_id="L1-S1", claim=create_claim("första"))
+        upload_queue.enqueue(lexeme_id="L2", form_id="L2-F1", sense_id="L2-S1", claim=create_claim("andra"))
+        upload_queue.enqueue(lexeme_id="L1", form_id="L1-F2", sense_id="L1-S1", claim=create_claim("tredje"))
+        # Enqueuing does not wait for the uploads
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(writer.edits, [])
+        upload_queue.stop()
+        self.assertEqual([(lexeme_id, texts) for lexeme_id, texts, _ in writer.edits],
+                         [("L1", ["första", "tredje"]), ("L2", ["andra"])])
+        self.assertTrue(writer.edits[0][2].startswith("Added 2 usage examples"))
+        queue = UploadQueue(path=config.upload_queue)
+        self.assertEqual(queue.count(upload_queue.pending), 0)
+        self.assertEqual(queue.count(upload_queue.done), 3)
+
+    def test_wait_for_more_examples_before_uploading(self):
+        queue = UploadQueue(path=config.upload_queue)
+        queue.add(lexeme_id="L1", form_id="L1-F1", sense_id="L1-S1", claim=create_claim("första"))
+        writer = FakeWriter()
+        uploader = Uploader(upload_queue=queue, writer=writer, batch_delay=60, edit_interval=0)
+        uploader.upload_ready()
+        self.assertEqual(writer.edits, [])
+        uploader.upload_ready(flush=True)
+        self.assertEqual(len(writer.edits), 1)
+
+    def test_uploads_are_kept_between_sessions(self):
+        queue = UploadQueue(path=config.upload_queue)
+        queue.add(lexeme_id="L1", form_id="L1-F1", sense_id="L1-S1", claim=create_claim("kvar"))
+        writer = FakeWriter()
+        upload_queue.start(writer=writer)
+        upload_queue.stop()
+        self.assertEqual(writer.edits[0][:2], ("L1", ["kvar"]))
+
+    def test_retry_and_give_up(self):
+        queue = UploadQueue(path=config.upload_queue)
+        queue.add(lexeme_id="L1", form_id="L1-F1", sense_id="L1-S1", claim=create_claim("första"))
+        uploader = Uploader(upload_queue=queue, writer=FakeWriter(failures=1), batch_delay=0, edit_interval=0)
+        uploader.upload_ready()
+        self.assertEqual(queue.count(upload_queue.pending), 1)
+        uploader.upload_ready()
+        self.assertEqual(queue.count(upload_queue.done), 1)
+        queue.add(lexeme_id="L2", form_id="L2-F1", sense_id="L2-S1", claim=create_claim("andra"))
+        uploader.writer = FakeWriter(failures=2)
+        uploader.upload_ready()
+        uploader.upload_ready()
+        self.assertEqual(queue.count(upload_queue.pending), 0)
+        self.assertEqual(queue.count(upload_queue.failed), 1)
+
+    def test_forms_are_done_after_the_upload(self):
+        queue = UploadQueue(path=config.upload_queue)
+        done, failed = [], []
+        uploader = Uploader(upload_queue=queue, writer=FakeWriter(failures=2), batch_delay=0, edit_interval=0,
+                            on_done=lambda upload: done.append(upload.form_id),
+                            on_failed=lambda upload: failed.append(upload.form_id))
+        queue.add(lexeme_id="L1", form_id="L1-F1", sense_id="L1-S1", claim=create_claim("första"))
+        uploader.upload_ready()
+        # The form is not done while the upload is retried
+        self.assertEqual((done, failed), ([], []))
+        uploader.upload_ready()
+        self.assertEqual((done, failed), ([], ["L1-F1"]))
+        queue.add(lexeme_id="L2", form_id="L2-F1", sense_id="L2-S1", claim=create_claim("andra"))
+        uploader.upload_ready()
+        self.assertEqual((done, failed), (["L2-F1"], ["L1-F1"]))
+
+
+class TestWikibaseWriter(TestCase):
+    def test_retry_on_edit_conflict(self):
+        from wikibaseintegrator.wbi_exceptions import MWApiError
+
+        class ConflictingWriter(WikibaseWriter):
+            edits = []
+
+            def read(self, lexeme_id: str, props: str = "info"):
+                if props == "info":
+                    return {"lastrevid": 1}
+                # Somebody else added one of our examples in revision 2
+                return {"lastrevid": 2, "claims": {"P5831": [create_claim("första")]}}
+
+            def edit(self, lexeme_id, claims, revision_id, summary):
+                if revision_id == 1:
+                    raise MWApiError({"code": "editconflict", "info": "Edit conflict"})
+                self.edits.append([claim["mainsnak"]["datavalue"]["value"]["text"] for claim in claims])
+                return 3
+
+        writer = ConflictingWriter()
+        self.assertEqual(writer.add_claims(lexeme_id="L1", claims=[create_claim("första"), create_claim("andra")],
+                                           summary="test"), 3)
+        self.assertEqual(writer.edits, [["andra"]])
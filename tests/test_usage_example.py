@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from lexutils.models.lexemes import Lexemes
+from lexutils.models.riksdagen_record import RiksdagenRecord
+from lexutils.models.usage_example import UsageExample
+from lexutils.models.wikisource_record import WikisourceRecord
+
+
+class TestUsageExample(TestCase):
+    def test_text_is_shared_with_the_record(self):
+        record = RiksdagenRecord(id="H1", text="Vi bygger ett nytt hus i staden.")
+        example = UsageExample(text=record.text, record=record)
+        self.assertIsNone(example._text)
+        self.assertIs(example.text, record.text)
+        self.assertEqual(example.word_count, 7)
+
+    def test_text_differing_from_the_record_is_kept(self):
+        record = WikisourceRecord(title="Sida", snippet="Första meningen. Andra meningen här.",
+                                  lexemes=Lexemes(language_code="sv"))
+        example = UsageExample(text="Andra meningen här.", record=record)
+        self.assertEqual(example.text, "Andra meningen här.")
+
+    def test_models_are_slotted(self):
+        record = RiksdagenRecord(id="H1", text="Text")
+        example = UsageExample(text="Text", record=record)
+        for instance in [record, example]:
+            self.assertFalse(hasattr(instance, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.unknown = True
@@ -0,0 +1,40 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from lexutils.config.enums import SupportedCachePickles
+from lexutils.helpers import wikisource
+from lexutils.models.wikidata.enums import WikimediaLanguageCode
+
+
+class TestWikisource(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # The cache pickle is written to the working directory
+        os.chdir(self.directory.name)
+        wikisource.qid_cache = None
+
+    def tearDown(self):
+        wikisource.qid_cache = None
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_misses_are_not_saved(self):
+        with patch.object(wikisource, "__query_pageprops__",
+                          return_value={"Sida": "Q1", "Utkast": None}) as query:
+            self.assertEqual(wikisource.resolve_qids(language_code=WikimediaLanguageCode.SWEDISH,
+                                                     titles=["Sida", "Utkast"]),
+                             {"Sida": "Q1", "Utkast": None})
+            # The miss is not asked for again in this session
+            wikisource.resolve_qids(language_code=WikimediaLanguageCode.SWEDISH, titles=["Utkast"])
+        query.assert_called_once()
+        self.assertTrue(os.path.exists(SupportedCachePickles.WIKISOURCE_QIDS.value))
+        # The next session asks again for the page that had no QID
+        wikisource.qid_cache = None
+        with patch.object(wikisource, "__query_pageprops__", return_value={"Utkast": "Q2"}) as query:
+            self.assertEqual(wikisource.resolve_qids(language_code=WikimediaLanguageCode.SWEDISH,
+                                                     titles=["Sida", "Utkast"]),
+                             {"Sida": "Q1", "Utkast": "Q2"})
+        query.assert_called_once_with(WikimediaLanguageCode.SWEDISH, ["Utkast"])
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from lexutils.helpers import work_allocation
+from lexutils.helpers.work_allocation import SqliteWorkAllocator
+
+
+class TestWorkAllocation(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.allocator = SqliteWorkAllocator(path=os.path.join(self.directory.name, "work_allocation.sqlite"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_disjoint_leases(self):
+        form_ids = [f"L{number}-F1" for number in range(10)]
+        self.assertEqual(self.allocator.lease(owner="a", form_ids=form_ids[:6], duration=60), form_ids[:6])
+        # Only the forms nobody else has are leased, in the order they were asked for
+        self.assertEqual(self.allocator.lease(owner="b", form_ids=list(reversed(form_ids)), duration=60, number=3),
+                         ["L9-F1", "L8-F1", "L7-F1"])
+        # Leasing again keeps the own leases
+        self.assertEqual(self.allocator.lease(owner="a", form_ids=form_ids[:2], duration=60), form_ids[:2])
+        self.allocator.complete(owner="a", form_id="L0-F1", status=work_allocation.finished)
+        self.allocator.complete(owner="a", form_id="L1-F1", status=work_allocation.declined)
+        self.assertEqual(self.allocator.renew(owner="a", duration=60), 4)
+        # A form whose upload failed is handed back on its own
+        self.assertEqual(self.allocator.release(owner="a", form_ids=["L2-F1", "L9-F1"]), 1)
+        self.assertEqual(self.allocator.release(owner="a"), 3)
+        # Finished and declined forms are never handed out again
+        self.assertEqual(self.allocator.lease(owner="b", form_ids=form_ids[:6], duration=60), form_ids[2:6])
+
+    def test_cursor(self):
+        self.assertIsNone(self.allocator.read_cursor(name="forms-sv"))
+        self.assertTrue(self.allocator.advance_cursor(name="forms-sv", expected=None, value="L2-F2"))
+        # Another session that read the cursor before we advanced it does not get the page
+        self.assertFalse(self.allocator.advance_cursor(name="forms-sv", expected=None, value="L2-F2"))
+        self.assertTrue(self.allocator.advance_cursor(name="forms-sv", expected="L2-F2", value=None))
+        self.assertIsNone(self.allocator.read_cursor(name="forms-sv"))
+
+    def test_allocators_implement_every_method(self):
+        class LeaseService(work_allocation.WorkAllocator):
+            def lease(self, owner: str = None, form_ids=None, duration: float = None, number: int = None):
+                return []
+        with self.assertRaises(TypeError):
+            LeaseService()
+
+    def test_expired_leases_are_handed_out_again(self):
+        self.assertEqual(self.allocator.lease(owner="a", form_ids=["L1-F1"], duration=0), ["L1-F1"])
+        self.assertEqual(self.allocator.lease(owner="b", form_ids=["L1-F1"], duration=60), ["L1-F1"])
+        self.assertEqual(self.allocator.lease(owner="a", form_ids=["L1-F1"], duration=60), [])
+
+    def test_concurrent_sessions(self):
+        form_ids = [f"L{number}-F1" for number in range(200)]
+        leases = {}
+
+        def lease(owner: str):
+            allocator = SqliteWorkAllocator(path=self.allocator.path)
+            # The batches overlap so every session asks for forms the others got
+            leases[owner] = {form_id for start in range(0, len(form_ids), 20)
+                             for form_id in allocator.lease(owner=owner, form_ids=form_ids[start:start + 40],
+                                                            duration=60)}
+        threads = [threading.Thread(target=lease, args=(f"session{number}",)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        leased = [form_id for owner_leases in leases.values() for form_id in owner_leases]
+        self.assertEqual(sorted(set(leased)), sorted(form_ids))
+        self.assertEqual(len(leased), len(form_ids))
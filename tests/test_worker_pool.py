@@ -0,0 +1,65 @@
+import tempfile
+from datetime import datetime
+from itertools import islice
+from unittest import TestCase
+
+import pandas as pd
+
+from lexutils.config.enums import SupportedExampleSources
+from lexutils.helpers import worker_pool
+from lexutils.helpers.corpus_store import CorpusStore
+from lexutils.models.historical_job_ads_usage_examples import HistoricalJobAdsUsageExamples
+from lexutils.models.riksdagen_usage_examples import RiksdagenUsageExamples
+from tests.factories import create_form, create_usage_examples
+
+
+class TestWorkerPool(TestCase):
+    riksdagen = create_usage_examples(RiksdagenUsageExamples, pd.DataFrame(data=[
+        dict(id="1", sentence="Regeringen vill bygga ett nytt hus i staden nu."),
+        dict(id="2", sentence="Regeringen vill bygga fler hus i staden nu."),
+        dict(id="3", sentence="Regeringen vill riva husen i den gamla staden nu."),
+        dict(id="4", sentence="Ärendet om husen i staden bordlades av utskottet."),
+        dict(id="5", sentence="Utskottet föreslår att riksdagen avslår förslaget om bilen."),
+        dict(id="6", sentence="Ett förhus i den gamla staden ska rivas nu."),
+    ]), source=SupportedExampleSources.RIKSDAGEN)
+    historical_ads = create_usage_examples(HistoricalJobAdsUsageExamples, pd.DataFrame(data=[
+        dict(id="7", sentence="Vi söker en vaktmästare till husen i staden.",
+             filename="1990.jsonl", date=datetime(1990, 5, 1)),
+        dict(id="8", sentence="Vi söker en chaufför som kör bilen i staden.",
+             filename=None, date=datetime(1991, 6, 2)),
+    ]), source=SupportedExampleSources.HISTORICAL_ADS)
+
+    def test_corpus_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.historical_ads.export_to_corpus_store(directory=directory)
+            store = CorpusStore(directory=directory)
+            self.assertEqual(len(store), 2)
+            self.assertEqual(list(store.row(0)), list(next(self.historical_ads.dataframe.drop(
+                columns=["word_count", "noise_ratio", "capitalized", "terminated", "has_heading", "has_digits"]
+            ).itertuples(index=False))))
+            self.assertIsNone(store.row(1).filename)
+            self.riksdagen.export_to_corpus_store(directory=directory)
+            store = CorpusStore(directory=directory)
+            # The case of non-ASCII letters is ignored and a letter before the word is not a boundary
+            found = [store.row(index).id for index in store.find_rows(column="sentence", representations=["ärendet"])]
+            self.assertEqual(found, ["4"])
+            found = {store.row(index).id for index in store.find_rows(column="sentence", representations=["hus"])}
+            self.assertEqual(found, {"1", "2"})
+
+    def test_same_examples_as_in_this_process(self):
+        lexeme_forms = [[create_form("hus", "L1"), create_form("husen", "L1")],
+                        [create_form("bilen", "L2")],
+                        [create_form("ärendet", "L3")]]
+        dataframes = [self.historical_ads, self.riksdagen]
+        results = worker_pool.find_usage_examples(dataframe_usage_examples=dataframes, lexeme_forms=lexeme_forms,
+                                                  processes=2, limit=10)
+        self.assertEqual(len(results), len(lexeme_forms))
+        for forms, result in zip(lexeme_forms, results):
+            for dataframe_usage_examples, (examples, number_of_rows) in zip(dataframes, result):
+                iterators = dataframe_usage_examples.iterate_lexeme_forms_in_the_dataframe(forms=forms)
+                self.assertEqual(number_of_rows, dataframe_usage_examples.number_of_matches)
+                for form, form_examples in zip(forms, examples):
+                    expected = list(islice(iterators[form], 10))
+                    self.assertEqual([(example.record.id, example.text, example.score) for example in form_examples],
+                                     [(example.record.id, example.text, example.score) for example in expected])
+        self.assertEqual([example.record.id for example in results[0][1][0][0]], ["2", "1"])